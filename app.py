@@ -1,43 +1,86 @@
 # app.py
 import streamlit as st
-from mem0_graph.agent import Mem0Agent
-from mem0_graph.graph_viz import Neo4jGraphViz
-import os
-import PyPDF2
-from io import StringIO
+from mem0_graph.config import DEFAULT_USER_ID, GRAPH_QUERY
+from mem0_graph.graph_viz import Neo4jGraphViz, graph_nodes
+from mem0_graph.loaders import supported_extensions
+from mem0_graph.resources import get_agent, get_service, warm_up
+from mem0_graph.tenants import TenantBusy
 
 st.set_page_config(page_title="Mem0Graph", layout="wide", page_icon="🕸️")
 
 st.title("Mem0Graph: Визуализация графа знаний")
 st.caption("Neo4j + Mem0 + ChromaDB — нативные связи в графе")
 
+# Memory, модель эмбеддингов и клиенты общие для всех сессий процесса:
+# первый запуск прогревает их в фоне, последующие ничего не делают
+warm_up(background=True)
+
 # === Инициализация сессии ===
-if 'agent' not in st.session_state:
-    st.session_state.agent = Mem0Agent(user_id="user_1")
+if 'user_id' not in st.session_state:
+    st.session_state.user_id = DEFAULT_USER_ID
+user_id = st.session_state.user_id.strip() or DEFAULT_USER_ID
+agent = st.session_state.get('agent')
+if agent is None or agent.user_id != user_id:
+    # агенты пользователей общие для всех сессий процесса (см. mem0_graph/tenants.py)
+    with st.spinner("Загружаю модель и подключаюсь к хранилищам..."):
+        st.session_state.agent = get_agent(user_id)
+    if agent is not None:
+        # сменился пользователь: чат и состояние графа относились к прежнему
+        st.session_state.messages = []
+        for key in ("ego_edges", "expanded_clusters"):
+            st.session_state.pop(key, None)
 if 'graph_viz' not in st.session_state:
-    st.session_state.graph_viz = Neo4jGraphViz()
+    # аналитика общая с агентом: PageRank и сообщества считаются один раз на версию графа
+    st.session_state.graph_viz = Neo4jGraphViz(
+        **GRAPH_QUERY, analytics=st.session_state.agent.analytics
+    )
+    st.session_state.graph_viz.ensure_schema()
 if 'messages' not in st.session_state:
     st.session_state.messages = []
 
 # === Функции ===
-def process_uploaded_file(uploaded_file):
-    """Обработка загруженного файла"""
+def process_uploaded_file(uploaded_file, resync=False):
+    """Обработка загруженного файла: страницы потоком уходят в память агента"""
     try:
-        text = ""
-        if uploaded_file.type == "application/pdf":
-            reader = PyPDF2.PdfReader(uploaded_file)
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-        elif uploaded_file.type == "text/plain":
-            stringio = StringIO(uploaded_file.getvalue().decode("utf-8"))
-            text = stringio.read()
-        
-        if text:
-            with st.spinner("Добавляю содержимое документа в память..."):
-                st.session_state.agent.add_memory(text, metadata={"source": uploaded_file.name})
-            st.success(f"✅ Файл '{uploaded_file.name}' успешно обработан!")
-        else:
+        progress = st.progress(0.0, text="Добавляю содержимое документа в память...")
+
+        def on_progress(done, total, item):
+            if total:
+                progress.progress(done / total, text=f"Обработано частей: {done}/{total}")
+            else:
+                progress.progress(0.0, text=f"Обработано частей: {done}")
+
+        with st.spinner("Добавляю содержимое документа в память..."):
+            report = st.session_state.agent.add_document(
+                uploaded_file,
+                filename=uploaded_file.name,
+                mime_type=uploaded_file.type,
+                metadata={"source": uploaded_file.name},
+                on_progress=on_progress,
+                resync=resync,
+            )
+        progress.empty()
+
+        if not report["total"]:
             st.warning("Файл пуст или не удалось извлечь текст.")
+        elif report["failed"]:
+            st.warning(
+                f"Файл '{uploaded_file.name}' обработан частично: "
+                f"{report['succeeded']} из {report['total']} частей, ошибок: {report['failed']}"
+            )
+            with st.expander("Ошибки загрузки"):
+                st.json(
+                    [{"chunk": f["index"], "attempts": f["attempts"], "error": f["error"]}
+                     for f in report["failures"]]
+                )
+        else:
+            st.success(f"✅ Файл '{uploaded_file.name}' успешно обработан!")
+
+        if report["skipped"] or report["removed"]:
+            st.caption(
+                f"Пропущено уже загруженных частей: {report['skipped']}, "
+                f"удалено устаревших воспоминаний: {report['removed']}"
+            )
             
     except Exception as e:
         st.error(f"Ошибка при обработке файла: {e}")
@@ -45,21 +88,32 @@ def process_uploaded_file(uploaded_file):
 # === Боковая панель ===
 with st.sidebar:
     st.header("⚙️ Управление")
+    st.text_input("Пользователь", key="user_id", help="user_id, чья память показывается и пополняется")
     
     # Загрузка документов
     st.subheader("📂 Загрузка документов")
-    uploaded_file = st.file_uploader("Загрузить файл (TXT, PDF)", type=["txt", "pdf"])
+    uploaded_file = st.file_uploader(
+        "Загрузить файл (TXT, PDF, DOCX)", type=supported_extensions()
+    )
     if uploaded_file is not None:
+        resync = st.checkbox(
+            "Пересинхронизировать документ",
+            help="Добавить только новые/изменённые части и удалить воспоминания исчезнувших частей",
+        )
         if st.button("Обработать файл"):
-            process_uploaded_file(uploaded_file)
+            process_uploaded_file(uploaded_file, resync=resync)
             
     st.divider()
     
     # Статистика
     st.subheader("📊 Статистика")
-    memories = st.session_state.agent.get_all_memories()
-    count = len(memories) if memories else 0
-    st.metric("Воспоминаний", count)
+    st.metric("Воспоминаний", st.session_state.agent.count_memories())
+    cache_stats = st.session_state.agent.search_cache.stats()
+    st.caption(
+        f"Кеш поиска: {cache_stats['size']}/{cache_stats['max_entries']} записей, "
+        f"попаданий {cache_stats['hits']} (похожих {cache_stats['semantic_hits']}), "
+        f"промахов {cache_stats['misses']}"
+    )
     
     # Статус подключения
     try:
@@ -68,6 +122,12 @@ with st.sidebar:
         st.metric("Neo4j", f"{status_color} {'Подключено' if is_connected else 'Ошибка'}")
     except:
         st.metric("Neo4j", "🔴 Ошибка")
+    pool_stats = st.session_state.graph_viz.pool.metrics()
+    st.caption(
+        f"Пул Neo4j: {pool_stats.get('pool_in_use', '?')}/{pool_stats.get('pool_connections', '?')} "
+        f"соединений занято (максимум {pool_stats['max_pool_size']}), "
+        f"ошибок {pool_stats['failures']}"
+    )
         
     st.divider()
     
@@ -88,7 +148,7 @@ with st.sidebar:
             st.rerun()
 
 # === Основная область: Вкладки ===
-tab_chat, tab_graph = st.tabs(["💬 Чат с агентом", "🕸️ Граф знаний"])
+tab_chat, tab_graph, tab_diag = st.tabs(["💬 Чат с агентом", "🕸️ Граф знаний", "📈 Диагностика"])
 
 # --- Вкладка 1: Чат ---
 with tab_chat:
@@ -106,53 +166,212 @@ with tab_chat:
         with st.chat_message("user"):
             st.write(prompt)
             
-        # Получаем ответ агента
+        # Получаем ответ агента (выводится по мере генерации) через очередь пользователя:
+        # сессии и пользователи делят пул потоков, один не может занять его целиком
         with st.chat_message("assistant"):
-            with st.spinner("Думаю и обновляю граф..."):
-                response = st.session_state.agent.chat(prompt)
-                st.write(response)
-                st.session_state.messages.append({"role": "assistant", "content": response})
+            try:
+                stream = get_service().chat_stream(user_id, prompt)
+            except TenantBusy:
+                st.warning("Слишком много запросов, попробуйте чуть позже.")
+                st.stop()
+            response = st.write_stream(stream)
+            st.session_state.messages.append({"role": "assistant", "content": response})
+            # статистика этого ответа, а не последнего ответа общего агента
+            stats = stream.context_stats
+            if stats:
+                caption = (
+                    f"Контекст: {stats['items']} из {stats['candidates']} воспоминаний, "
+                    f"{stats['tokens']}/{stats['budget']} токенов"
+                )
+                graph = stats.get("graph")
+                if graph and graph["facts"]:
+                    caption += (
+                        f"; из графа: {graph['facts']} фактов, {graph['tokens']} токенов, "
+                        f"{graph['seconds'] * 1000:.0f} мс"
+                    )
+                st.caption(caption)
 
 # --- Вкладка 2: Граф ---
 with tab_graph:
     col_ctrl, col_view = st.columns([1, 4])
+    graph_viz = st.session_state.graph_viz
     
     with col_ctrl:
         st.subheader("Управление графом")
-        if st.button("🔄 Обновить граф", type="primary", use_container_width=True):
-            st.session_state.graph_updated = True
+        mode = st.radio("Режим", ["Весь граф", "Окрестность узла"], horizontal=True)
+
+        if mode == "Весь граф":
+            if st.button("🔄 Обновить граф", type="primary", use_container_width=True):
+                st.session_state.graph_updated = True
+
+            view = graph_viz.last_view
+            if view and view["summarized"]:
+                # большой граф показан кластерами: выбранные раскрываются по узлам
+                clusters = {c["id"]: f"{c['label']} — {c['size']} узлов" for c in view["clusters"]}
+                st.session_state.expanded_clusters = [
+                    c for c in st.session_state.get("expanded_clusters", []) if c in clusters
+                ]
+                st.multiselect(
+                    "Раскрыть кластеры",
+                    list(clusters),
+                    format_func=clusters.get,
+                    key="expanded_clusters",
+                    on_change=lambda: st.session_state.update(graph_updated=True),
+                )
+        else:
+            prefix = st.text_input("Найти узел по имени")
+            try:
+                matches = graph_viz.find_nodes(user_id, prefix) if prefix else []
+                all_types = graph_viz.relation_types()
+            except Exception as e:
+                st.error(f"Neo4j недоступен: {e}")
+                matches, all_types = [], []
+            seed = st.selectbox(
+                "Стартовый узел",
+                matches,
+                format_func=lambda node: f"{node['name']} {node['labels']}",
+            )
+            depth = st.slider("Глубина", 1, 3, 1)
+            fanout = st.slider("Связей на узел", 5, 100, graph_viz.fanout, step=5)
+            types = st.multiselect("Типы связей", all_types)
+
+            if seed and st.button("Показать окрестность", type="primary", use_container_width=True):
+                records = graph_viz.get_neighbourhood(
+                    user_id, [seed["id"]], depth=depth, fanout=fanout, relation_types=types
+                )
+                st.session_state.ego_edges = {r["rel_id"]: r for r in records}
+
+            ego_edges = st.session_state.get("ego_edges")
+            if ego_edges:
+                # PyVis не передаёт клики обратно в Streamlit — узел для раскрытия выбирается здесь
+                nodes = graph_nodes(ego_edges.values())
+                target = st.selectbox(
+                    "Раскрыть узел", list(nodes), format_func=lambda node_id: nodes[node_id]
+                )
+                if st.button("➕ Раскрыть", use_container_width=True):
+                    for record in graph_viz.expand(user_id, [target], fanout, types):
+                        ego_edges.setdefault(record["rel_id"], record)
+                if st.button("Сбросить", use_container_width=True):
+                    st.session_state.ego_edges = {}
             
+        with st.expander("📊 Аналитика графа"):
+            analysis = graph_viz.analysis(user_id)
+            if analysis is None or not analysis.node_count:
+                st.caption("Нет данных")
+            else:
+                stats = analysis.stats()
+                st.caption(
+                    f"Узлов: {stats['nodes']}, связей: {stats['edges']}, "
+                    f"компонент: {stats['components']}, сообществ: {stats['communities']}"
+                )
+                st.markdown("**Хабы (PageRank):**")
+                for hub in analysis.hubs(5):
+                    st.markdown(f"- {hub['name']} — {hub['pagerank']:.3f}, связей {hub['degree']}")
+                if analysis.orphans:
+                    st.markdown(f"**Без связей ({len(analysis.orphans)}):** "
+                                + ", ".join(str(o["name"]) for o in analysis.orphans[:10]))
+
         st.info("""
         **Легенда:**
-        - 🔵 **User**: Пользователь
-        - 🟠 **Entity**: Сущности
-        - 🟢 **Memory**: Воспоминания
+        - размер узла — PageRank (насколько сущность центральна)
+        - цвет узла — сообщество (группа тесно связанных сущностей)
+        - супер-узлы — свёрнутые кластеры большого графа
         """)
             
     with col_view:
-        if st.session_state.get('graph_updated', False) or st.button("Показать граф"):
+        if mode == "Окрестность узла":
+            ego_edges = st.session_state.get("ego_edges")
+            if ego_edges:
+                try:
+                    html = graph_viz.render_html(list(ego_edges.values()), user_id=user_id)
+                    st.components.v1.html(html, height=700)
+                    st.caption(f"Связей на экране: {len(ego_edges)}")
+                except Exception as e:
+                    st.error(f"Ошибка визуализации: {e}")
+            else:
+                st.info("Выберите стартовый узел слева.")
+
+        elif st.session_state.get('graph_updated', False) or st.button("Показать граф"):
             with st.spinner("Строю граф..."):
                 try:
-                    filename = st.session_state.graph_viz.save_graph(
-                        user_id="user_1", 
-                        filename="knowledge_graph.html"
-                    )
+                    expanded = st.session_state.get("expanded_clusters", [])
+                    html = graph_viz.graph_html(user_id=user_id, expanded=expanded)
                     
-                    if filename and os.path.exists(filename):
-                        with open(filename, "r", encoding="utf-8") as f:
-                            st.components.v1.html(f.read(), height=700)
+                    if html:
+                        # HTML строится в памяти сессии: общий файл на диске не нужен
+                        st.components.v1.html(html, height=700)
+                        stats = graph_viz.last_view["stats"]
+                        st.caption(
+                            f"Показано узлов: {stats['shown_nodes']} из {stats['nodes']}, "
+                            f"связей: {stats['shown_edges']} (из {stats['edges']})"
+                        )
+                        st.download_button(
+                            "⬇️ Граф в JSON (gzip)",
+                            graph_viz.graph_payload(user_id=user_id, expanded=expanded),
+                            file_name="knowledge_graph.json.gz",
+                            mime="application/gzip",
+                        )
                     else:
                         st.warning("Граф пока пуст.")
                 except Exception as e:
                     st.error(f"Ошибка визуализации: {e}")
             st.session_state.graph_updated = False
 
-# === Нижняя панель: отладка ===
+# === Вкладка 3: Диагностика ===
+with tab_diag:
+    # замеры общие для процесса: все сессии и пользователи
+    telemetry = st.session_state.agent.telemetry
+    st.subheader("Задержка по этапам")
+    stages = telemetry.summary()
+    if stages:
+        st.dataframe(
+            [
+                {
+                    "этап": stage,
+                    "вызовов": stat["calls"],
+                    "ошибок": stat["errors"],
+                    "p50, мс": round(stat["p50"], 1),
+                    "p95, мс": round(stat["p95"], 1),
+                    "среднее, мс": round(stat["mean"], 1),
+                    "максимум, мс": round(stat["max"], 1),
+                }
+                for stage, stat in stages.items()
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
+    else:
+        st.info("Замеров пока нет — задайте вопрос агенту или откройте граф.")
+
+    col_prompt, col_completion, col_cost, col_errors = st.columns(4)
+    col_prompt.metric("Токенов запроса", int(telemetry.total("llm_tokens_total", kind="prompt")))
+    col_completion.metric("Токенов ответа", int(telemetry.total("llm_tokens_total", kind="completion")))
+    col_cost.metric("Стоимость, $", f"{telemetry.total('llm_cost_usd_total'):.4f}")
+    col_errors.metric("Ошибок", int(telemetry.total("errors_total")))
+
+    col_download, col_reset = st.columns(2)
+    col_download.download_button(
+        "Метрики Prometheus",
+        telemetry.prometheus_text(),
+        file_name="mem0graph_metrics.txt",
+        mime="text/plain",
+    )
+    if col_reset.button("Сбросить замеры"):
+        telemetry.reset()
+        st.rerun()
+
 with st.expander("🗄️ Сырые данные из Mem0"):
-    memories = st.session_state.agent.get_all_memories()
+    # читается только показанная страница; до следующей записи в память — из кеша
+    page_size = 10
+    total = st.session_state.agent.count_memories()
+    pages = max(1, -(-total // page_size))
+    page = st.number_input("Страница", min_value=1, max_value=pages, value=1, step=1)
+    memories = st.session_state.agent.list_memories(page - 1, page_size)
     if memories:
+        first = (page - 1) * page_size + 1
+        st.caption(f"Воспоминания {first}–{first + len(memories) - 1} из {total}")
         preview = []
-        for m in memories[:10]:
+        for m in memories:
             if isinstance(m, dict):
                 preview.append(
                     {
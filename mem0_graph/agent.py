@@ -1,24 +1,99 @@
-from mem0 import Memory
-from .config import MEM0_CONFIG
-import openai
-import os
-from dotenv import load_dotenv
+import time
 
-load_dotenv()
+from .config import (
+    CHAT_MODEL, INGEST_INDEX_PATH, CHUNKING, SEARCH_CACHE, WRITE_BEHIND,
+    HYBRID_SEARCH, CONTEXT, MEMORY_LISTING, GRAPH_ANALYTICS, GRAPH_RERANK_WEIGHT, GRAPH_RETRIEVAL,
+)
+from .analytics import get_graph_analytics, rerank
+from .cache import get_search_cache
+from .chunking import ParagraphChunker, get_chunker
+from .context import ContextBuilder
+from .dedup import get_chunk_index
+from .graph_retrieval import GraphExpander, SearchResults, normalize_relations
+from .hybrid import get_hybrid_retriever
+from .watermark import get_watermarks, has_deletions
+from .ingest import IngestPipeline
+from .listing import get_memory_listing
+from .loaders import iter_document
+from .resources import get_chat_client, get_memory
+from .telemetry import get_telemetry, log_error
+from .writeback import get_write_queue
+
+
+def _on_write_applied(user_id, result):
+    """Фоновая запись применена: обновляем кеш поиска, BM25-индекс и водяной знак."""
+    get_search_cache().invalidate(user_id)
+    # неудачная запись могла оставить граф в промежуточном состоянии
+    get_watermarks().bump(user_id, full=result is None or has_deletions(result))
+    if result is not None:
+        get_hybrid_retriever().apply_add_result(user_id, result)
+
+
+class ChatReply(str):
+    """Ответ агента (строка) со статистикой собранного для него контекста в `context_stats`."""
+
+    def __new__(cls, answer, context_stats=None):
+        reply = super().__new__(cls, answer)
+        reply.context_stats = context_stats
+        return reply
+
+
+class ChatStream:
+    """Фрагменты потокового ответа агента.
+
+    `context_stats` заполняется до первого фрагмента. Статистика хранится
+    в самом потоке, а не в агенте: агента делят все сессии пользователя.
+    """
+
+    def __init__(self, fragments):
+        self.context_stats = None
+        # генератору фрагментов передаётся поток, чтобы он записал статистику
+        self._fragments = fragments(self)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._fragments)
+
+    def close(self):
+        self._fragments.close()
 
 
 class Mem0Agent:
-    def __init__(self, user_id="user_1"):
+    def __init__(self, user_id="user_1", memory=None, client=None):
         self.user_id = user_id
-        # Mem0 подхватит OPENAI_BASE_URL и OPENROUTER_API_KEY из среды
-        self.memory = Memory.from_config(MEM0_CONFIG)
-        
-        # Клиент для чата (явно указываем для надежности)
-        self.client = openai.OpenAI(
-            api_key=os.getenv("OPENROUTER_API_KEY"),
-            base_url=os.getenv("OPENAI_BASE_URL", "https://openrouter.ai/api/v1")
+        # по умолчанию Memory общая для процесса (см. resources.py);
+        # свой `memory` можно передать, например, в тестах
+        if memory is None:
+            memory = get_memory()
+        self.memory = memory
+        # индекс загруженных чанков: повторная загрузка не тратит вызовы модели
+        self.chunk_index = get_chunk_index(INGEST_INDEX_PATH)
+        self.chunker = get_chunker(**CHUNKING)
+        self.search_cache = get_search_cache(**SEARCH_CACHE)
+        # страницы и число воспоминаний для интерфейса, кеш по версии записей
+        self.listing = get_memory_listing(**MEMORY_LISTING)
+        self.context_builder = ContextBuilder(**CONTEXT)
+        self.retriever = get_hybrid_retriever(
+            bm25_k=HYBRID_SEARCH["bm25_k"], rrf_k=HYBRID_SEARCH["rrf_k"]
+        )
+        # центральность сущностей графа (PageRank) для переранжирования воспоминаний
+        self.analytics = get_graph_analytics(**GRAPH_ANALYTICS)
+        # факты из окрестности найденных сущностей добавляются в контекст
+        graph_retrieval = dict(GRAPH_RETRIEVAL)
+        self.graph_expansion = graph_retrieval.pop("enabled")
+        self.graph_expander = GraphExpander(**graph_retrieval)
+        # запись диалога в память идёт в фоне; после применения обновляются кеш и BM25
+        self.writer = get_write_queue(
+            self.memory, on_applied=_on_write_applied, **WRITE_BEHIND
         )
 
+        # клиент чата тоже общий для процесса
+        self.client = client or get_chat_client()
+        # замеры этапов, токены и стоимость (см. telemetry.py)
+        self.telemetry = get_telemetry()
+
     def _normalize_results(self, result):
         """Приводит ответы Mem0 (list/dict) к единому формату."""
         if not result:
@@ -59,118 +134,418 @@ class Mem0Agent:
 
         return normalized
 
-    def _chunk_text(self, text, max_chunk_size=2000):
-        """Грубое разбиение длинного текста на части для более удобной индексации."""
+    def _get_chunker(self, max_chunk_size=None):
+        """Чанкер из конфига; явный `max_chunk_size` включает прежнее разбиение по символам."""
+        if max_chunk_size:
+            return ParagraphChunker(max_chars=max_chunk_size)
+        return self.chunker
+
+    def _iter_chunks(self, segments, max_chunk_size=None):
+        """Генератор чанков из потока текстовых сегментов (страниц, абзацев)."""
+        return self._get_chunker(max_chunk_size).chunks(segments)
+
+    def _chunk_text(self, text, max_chunk_size=None):
+        """Разбиение длинного текста на части для более удобной индексации."""
         if not text:
             return []
+        return list(self._iter_chunks([text], max_chunk_size=max_chunk_size))
 
-        paragraphs = text.split("\n\n")
-        chunks = []
-        current = ""
+    def _on_memory_changed(self, full=False):
+        """Вызывается после любой записи в память пользователя.
 
-        for paragraph in paragraphs:
-            p = paragraph.strip()
-            if not p:
-                continue
+        `full=True` — были удаления, инкрементально обновляемые кеши должны перечитать всё.
+        """
+        self.search_cache.invalidate(self.user_id)
+        get_watermarks().bump(self.user_id, full=full)
 
-            # если текущий чанк ещё помещается — добавляем
-            if current and len(current) + len(p) + 2 <= max_chunk_size:
-                current = f"{current}\n\n{p}"
-            elif not current and len(p) <= max_chunk_size:
-                current = p
-            else:
-                # сохраняем текущий и начинаем новый / дробим слишком длинный абзац
-                if current:
-                    chunks.append(current)
-                    current = ""
+    def search(self, query):
+        """Поиск по памяти через семантический кеш.
 
-                if len(p) <= max_chunk_size:
-                    current = p
-                else:
-                    # очень длинный абзац режем по длине
-                    for i in range(0, len(p), max_chunk_size):
-                        chunks.append(p[i : i + max_chunk_size])
+        Нормализованные результаты; связи графа из ответа Mem0 — в `.relations`.
+        """
+        with self.telemetry.span("search", user_id=self.user_id) as span:
+            # запись, применённая во время поиска, делает его результат устаревшим
+            version = get_watermarks().get(self.user_id)[0]
+            cached = self.search_cache.get_exact(self.user_id, query)
+            if cached is not None:
+                span["cache"] = "exact"
+                return cached
 
-        if current:
-            chunks.append(current)
+            # тот же вектор Mem0 возьмёт при промахе (см. cache.QueryEmbeddings)
+            with self.telemetry.span("search.embedding"):
+                embedding = self.memory.embedding_model.embed(query, "search")
+            cached = self.search_cache.get(self.user_id, query, embedding)
+            if cached is not None:
+                span["cache"] = "semantic"
+                return cached
 
-        return chunks
+            span["cache"] = "miss"
+            with self.telemetry.span("search.mem0"):
+                raw = self.memory.search(query, user_id=self.user_id)
+            results = SearchResults(self._normalize_results(raw), normalize_relations(raw))
+            if get_watermarks().get(self.user_id)[0] == version:
+                self.search_cache.put(self.user_id, query, embedding, results)
+            return results
 
-    def chat(self, message):
-        """Диалог с агентом"""
+    def _memory_embeddings(self, memory_ids):
+        """Уже посчитанные эмбеддинги воспоминаний из векторного хранилища (Chroma)."""
+        ids = [i for i in memory_ids if i]
+        collection = getattr(self.memory.vector_store, "collection", None)
+        if not ids or collection is None:
+            return {}
         try:
-            raw_relevant = self.memory.search(message, user_id=self.user_id)
-            relevant = self._normalize_results(raw_relevant)
+            with self.telemetry.span("chroma.embeddings"):
+                found = collection.get(ids=ids, include=["embeddings"])
         except Exception as e:
-            print(f"[Mem0Agent.chat] search error: {e}")
-            relevant = []
+            log_error("Mem0Agent._memory_embeddings", e, user_id=self.user_id)
+            return {}
+        vectors = found.get("embeddings")
+        if vectors is None:
+            return {}
+        return {i: [float(x) for x in v] for i, v in zip(found["ids"], vectors)}
 
-        context_parts = []
-        for m in relevant:
-            text = m.get("memory")
-            if not text:
-                continue
-            meta = m.get("metadata") or {}
-            source = meta.get("source")
-            prefix = f"[source: {source}] " if source else ""
-            context_parts.append(f"- {prefix}{text}")
+    def _graph_facts(self, relevant, relations, analysis=None):
+        """Факты из окрестности сущностей, найденных поиском: `(строки, статистика)`."""
+        if not relevant and not relations:
+            return [], None
+        entity_names = analysis.entity_names() if analysis is not None else None
+        try:
+            with self.telemetry.span("graph.expand"):
+                return self.graph_expander.expand(self.user_id, relevant, relations, entity_names)
+        except Exception as e:
+            log_error("Mem0Agent._graph_facts", e, user_id=self.user_id)
+            return [], None
+
+    def _build_context(self, relevant, relations=(), analysis=None):
+        """Контекст для промпта: MMR-отбор в бюджет токенов с группировкой по источнику
+        и факты из графа знаний в пределах своего бюджета (`analysis` — метрики графа
+        для поиска сущностей в тексте воспоминаний).
+
+        Возвращает `(контекст, статистика)`: токены, число воспоминаний, факты графа.
+        """
+        embeddings = self._memory_embeddings([m.get("id") for m in relevant])
+        with self.telemetry.span("context"):
+            context, stats = self.context_builder.build(relevant, embeddings=embeddings)
+        if self.graph_expansion:
+            lines, stats["graph"] = self._graph_facts(relevant, relations, analysis)
+            if lines:
+                facts = "Связи из графа знаний:\n" + "\n".join(lines)
+                context = f"{context}\n\n{facts}" if context else facts
+        return context, stats
 
-        # ограничиваем количество воспоминаний в контексте
-        context = "\n".join(context_parts[:10])
+    def _build_messages(self, message, context):
+        return [
+            {
+                "role": "system",
+                "content": (
+                    "Ты умный ассистент. "
+                    "Используй контекст воспоминаний пользователя, если он релевантен.\n\n"
+                    f"Контекст:\n{context}"
+                ),
+            },
+            {"role": "user", "content": message},
+        ]
 
+    def _remember_turn(self, message, answer):
+        """Ставит реплику пользователя и ответ агента в фоновую очередь записи
+        одним заданием: Mem0 извлечёт факты за один вызов `add`."""
         try:
-            response = self.client.chat.completions.create(
-                model="openai/gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "Ты умный ассистент. "
-                            "Используй контекст воспоминаний пользователя, если он релевантен.\n\n"
-                            f"Контекст:\n{context}"
-                        ),
-                    },
+            self.writer.enqueue(
+                self.user_id,
+                [
                     {"role": "user", "content": message},
+                    {"role": "assistant", "content": answer},
                 ],
             )
-            answer = response.choices[0].message.content
         except Exception as e:
-            print(f"[Mem0Agent.chat] llm error: {e}")
-            return f"Произошла ошибка при обращении к модели: {e}"
+            log_error("Mem0Agent._remember_turn", e, user_id=self.user_id)
+
+    def flush_writes(self, timeout=None):
+        """Дождаться фоновой записи диалога пользователя в память."""
+        return self.writer.flush(self.user_id, timeout=timeout)
+
+    def _ensure_keyword_index(self):
+        """Первый гибридный поиск пользователя строит BM25-индекс из всех его воспоминаний;
+        дальше индекс обновляется по результатам записей."""
+        if self.retriever.is_loaded(self.user_id):
+            return
+        with self.telemetry.span("search.bm25_load"):
+            raw = self.memory.get_all(user_id=self.user_id, limit=HYBRID_SEARCH["max_documents"])
+            self.retriever.load(self.user_id, self._normalize_results(raw))
+
+    def _load_keyword_index(self):
+        """True, если гибридный поиск включён и BM25-индекс пользователя готов."""
+        if not HYBRID_SEARCH["enabled"]:
+            return False
+        try:
+            self._ensure_keyword_index()
+            return True
+        except Exception as e:
+            log_error("Mem0Agent._retrieve", e, user_id=self.user_id)
+            return False
+
+    def _retrieve(self, message):
+        """Воспоминания для контекста: векторный поиск, при включённом гибридном
+        режиме — слитый через RRF с BM25; не больше `HYBRID_SEARCH["top_k"]`."""
+        vector_results = self.search(message)
+        return self._fuse(message, vector_results, self._load_keyword_index())
+
+    def _fuse(self, message, vector_results, keyword_ready):
+        """Слияние векторных результатов с BM25 (если индекс готов), не больше `top_k`."""
+        top_k = HYBRID_SEARCH["top_k"]
+        relations = getattr(vector_results, "relations", ())
+        if not keyword_ready:
+            return SearchResults(vector_results[:top_k], relations)
+        with self.telemetry.span("search.bm25"):
+            fused = self.retriever.search(self.user_id, message, vector_results, top_k=top_k)
+        return SearchResults(fused, relations)
+
+    def _graph_analysis(self):
+        """Последние готовые метрики графа (None, пока их нет); пересчёт идёт в фоне."""
+        try:
+            with self.telemetry.span("graph.analytics"):
+                return self.analytics.latest(self.user_id)
+        except Exception as e:
+            log_error("Mem0Agent._graph_analysis", e, user_id=self.user_id)
+            return None
+
+    def _needs_graph_analysis(self):
+        """Метрики графа нужны для переранжирования или расширения контекста."""
+        return bool(GRAPH_RERANK_WEIGHT) or self.graph_expansion
+
+    def _rerank_by_graph(self, relevant, analysis):
+        """Поднимает воспоминания о центральных (по PageRank) сущностях графа пользователя."""
+        if analysis is None or not GRAPH_RERANK_WEIGHT or len(relevant) < 2:
+            return relevant
+        return rerank(relevant, analysis.entity_scores(), weight=GRAPH_RERANK_WEIGHT)
+
+    def _prepare_messages(self, message, caller="Mem0Agent.chat"):
+        """Поиск по памяти и сборка сообщений для модели: `(сообщения, статистика контекста)`."""
+        try:
+            with self.telemetry.span("retrieve"):
+                relevant = self._retrieve(message)
+        except Exception as e:
+            log_error(caller, e, stage="search", user_id=self.user_id)
+            relevant = []
 
-        # сохраняем диалог в память
+        analysis = None
+        if (relevant or getattr(relevant, "relations", ())) and self._needs_graph_analysis():
+            analysis = self._graph_analysis()
+        return self._compose(message, relevant, analysis)
+
+    def _compose(self, message, relevant, analysis):
+        """Переранжирование по графу и сборка контекста: `(сообщения, статистика контекста)`."""
+        relations = getattr(relevant, "relations", ())
+        relevant = self._rerank_by_graph(relevant, analysis)
+        context, stats = self._build_context(relevant, relations, analysis)
+        return self._build_messages(message, context), stats
+
+    def chat(self, message):
+        """Диалог с агентом: `ChatReply` — ответ и статистика его контекста."""
+        with self.telemetry.span("chat", user_id=self.user_id):
+            messages, stats = self._prepare_messages(message)
+
+            try:
+                with self.telemetry.span("llm", model=CHAT_MODEL) as span:
+                    response = self.client.chat.completions.create(
+                        model=CHAT_MODEL,
+                        messages=messages,
+                    )
+                    answer = response.choices[0].message.content
+                    span["prompt_tokens"], span["completion_tokens"] = (
+                        self.telemetry.record_llm_usage(
+                            CHAT_MODEL, getattr(response, "usage", None), messages, answer
+                        )
+                    )
+            except Exception as e:
+                log_error("Mem0Agent.chat", e, stage="llm", user_id=self.user_id)
+                return ChatReply(f"Произошла ошибка при обращении к модели: {e}", stats)
+
+            # сохраняем диалог в память
+            self._remember_turn(message, answer)
+
+            return ChatReply(answer, stats)
+
+    def chat_stream(self, message):
+        """Диалог с потоковой выдачей: `ChatStream` с фрагментами ответа по мере генерации.
+
+        Диалог сохраняется в память только после того, как поток дочитан до конца.
+        """
+        return ChatStream(lambda reply: self._stream(message, reply))
+
+    def _stream(self, message, reply):
+        messages, reply.context_stats = self._prepare_messages(
+            message, caller="Mem0Agent.chat_stream"
+        )
+
+        # спан не охватывает yield: генератор могут дочитывать из другого контекста
+        parts = []
+        usage = None
+        started = time.perf_counter()
         try:
-            self.memory.add(message, user_id=self.user_id)
-            self.memory.add(answer, user_id=self.user_id)
+            stream = self.client.chat.completions.create(
+                model=CHAT_MODEL,
+                messages=messages,
+                stream=True,
+                # последний фрагмент принесёт число токенов
+                stream_options={"include_usage": True},
+            )
+            for chunk in stream:
+                usage = getattr(chunk, "usage", None) or usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if not parts:
+                        self.telemetry.observe("llm.first_token", time.perf_counter() - started)
+                    parts.append(delta)
+                    yield delta
         except Exception as e:
-            print(f"[Mem0Agent.chat] add error: {e}")
+            self.telemetry.observe("llm", time.perf_counter() - started, error=True)
+            log_error("Mem0Agent.chat_stream", e, stage="llm", user_id=self.user_id)
+            yield f"Произошла ошибка при обращении к модели: {e}"
+            return
 
-        return answer
+        answer = "".join(parts)
+        self.telemetry.observe("llm", time.perf_counter() - started)
+        self.telemetry.record_llm_usage(CHAT_MODEL, usage, messages, answer)
+        if answer:
+            self._remember_turn(message, answer)
 
     def get_all_memories(self):
         try:
             raw = self.memory.get_all(user_id=self.user_id)
         except Exception as e:
-            print(f"[Mem0Agent.get_all_memories] get_all error: {e}")
+            log_error("Mem0Agent.get_all_memories", e, user_id=self.user_id)
+            return []
+        return self._normalize_results(raw)
+
+    def list_memories(self, page=0, page_size=10):
+        """Страница воспоминаний (с нуля) без выгрузки всей памяти; кешируется до следующей записи."""
+        try:
+            raw = self.listing.page(self.memory, self.user_id, page, page_size)
+        except Exception as e:
+            log_error("Mem0Agent.list_memories", e, user_id=self.user_id)
             return []
         return self._normalize_results(raw)
 
+    def count_memories(self):
+        """Число воспоминаний пользователя; кешируется до следующей записи."""
+        try:
+            return self.listing.count(self.memory, self.user_id)
+        except Exception as e:
+            log_error("Mem0Agent.count_memories", e, user_id=self.user_id)
+            return 0
+
+    def iter_memories(self, batch_size=100):
+        """Генератор всех воспоминаний, читаемых из хранилища пачками по `batch_size`."""
+        for item in self.listing.iterate(self.memory, self.user_id, batch_size):
+            yield from self._normalize_results([item])
+
     def clear_memory(self):
         """Очистка всей памяти пользователя"""
         try:
+            # отложенные записи диалога не должны вернуть удалённое
+            self.writer.discard(self.user_id)
+            self.writer.flush(self.user_id)
             self.memory.delete_all(user_id=self.user_id)
+            self.chunk_index.clear(self.user_id)
+            self.retriever.reset(self.user_id)
         except Exception as e:
-            print(f"[Mem0Agent.clear_memory] delete_all error: {e}")
+            log_error("Mem0Agent.clear_memory", e, user_id=self.user_id)
+        finally:
+            self._on_memory_changed(full=True)
+
+    def _ingest(self, chunks, metadata=None, max_workers=4, retries=3, on_progress=None):
+        """Загружает чанки через IngestPipeline и логирует упавшие части."""
+        source = (metadata or {}).get("source")
+        pipeline = IngestPipeline(
+            self.memory, max_workers=max_workers, retries=retries, index=self.chunk_index
+        )
+        try:
+            with self.telemetry.span("add", user_id=self.user_id) as span:
+                report = pipeline.run(
+                    chunks, user_id=self.user_id, metadata=metadata,
+                    on_progress=on_progress, source=source,
+                )
+                span.update(chunks=report["total"], failed=report["failed"])
+        except Exception:
+            self._on_memory_changed(full=True)
+            raise
+        self._on_memory_changed(
+            full=bool(report["failed"])
+            or any(has_deletions(item["result"]) for item in report["results"])
+        )
+        for item in report["results"]:
+            if item["status"] == "ok":
+                self.retriever.apply_add_result(self.user_id, item["result"], metadata)
+        for failure in report["failures"]:
+            log_error(
+                "Mem0Agent._ingest", failure["error"], user_id=self.user_id, source=source,
+                chunk=failure["index"], attempts=failure["attempts"],
+            )
+        return report
 
-    def add_memory(self, text, metadata=None, max_chunk_size=2000):
-        """Добавить воспоминание вручную (например, из документа) с разбиением текста на части."""
+    def _remove_stale_chunks(self, source, report):
+        """Re-sync: удаляет воспоминания чанков, которых больше нет в документе."""
+        current = {r["hash"] for r in report["results"]}
+        stale = self.chunk_index.hashes(self.user_id, source) - current
+        removed = []
+        for digest in stale:
+            failed = []
+            for memory_id in self.chunk_index.memory_ids(self.user_id, source, digest):
+                try:
+                    self.memory.delete(memory_id)
+                    removed.append(memory_id)
+                except Exception as e:
+                    log_error("Mem0Agent._remove_stale_chunks", e, memory_id=memory_id)
+                    failed.append(memory_id)
+            # запись индекса уходит только вместе с воспоминаниями: неудалённые
+            # остаются в ней, и следующий re-sync попробует удалить их снова
+            if failed:
+                self.chunk_index.record(self.user_id, source, digest, failed)
+            else:
+                self.chunk_index.remove(self.user_id, source, digest)
+        self.retriever.remove(self.user_id, removed)
+        return len(removed)
+
+    def add_memory(self, text, metadata=None, max_chunk_size=None, max_workers=4,
+                   retries=3, on_progress=None):
+        """Добавить воспоминание вручную (например, из документа) с разбиением текста на части.
+
+        Чанки загружаются параллельно (`max_workers` потоков) с повторами при ошибках;
+        уже загруженные ранее чанки пропускаются.
+        Возвращает отчёт `IngestPipeline.run`: результаты и ошибки по каждому чанку.
+        """
         chunks = self._chunk_text(text, max_chunk_size=max_chunk_size)
-        results = []
-        for chunk in chunks:
-            try:
-                res = self.memory.add(chunk, user_id=self.user_id, metadata=metadata)
-                results.append(res)
-            except Exception as e:
-                print(f"[Mem0Agent.add_memory] add error: {e}")
-        return results
+        return self._ingest(
+            chunks, metadata=metadata, max_workers=max_workers,
+            retries=retries, on_progress=on_progress,
+        )
 
+    def add_document(self, source, filename=None, mime_type=None, metadata=None,
+                     max_chunk_size=None, max_workers=4, retries=3, on_progress=None,
+                     resync=False):
+        """Потоковая загрузка документа: страницы -> чанки -> Mem0 без сборки всего текста.
+
+        `source` — путь или бинарный файловый объект; тип определяется по MIME или расширению.
+        С `resync=True` добавляются только новые/изменённые чанки, а воспоминания
+        исчезнувших из документа чанков удаляются.
+        """
+        metadata = dict(metadata or {})
+        metadata.setdefault("source", filename or getattr(source, "name", None) or str(source))
+
+        segments = iter_document(source, filename=filename, mime_type=mime_type)
+        chunks = self._iter_chunks(segments, max_chunk_size=max_chunk_size)
+        report = self._ingest(
+            chunks, metadata=metadata, max_workers=max_workers,
+            retries=retries, on_progress=on_progress,
+        )
+        # пустой документ не трактуем как «все чанки исчезли»
+        report["removed"] = (
+            self._remove_stale_chunks(metadata["source"], report)
+            if resync and report["total"] else 0
+        )
+        if report["removed"]:
+            self._on_memory_changed(full=True)
+        return report
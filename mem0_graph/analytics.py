@@ -0,0 +1,546 @@
+"""
+Аналитика графа пользователя: степень, PageRank, сообщества, хабы и сироты.
+
+Граф читается из Neo4j постранично и только с нужными полями и сразу
+проецируется в целые номера узлов: массивы связей и списки соседей.
+Результаты хранятся по компонентам связности. После добавлений в память
+догружаются только новые связи, а PageRank и сообщества пересчитываются
+лишь в тех компонентах, которых эти связи коснулись. После удалений
+(см. watermark.py) граф перечитывается целиком.
+
+Агент не ждёт пересчёта: `GraphAnalytics.latest` отдаёт последний готовый
+результат (пусть слегка устаревший) и запускает обновление в фоне.
+
+PageRank считается по неориентированному графу (вес — число связей между
+парой узлов). У такого графа нет висячих узлов, поэтому PageRank распадается
+по компонентам: глобальное значение — локальное, умноженное на долю узлов
+компоненты.
+"""
+
+import copy
+import logging
+import math
+import threading
+import time
+from array import array
+
+from .graph_model import quote_label
+from .hybrid import tokenize
+from .telemetry import log_error, log_event
+from .watermark import get_watermarks
+
+# Проекция графа: только концы, имена и тип связи, страницами по elementId(r)
+PROJECTION_QUERY = """
+        MATCH (n:{label} {{user_id: $user_id}})-[r]->(m:{label} {{user_id: $user_id}})
+        WHERE elementId(r) > $after
+          AND ($since IS NULL OR r.created > $since)
+        RETURN elementId(r) as rel_id,
+               elementId(n) as source,
+               elementId(m) as target,
+               n.name as n_name,
+               m.name as m_name,
+               type(r) as relation,
+               r.created as created
+        ORDER BY rel_id
+        LIMIT $page_size
+"""
+
+# Узлы пользователя без единой связи
+ORPHANS_QUERY = """
+        MATCH (n:{label} {{user_id: $user_id}})
+        WHERE NOT (n)--()
+        RETURN elementId(n) as id, n.name as name
+        LIMIT $limit
+"""
+
+# Цвета сообществ (по номеру узла-представителя)
+COMMUNITY_COLORS = (
+    "#6366f1", "#f97316", "#22c55e", "#e11d48", "#0ea5e9", "#8b5cf6",
+    "#eab308", "#14b8a6", "#ec4899", "#84cc16", "#f43f5e", "#06b6d4",
+)
+
+
+def entity_key(name):
+    """Имя сущности для сопоставления с текстом: Mem0 пишет `john_doe`, в тексте — «John Doe»."""
+    return " ".join(tokenize(str(name).replace("_", " ")))
+
+
+def component_pagerank(members, neighbors, damping=0.85, tol=1e-6, max_iter=100):
+    """PageRank внутри одной компоненты: список значений в порядке `members` (сумма 1)."""
+    n = len(members)
+    if n == 1:
+        return [1.0]
+    local = {node: i for i, node in enumerate(members)}
+    adjacency = [[local[other] for other in neighbors[node]] for node in members]
+    degree = [len(adj) for adj in adjacency]
+    rank = [1.0 / n] * n
+    base = (1.0 - damping) / n
+    for _ in range(max_iter):
+        share = [rank[i] / degree[i] if degree[i] else 0.0 for i in range(n)]
+        # узел только с петлёй не отдаёт ранг соседям — распределяем его поровну
+        dangling = sum(rank[i] for i in range(n) if not degree[i]) / n
+        new = [
+            base + damping * (dangling + sum(share[j] for j in adjacency[i]))
+            for i in range(n)
+        ]
+        error = sum(abs(new[i] - rank[i]) for i in range(n))
+        rank = new
+        if error < n * tol:
+            break
+    return rank
+
+
+class GraphAnalysis:
+    """Проекция графа пользователя и посчитанные по ней метрики узлов.
+
+    Узлы нумеруются в порядке появления, номера не меняются при догрузке,
+    поэтому метрики нетронутых компонент остаются действительными.
+    """
+
+    def __init__(self, user_id, damping=0.85, resolution=1.0, seed=42):
+        self.user_id = user_id
+        self.damping = damping
+        self.resolution = resolution
+        self.seed = seed
+        self.node_ids = []
+        self.node_names = []
+        self.src = array("I")
+        self.dst = array("I")
+        self.neighbors = []  # номер узла -> array номеров соседей (с повторами = вес)
+        self.parent = array("I")  # система непересекающихся множеств по компонентам
+        self.members = {}  # корень компоненты -> номера её узлов
+        self.pagerank = array("d")  # PageRank внутри компоненты
+        self.community = array("I")  # номер узла-представителя сообщества
+        self.orphans = []  # узлы без связей: [{"id", "name"}]
+        self.version = None
+        self.full_version = None
+        self.max_created = None
+        self.fetched_at = 0.0
+        self.recomputed = 0  # сколько компонент пересчитано при последнем обновлении
+        self.truncated = False  # проекция упёрлась в max_edges
+        self._node_index = {}
+        self._relation_index = {}
+        self._edge_index = set()
+        self._touched = set()
+        self._derived = None
+
+    @property
+    def node_count(self):
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self):
+        return len(self.src)
+
+    def _intern(self, node_id, name):
+        index = self._node_index.get(node_id)
+        if index is None:
+            index = self._node_index[node_id] = len(self.node_ids)
+            self.node_ids.append(node_id)
+            self.node_names.append(str(name or node_id))
+            self.neighbors.append(array("I"))
+            self.parent.append(index)
+            self.members[index] = [index]
+            self.pagerank.append(1.0)
+            self.community.append(index)
+        return index
+
+    def copy(self):
+        """Независимая копия для догрузки: опубликованный результат в это время читают запросы."""
+        clone = copy.copy(self)
+        clone.node_ids = list(self.node_ids)
+        clone.node_names = list(self.node_names)
+        clone.src = array("I", self.src)
+        clone.dst = array("I", self.dst)
+        clone.neighbors = [array("I", adjacency) for adjacency in self.neighbors]
+        clone.parent = array("I", self.parent)
+        clone.members = {root: list(members) for root, members in self.members.items()}
+        clone.pagerank = array("d", self.pagerank)
+        clone.community = array("I", self.community)
+        clone.orphans = list(self.orphans)
+        clone._node_index = dict(self._node_index)
+        clone._relation_index = dict(self._relation_index)
+        clone._edge_index = set(self._edge_index)
+        clone._touched = set(self._touched)
+        return clone
+
+    def _find(self, index):
+        parent = self.parent
+        root = index
+        while parent[root] != root:
+            root = parent[root]
+        while parent[index] != root:
+            parent[index], index = root, parent[index]
+        return root
+
+    def _union(self, a, b):
+        a, b = self._find(a), self._find(b)
+        if a == b:
+            return
+        if len(self.members[a]) < len(self.members[b]):
+            a, b = b, a
+        self.parent[b] = a
+        self.members[a].extend(self.members.pop(b))
+
+    def add_record(self, record):
+        """Добавить связь из записи PROJECTION_QUERY; повтор возвращает False."""
+        s = self._intern(record["source"], record["n_name"])
+        t = self._intern(record["target"], record["m_name"])
+        relation = record["relation"] or "related"
+        rel = self._relation_index.setdefault(relation, len(self._relation_index))
+        key = (s << 64) | (t << 32) | rel
+        if key in self._edge_index:
+            return False
+        self._edge_index.add(key)
+        self.src.append(s)
+        self.dst.append(t)
+        if s != t:
+            self.neighbors[s].append(t)
+            self.neighbors[t].append(s)
+            self._union(s, t)
+        self._touched.update((s, t))
+        created = record.get("created")
+        if created is not None and (self.max_created is None or created > self.max_created):
+            self.max_created = created
+        return True
+
+    def refresh(self):
+        """Пересчитать метрики компонент, в которые попали новые связи."""
+        roots = {self._find(index) for index in self._touched}
+        self._touched.clear()
+        for root in roots:
+            members = self.members[root]
+            ranks = component_pagerank(members, self.neighbors, self.damping)
+            for node, rank in zip(members, ranks):
+                self.pagerank[node] = rank
+            for community in self._communities(members):
+                representative = min(community)
+                for node in community:
+                    self.community[node] = representative
+        self.recomputed = len(roots)
+        if roots:
+            self._derived = None
+        return self.recomputed
+
+    def _communities(self, members):
+        """Сообщества Louvain внутри компоненты (маленькая компонента — одно сообщество)."""
+        if len(members) <= 3:
+            return [members]
+        import networkx as nx
+
+        graph = nx.Graph()
+        graph.add_nodes_from(members)
+        for node in members:
+            for other in self.neighbors[node]:
+                if node < other:
+                    if graph.has_edge(node, other):
+                        graph[node][other]["weight"] += 1
+                    else:
+                        graph.add_edge(node, other, weight=1)
+        return nx.community.louvain_communities(
+            graph, weight="weight", resolution=self.resolution, seed=self.seed
+        )
+
+    def degree(self, index):
+        return len(self.neighbors[index])
+
+    def score(self, index):
+        """Глобальный PageRank узла (сумма по всему графу — 1)."""
+        size = len(self.members[self._find(index)])
+        return self.pagerank[index] * size / self.node_count
+
+    def _metrics(self):
+        """Глобальные PageRank, их максимум и число сообществ — кешируются до следующего пересчёта."""
+        if self._derived is None:
+            scores = [self.score(i) for i in range(self.node_count)]
+            self._derived = {
+                "scores": scores,
+                "max_score": max(scores, default=0.0),
+                "communities": len(set(self.community)),
+            }
+        return self._derived
+
+    def node(self, index):
+        return {
+            "id": self.node_ids[index],
+            "name": self.node_names[index],
+            "degree": self.degree(index),
+            "pagerank": self._metrics()["scores"][index],
+            "community": self.node_ids[self.community[index]],
+        }
+
+    def get(self, node_id):
+        """Метрики узла по elementId (None, если узла нет в проекции)."""
+        index = self._node_index.get(node_id)
+        return None if index is None else self.node(index)
+
+    def hubs(self, k=10):
+        """`k` узлов с наибольшим PageRank."""
+        scores = self._metrics()["scores"]
+        top = sorted(range(self.node_count), key=scores.__getitem__, reverse=True)[:k]
+        return [self.node(i) for i in top]
+
+    def node_styles(self, min_size=12, max_size=45):
+        """`{id узла: {"size", "color"}}`: размер по PageRank, цвет по сообществу."""
+        metrics = self._metrics()
+        if "styles" not in metrics:
+            top = metrics["max_score"] or 1.0
+            metrics["styles"] = {
+                node_id: {
+                    "size": round(min_size + (max_size - min_size) * math.sqrt(score / top), 1),
+                    "color": COMMUNITY_COLORS[self.community[i] % len(COMMUNITY_COLORS)],
+                }
+                for i, (node_id, score) in enumerate(zip(self.node_ids, metrics["scores"]))
+            }
+        return metrics["styles"]
+
+    def _entities(self):
+        metrics = self._metrics()
+        if "entities" not in metrics:
+            top = metrics["max_score"] or 1.0
+            entities, names = {}, {}
+            for name, score in zip(self.node_names, metrics["scores"]):
+                key = entity_key(name)
+                if key and score / top >= entities.get(key, -1.0):
+                    entities[key] = score / top
+                    names[key] = name
+            metrics["entities"], metrics["names"] = entities, names
+        return metrics["entities"], metrics["names"]
+
+    def entity_scores(self):
+        """`{имя сущности: PageRank / максимальный}` для переранжирования воспоминаний."""
+        return self._entities()[0]
+
+    def entity_names(self):
+        """`{имя сущности для текста: имя узла в Neo4j}` (`john doe` -> `john_doe`)."""
+        return self._entities()[1]
+
+    def stats(self):
+        return {
+            "nodes": self.node_count,
+            "edges": self.edge_count,
+            "components": len(self.members),
+            "communities": self._metrics()["communities"],
+            "orphans": len(self.orphans),
+            "recomputed": self.recomputed,
+            "truncated": self.truncated,
+        }
+
+
+def mentioned_entities(text, entities, max_words=3):
+    """Сущности из `entities` (ключи `entity_key`), упомянутые в тексте: n-граммы до `max_words` слов."""
+    words = tokenize(text)
+    found = {}
+    for size in range(1, max_words + 1):
+        for i in range(len(words) - size + 1):
+            key = " ".join(words[i:i + size])
+            if key in entities:
+                found[key] = entities[key]
+    return found
+
+
+def rerank(results, entity_scores, weight=0.3, max_words=3):
+    """Поднять воспоминания, упоминающие центральные сущности графа.
+
+    Исходный порядок даёт оценку `1 - позиция / n`, к ней прибавляется
+    `weight` × наибольшая нормированная центральность упомянутой сущности.
+    Новый список, исходный не меняется.
+    """
+    n = len(results)
+    if n < 2 or not entity_scores or not weight:
+        return list(results)
+
+    def centrality(text):
+        return max(mentioned_entities(text, entity_scores, max_words).values(), default=0.0)
+
+    scored = [
+        (1.0 - position / n + weight * centrality(item.get("memory") or ""), position)
+        for position, item in enumerate(results)
+    ]
+    scored.sort(key=lambda pair: (-pair[0], pair[1]))
+    return [results[position] for _, position in scored]
+
+
+class GraphAnalytics:
+    """Метрики графов пользователей с кешем по водяным знакам записей."""
+
+    def __init__(self, pool=None, node_label="__Entity__", page_size=1000, max_edges=50000,
+                 max_age=300.0, max_orphans=1000, damping=0.85, resolution=1.0, seed=42,
+                 refresh_delay=1.0):
+        self._pool = pool
+        label = quote_label(node_label)
+        self.projection_query = PROJECTION_QUERY.format(label=label)
+        self.orphans_query = ORPHANS_QUERY.format(label=label)
+        self.page_size = page_size
+        self.max_edges = max_edges
+        # старше max_age секунд — перечитывается целиком (записи из других процессов)
+        self.max_age = max_age
+        self.max_orphans = max_orphans
+        # фоновый пересчёт ждёт refresh_delay секунд: серия записей — один пересчёт
+        self.refresh_delay = refresh_delay
+        self.damping = damping
+        self.resolution = resolution
+        self.seed = seed
+        self._analyses = {}
+        # общий замок только для словарей; чтение Neo4j, PageRank и сообщества
+        # идут под замком пользователя и не задерживают других пользователей
+        self._lock = threading.Lock()
+        self._user_locks = {}
+        self._refreshing = set()
+
+    @property
+    def pool(self):
+        # соединение открывается при первом запросе, а не при создании агента
+        if self._pool is None:
+            from .neo4j_pool import get_pool
+
+            self._pool = get_pool()
+        return self._pool
+
+    def _user_lock(self, user_id):
+        with self._lock:
+            lock = self._user_locks.get(user_id)
+            if lock is None:
+                lock = self._user_locks[user_id] = threading.Lock()
+            return lock
+
+    def _records(self, user_id, since=None, limit=None):
+        """Поток записей проекции (не больше `limit`)."""
+        after = ""
+        count = 0
+        if limit is None:
+            limit = self.max_edges
+        while count < limit:
+            page = self.pool.read(
+                self.projection_query,
+                user_id=user_id,
+                since=since,
+                after=after,
+                page_size=min(self.page_size, limit - count),
+            )
+            yield from page
+            count += len(page)
+            if len(page) < self.page_size:
+                return
+            after = page[-1]["rel_id"]
+
+    def _load(self, user_id):
+        analysis = GraphAnalysis(user_id, self.damping, self.resolution, self.seed)
+        for record in self._records(user_id):
+            analysis.add_record(record)
+        records = self.pool.read(self.orphans_query, user_id=user_id, limit=self.max_orphans)
+        analysis.orphans = [record.data() for record in records]
+        analysis.fetched_at = time.monotonic()
+        if analysis.edge_count >= self.max_edges:
+            # связи сверх max_edges в метрики не попадут
+            analysis.truncated = True
+            log_event(
+                "graph.analytics.truncated",
+                level=logging.WARNING,
+                user_id=user_id,
+                max_edges=self.max_edges,
+            )
+        return analysis
+
+    def _fresh(self, analysis, version):
+        return (
+            analysis.version == version
+            and time.monotonic() - analysis.fetched_at <= self.max_age
+        )
+
+    def analyze(self, user_id="user_1", force=False):
+        """Метрики графа пользователя; Neo4j опрашивается только после записей.
+
+        После добавлений догружаются связи новее последней известной и
+        пересчитываются только затронутые компоненты; после удалений, без
+        отметок времени или по истечении `max_age` граф перечитывается целиком.
+        """
+        version, full_version = get_watermarks().get(user_id)
+        with self._user_lock(user_id):
+            with self._lock:
+                analysis = self._analyses.get(user_id)
+            if analysis is not None and not force and self._fresh(analysis, version):
+                return analysis
+
+            incremental = (
+                analysis is not None
+                and analysis.full_version == full_version
+                and analysis.max_created is not None
+                # упёршийся в max_edges граф не догружается: новые связи и
+                # сироты видны только при полном чтении
+                and not analysis.truncated
+                and not force
+                and time.monotonic() - analysis.fetched_at <= self.max_age
+            )
+            if incremental:
+                # опубликованный результат не трогаем: его читают запросы
+                analysis = analysis.copy()
+                room = self.max_edges - analysis.edge_count
+                new_ids = set()
+                records = self._records(user_id, since=analysis.max_created, limit=room)
+                for record in records:
+                    if analysis.add_record(record):
+                        new_ids.update((record["source"], record["target"]))
+                if new_ids:
+                    analysis.orphans = [o for o in analysis.orphans if o["id"] not in new_ids]
+            else:
+                # новый результат подменяет старый только после полного чтения
+                analysis = self._load(user_id)
+            analysis.refresh()
+            analysis.version = version
+            analysis.full_version = full_version
+            with self._lock:
+                self._analyses[user_id] = analysis
+            return analysis
+
+    def latest(self, user_id="user_1"):
+        """Последний готовый результат без ожидания Neo4j (None, пока первого нет).
+
+        Если с тех пор были записи или истёк `max_age`, пересчёт запускается
+        в фоне; на пути запроса остаётся только чтение словаря.
+        """
+        with self._lock:
+            analysis = self._analyses.get(user_id)
+        if analysis is None or not self._fresh(analysis, get_watermarks().get(user_id)[0]):
+            self._schedule(user_id)
+        return analysis
+
+    def _schedule(self, user_id):
+        # не больше одного фонового пересчёта на пользователя
+        with self._lock:
+            if user_id in self._refreshing:
+                return
+            self._refreshing.add(user_id)
+        threading.Thread(
+            target=self._refresh, args=(user_id,), name=f"graph-analytics-{user_id}", daemon=True
+        ).start()
+
+    def _refresh(self, user_id):
+        try:
+            time.sleep(self.refresh_delay)
+            self.analyze(user_id)
+        except Exception as e:
+            log_error("GraphAnalytics.refresh", e, user_id=user_id)
+        finally:
+            with self._lock:
+                self._refreshing.discard(user_id)
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._analyses.clear()
+            else:
+                self._analyses.pop(user_id, None)
+
+
+_analytics = None
+_analytics_lock = threading.Lock()
+
+
+def get_graph_analytics(**options):
+    """Общая для процесса аналитика: её читают и агент, и визуализация графа."""
+    global _analytics
+    with _analytics_lock:
+        if _analytics is None:
+            _analytics = GraphAnalytics(**options)
+        return _analytics
@@ -0,0 +1,204 @@
+"""
+Асинхронный агент с тем же API, что и Mem0Agent, для ASGI-сервисов.
+"""
+
+import asyncio
+import time
+from itertools import islice
+
+from .agent import ChatReply, Mem0Agent
+from .config import CHAT_MODEL
+from .resources import new_async_chat_client
+from .telemetry import log_error
+
+
+class AsyncChatStream:
+    """Асинхронный итератор фрагментов ответа; `context_stats` — как у `ChatStream`."""
+
+    def __init__(self, fragments):
+        self.context_stats = None
+        self._fragments = fragments(self)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._fragments.__anext__()
+
+    async def aclose(self):
+        await self._fragments.aclose()
+
+
+class AsyncMem0Agent:
+    """Асинхронная версия Mem0Agent.
+
+    Ответ модели получается через `openai.AsyncOpenAI`, а блокирующие вызовы Mem0
+    (поиск, запись, загрузка документов) выполняются в пуле потоков, поэтому
+    один event loop обслуживает много пользователей одновременно.
+    Запись диалога в память идёт через фоновую очередь и не задерживает ответ;
+    `flush_writes()` (или короче `flush()`) дожидается её применения.
+    """
+
+    def __init__(self, user_id="user_1", memory=None, client=None, async_client=None):
+        # синхронный агент даёт общую логику: кеш поиска, разбиение, дедупликацию
+        self._agent = Mem0Agent(user_id=user_id, memory=memory, client=client)
+        self.client = async_client or new_async_chat_client()
+
+    @property
+    def user_id(self):
+        return self._agent.user_id
+
+    @property
+    def memory(self):
+        return self._agent.memory
+
+    @property
+    def search_cache(self):
+        return self._agent.search_cache
+
+    @property
+    def telemetry(self):
+        return self._agent.telemetry
+
+    async def search(self, query):
+        """Поиск по памяти через семантический кеш."""
+        # точное попадание в кеш не требует ни эмбеддинга, ни потока
+        cached = self._agent.search_cache.get_exact(self.user_id, query)
+        if cached is not None:
+            return cached
+        return await asyncio.to_thread(self._agent.search, query)
+
+    async def _prepare_messages(self, message, caller="AsyncMem0Agent.chat"):
+        """Поиск по памяти и сборка сообщений: `(сообщения, статистика контекста)`.
+
+        Векторный поиск, загрузка BM25-индекса и метрики графа друг от друга не
+        зависят и идут одновременно в пуле потоков; слияние, переранжирование
+        и расширение контекста по графу — когда готовы все три.
+        """
+        agent = self._agent
+        with self.telemetry.span("retrieve"):
+            found, keyword_ready, analysis = await asyncio.gather(
+                self.search(message),
+                asyncio.to_thread(agent._load_keyword_index),
+                asyncio.to_thread(agent._graph_analysis)
+                if agent._needs_graph_analysis() else asyncio.sleep(0),
+                return_exceptions=True,
+            )
+        if isinstance(found, Exception):
+            log_error(caller, found, stage="search", user_id=self.user_id)
+            found, keyword_ready = [], False
+
+        def compose():
+            relevant = agent._fuse(message, found, keyword_ready)
+            return agent._compose(message, relevant, analysis)
+
+        # слияние с BM25 и сборка контекста (эмбеддинги из Chroma, граф из Neo4j) — не в event loop
+        return await asyncio.to_thread(compose)
+
+    async def chat(self, message):
+        """Диалог с агентом: `ChatReply` — ответ и статистика его контекста."""
+        messages, stats = await self._prepare_messages(message)
+
+        try:
+            with self.telemetry.span("llm", model=CHAT_MODEL) as span:
+                response = await self.client.chat.completions.create(
+                    model=CHAT_MODEL,
+                    messages=messages,
+                )
+                answer = response.choices[0].message.content
+                span["prompt_tokens"], span["completion_tokens"] = (
+                    self.telemetry.record_llm_usage(
+                        CHAT_MODEL, getattr(response, "usage", None), messages, answer
+                    )
+                )
+        except Exception as e:
+            log_error("AsyncMem0Agent.chat", e, stage="llm", user_id=self.user_id)
+            return ChatReply(f"Произошла ошибка при обращении к модели: {e}", stats)
+
+        # сохраняем диалог в память: задание уходит в фоновую очередь
+        self._agent._remember_turn(message, answer)
+
+        return ChatReply(answer, stats)
+
+    def chat_stream(self, message):
+        """`AsyncChatStream` с фрагментами ответа; см. `Mem0Agent.chat_stream`."""
+        return AsyncChatStream(lambda reply: self._stream(message, reply))
+
+    async def _stream(self, message, reply):
+        messages, reply.context_stats = await self._prepare_messages(
+            message, caller="AsyncMem0Agent.chat_stream"
+        )
+
+        parts = []
+        usage = None
+        started = time.perf_counter()
+        try:
+            stream = await self.client.chat.completions.create(
+                model=CHAT_MODEL,
+                messages=messages,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            async for chunk in stream:
+                usage = getattr(chunk, "usage", None) or usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if not parts:
+                        self.telemetry.observe("llm.first_token", time.perf_counter() - started)
+                    parts.append(delta)
+                    yield delta
+        except Exception as e:
+            self.telemetry.observe("llm", time.perf_counter() - started, error=True)
+            log_error("AsyncMem0Agent.chat_stream", e, stage="llm", user_id=self.user_id)
+            yield f"Произошла ошибка при обращении к модели: {e}"
+            return
+
+        answer = "".join(parts)
+        self.telemetry.observe("llm", time.perf_counter() - started)
+        self.telemetry.record_llm_usage(CHAT_MODEL, usage, messages, answer)
+        if answer:
+            self._agent._remember_turn(message, answer)
+
+    async def flush_writes(self, timeout=None):
+        """Дождаться фоновых записей в память (для тестов и корректного завершения)."""
+        return await asyncio.to_thread(self._agent.flush_writes, timeout)
+
+    flush = flush_writes
+
+    async def get_all_memories(self):
+        return await asyncio.to_thread(self._agent.get_all_memories)
+
+    async def list_memories(self, page=0, page_size=10):
+        """См. `Mem0Agent.list_memories`."""
+        return await asyncio.to_thread(self._agent.list_memories, page, page_size)
+
+    async def count_memories(self):
+        """См. `Mem0Agent.count_memories`."""
+        return await asyncio.to_thread(self._agent.count_memories)
+
+    async def iter_memories(self, batch_size=100):
+        """Асинхронный итератор всех воспоминаний; хранилище читается в потоке пачками."""
+        items = self._agent.iter_memories(batch_size)
+        try:
+            while True:
+                batch = await asyncio.to_thread(list, islice(items, batch_size))
+                for item in batch:
+                    yield item
+                if len(batch) < batch_size:
+                    return
+        finally:
+            items.close()
+
+    async def clear_memory(self):
+        """Очистка всей памяти пользователя"""
+        await asyncio.to_thread(self._agent.clear_memory)
+
+    async def add_memory(self, text, metadata=None, **options):
+        """См. `Mem0Agent.add_memory`; `on_progress` вызывается из рабочего потока."""
+        return await asyncio.to_thread(self._agent.add_memory, text, metadata, **options)
+
+    async def add_document(self, source, **options):
+        """См. `Mem0Agent.add_document`."""
+        return await asyncio.to_thread(self._agent.add_document, source, **options)
@@ -0,0 +1,190 @@
+"""
+Семантический кеш результатов `Memory.search`.
+
+Ключ — пользователь и эмбеддинг запроса: совпадающий или очень похожий
+(косинус >= порога) вопрос того же пользователя берётся из кеша без
+обращения к векторному и графовому хранилищам.
+
+`QueryEmbeddings` запоминает последние векторы запросов: эмбеддинг,
+посчитанный агентом для поиска в кеше, Mem0 при промахе не считает заново.
+"""
+
+import math
+import operator
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(text):
+    return _WHITESPACE_RE.sub(" ", text).strip().casefold()
+
+
+def _unit(vector):
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+class SemanticCache:
+    """LRU + TTL кеш с поиском по косинусному сходству в пределах пользователя."""
+
+    def __init__(self, max_entries=512, ttl=300.0, threshold=0.95, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.clock = clock
+        self._lock = threading.Lock()
+        # (user_id, normalized_query) -> (unit_embedding, results, expires_at)
+        self._entries = OrderedDict()
+        self._by_user = {}
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        keys = self._by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[key[0]]
+
+    def get_exact(self, user_id, query):
+        """Поиск по точному (нормализованному) тексту — без вычисления эмбеддинга.
+
+        Промах здесь не считается: за ним следует `get` с эмбеддингом.
+        """
+        key = (user_id, normalize_query(query))
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] <= now:
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def get(self, user_id, query, embedding):
+        """Поиск по точному тексту, затем по ближайшему эмбеддингу пользователя."""
+        key = (user_id, normalize_query(query))
+        now = self.clock()
+        vector = _unit(embedding)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            best_key, best_score = None, self.threshold
+            for other in list(self._by_user.get(user_id, ())):
+                cached_vector, _, expires_at = self._entries[other]
+                if expires_at <= now:
+                    self._drop(other)
+                    continue
+                score = sum(map(operator.mul, vector, cached_vector))
+                if score >= best_score:
+                    best_key, best_score = other, score
+
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            self.semantic_hits += 1
+            return self._entries[best_key][1]
+
+    def put(self, user_id, query, embedding, results):
+        key = (user_id, normalize_query(query))
+        with self._lock:
+            self._entries[key] = (_unit(embedding), results, self.clock() + self.ttl)
+            self._entries.move_to_end(key)
+            self._by_user.setdefault(user_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+
+    def invalidate(self, user_id=None):
+        """Сбросить записи пользователя (или весь кеш) после изменения памяти."""
+        with self._lock:
+            self.invalidations += 1
+            if user_id is None:
+                self._entries.clear()
+                self._by_user.clear()
+                return
+            for key in list(self._by_user.get(user_id, ())):
+                self._drop(key)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+class QueryEmbeddings:
+    """Эмбеддер Mem0 с памятью последних векторов запросов (`memory_action="search"`).
+
+    Агент считает вектор запроса для семантического кеша, а при промахе
+    `Memory.search` просит тот же вектор ещё раз — второй раз он берётся
+    отсюда. Остальные вызовы и атрибуты уходят в исходный эмбеддер.
+    """
+
+    def __init__(self, embedder, max_entries=256):
+        self.embedder = embedder
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._vectors = OrderedDict()  # текст запроса -> вектор
+
+    def __getattr__(self, name):
+        return getattr(self.embedder, name)
+
+    def embed(self, text, memory_action=None):
+        if memory_action != "search":
+            return self.embedder.embed(text, memory_action)
+        with self._lock:
+            vector = self._vectors.get(text)
+            if vector is not None:
+                self._vectors.move_to_end(text)
+                return vector
+        vector = self.embedder.embed(text, memory_action)
+        with self._lock:
+            self._vectors[text] = vector
+            while len(self._vectors) > self.max_entries:
+                self._vectors.popitem(last=False)
+        return vector
+
+
+def share_query_embeddings(memory):
+    """Обернуть `memory.embedding_model` в `QueryEmbeddings` (один раз); возвращает обёртку."""
+    embedder = memory.embedding_model
+    if not isinstance(embedder, QueryEmbeddings):
+        embedder = memory.embedding_model = QueryEmbeddings(embedder)
+    return embedder
+
+
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache(**options):
+    """Общий для процесса кеш: запись в память одной сессии сбрасывает его для всех."""
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = SemanticCache(**options)
+        return _search_cache
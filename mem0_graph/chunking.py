@@ -0,0 +1,265 @@
+"""
+Движок разбиения текста на чанки.
+
+Все стратегии работают как генераторы поверх потока сегментов (страниц/абзацев)
+и за один линейный проход упаковывают «единицы» (абзацы, предложения, слова)
+в окно ограниченного размера с необязательным перекрытием.
+"""
+
+import inspect
+import re
+from collections import deque
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?…])\s+")
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+
+
+def approx_token_count(text):
+    """Быстрая оценка числа токенов: слова и знаки препинания.
+
+    Длинные слова WordPiece-токенизатор MiniLM режет на части, поэтому
+    каждые 10 символов слова считаются отдельным токеном.
+    """
+    return sum(1 + len(token) // 10 for token in _TOKEN_RE.findall(text))
+
+
+def hf_token_counter(model_name="sentence-transformers/all-MiniLM-L6-v2"):
+    """Точный счётчик токенов на токенизаторе HuggingFace (загружается лениво)."""
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+    def count(text):
+        return len(tokenizer.encode(text, add_special_tokens=False))
+
+    return count
+
+
+class _Boundary:
+    """Служебная единица: закрыть текущий чанк и сменить префикс (заголовок раздела)."""
+
+    __slots__ = ("prefix",)
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+
+
+class BaseChunker:
+    """Упаковщик единиц текста в окно `max_size` с перекрытием `overlap`.
+
+    Подклассы определяют `_units(segments)` — генератор кортежей
+    `(text, size, separator)` и, при необходимости, `_Boundary`.
+    """
+
+    # стоимость пробела между словами при дроблении длинной единицы
+    word_gap = 0
+    # примерное число символов на единицу размера (для слов длиннее бюджета)
+    chars_per_unit = 4
+
+    def __init__(self, max_size, overlap=0, counter=approx_token_count):
+        if max_size <= 0:
+            raise ValueError("max_size должен быть положительным")
+        if overlap < 0 or overlap >= max_size:
+            raise ValueError("overlap должен быть в диапазоне [0, max_size)")
+        self.max_size = max_size
+        self.overlap = overlap
+        self.counter = counter
+
+    def _units(self, segments):
+        raise NotImplementedError
+
+    def _split_long(self, text, budget):
+        """Режет слишком длинную единицу по словам, не разрывая слова."""
+        words = text.split()
+        current = []
+        size = 0
+        for word in words:
+            word_size = self.counter(word) + self.word_gap
+            if current and size + word_size > budget:
+                yield " ".join(current)
+                current = []
+                size = 0
+            if word_size > budget:
+                # одно «слово» длиннее бюджета (например, base64) — режем по символам
+                yield from self._split_word(word, budget)
+                continue
+            current.append(word)
+            size += word_size
+        if current:
+            yield " ".join(current)
+
+    def _split_word(self, word, budget):
+        """Режет слово по символам на куски, которые вместе с пробелом помещаются в `budget`."""
+        step = max(1, (budget - self.word_gap) * self.chars_per_unit)
+        start = 0
+        while start < len(word):
+            low, high = start + 1, min(len(word), start + step)
+            # знаки препинания дают больше единиц на символ: ищем самый длинный
+            # помещающийся кусок двоичным поиском по его концу
+            while low < high:
+                middle = (low + high + 1) // 2
+                if self.counter(word[start:middle]) + self.word_gap <= budget:
+                    low = middle
+                else:
+                    high = middle - 1
+            yield word[start:low]
+            start = low
+
+    @staticmethod
+    def _join(window, prefix):
+        parts = [prefix] if prefix else []
+        for i, (text, _, sep) in enumerate(window):
+            if i and sep:
+                parts.append(sep)
+            parts.append(text)
+        return "".join(parts)
+
+    def chunks(self, segments):
+        """Генератор чанков из итерируемого набора текстовых сегментов."""
+        window = deque()
+        size = 0
+        fresh = 0
+        prefix = ""
+        budget = self.max_size
+
+        for unit in self._units(segments):
+            if isinstance(unit, _Boundary):
+                if fresh:
+                    yield self._join(window, prefix)
+                window.clear()
+                size = fresh = 0
+                prefix = f"{unit.prefix}\n\n" if unit.prefix else ""
+                budget = max(1, self.max_size - self.counter(prefix))
+                continue
+
+            text, unit_size, sep = unit
+            if unit_size > budget:
+                # размер куска учитывает и разделитель, с которым он попадёт в чанк
+                pieces = [
+                    (p, self.counter(p) + self.counter(sep if i == 0 else " "), sep if i == 0 else " ")
+                    for i, p in enumerate(self._split_long(text, budget))
+                ]
+            else:
+                pieces = [unit]
+
+            for piece in pieces:
+                piece_size = piece[1]
+                if window and size + piece_size > budget:
+                    if fresh:
+                        yield self._join(window, prefix)
+                        fresh = 0
+                    # оставляем хвост окна как перекрытие со следующим чанком
+                    while window and (size > self.overlap or size + piece_size > budget):
+                        size -= window.popleft()[1]
+                window.append(piece)
+                size += piece_size
+                fresh += 1
+
+        if fresh:
+            yield self._join(window, prefix)
+
+    def split_text(self, text):
+        return list(self.chunks([text]))
+
+
+class ParagraphChunker(BaseChunker):
+    """Прежнее поведение `_chunk_text`: абзацы в окне из `max_chars` символов."""
+
+    word_gap = 1
+    chars_per_unit = 1
+
+    def __init__(self, max_chars=2000, overlap=0):
+        super().__init__(max_chars, overlap=overlap, counter=len)
+
+    def _units(self, segments):
+        for segment in segments:
+            for paragraph in segment.split("\n\n"):
+                p = paragraph.strip()
+                if p:
+                    yield (p, len(p) + 2, "\n\n")
+
+
+class TokenChunker(BaseChunker):
+    """Окно фиксированного бюджета токенов по границам слов."""
+
+    def __init__(self, max_tokens=256, overlap_tokens=32, counter=approx_token_count):
+        super().__init__(max_tokens, overlap=overlap_tokens, counter=counter)
+
+    def _units(self, segments):
+        counter = self.counter
+        for segment in segments:
+            for paragraph in segment.split("\n\n"):
+                first = True
+                for word in paragraph.split():
+                    yield (word, counter(word), "\n\n" if first else " ")
+                    first = False
+
+
+class SentenceChunker(BaseChunker):
+    """Предложения, упакованные в бюджет токенов; перекрытие — целыми предложениями."""
+
+    def __init__(self, max_tokens=256, overlap_tokens=32, counter=approx_token_count):
+        super().__init__(max_tokens, overlap=overlap_tokens, counter=counter)
+
+    def _sentences(self, paragraph):
+        counter = self.counter
+        first = True
+        for sentence in _SENTENCE_END_RE.split(paragraph):
+            s = " ".join(sentence.split())
+            if s:
+                yield (s, counter(s), "\n\n" if first else " ")
+                first = False
+
+    def _units(self, segments):
+        for segment in segments:
+            for paragraph in segment.split("\n\n"):
+                yield from self._sentences(paragraph)
+
+
+class MarkdownChunker(SentenceChunker):
+    """Как SentenceChunker, но чанк не пересекает заголовки Markdown,
+    а путь заголовков («Раздел / Подраздел») добавляется в начало каждого чанка."""
+
+    def _units(self, segments):
+        headings = []
+        for segment in segments:
+            for paragraph in segment.split("\n\n"):
+                body = []
+                for line in paragraph.split("\n"):
+                    match = _HEADING_RE.match(line.strip())
+                    if not match:
+                        body.append(line)
+                        continue
+                    if body:
+                        yield from self._sentences(" ".join(body))
+                        body = []
+                    level = len(match.group(1))
+                    del headings[level - 1:]
+                    headings.extend([""] * (level - 1 - len(headings)))
+                    headings.append(match.group(2))
+                    yield _Boundary(" / ".join(h for h in headings if h))
+                if body:
+                    yield from self._sentences(" ".join(body))
+
+
+CHUNKERS = {
+    "paragraph": ParagraphChunker,
+    "token": TokenChunker,
+    "sentence": SentenceChunker,
+    "markdown": MarkdownChunker,
+}
+
+
+def get_chunker(strategy="sentence", **options):
+    """Создаёт чанкер по имени стратегии из `CHUNKERS`.
+
+    Опции, которых нет у конструктора стратегии, игнорируются — так один словарь
+    `CHUNKING` из конфига подходит для любой стратегии.
+    """
+    try:
+        cls = CHUNKERS[strategy]
+    except KeyError:
+        raise ValueError(f"Неизвестная стратегия разбиения: {strategy}") from None
+    accepted = inspect.signature(cls.__init__).parameters
+    return cls(**{k: v for k, v in options.items() if k in accepted})
@@ -3,6 +3,25 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Подключение к Neo4j и пул соединений (см. mem0_graph/neo4j_pool.py)
+NEO4J = {
+    "uri": os.getenv("NEO4J_URI", "bolt://localhost:7687"),
+    "user": os.getenv("NEO4J_USERNAME", "neo4j"),
+    "password": os.getenv("NEO4J_PASSWORD", "password123"),
+    "database": os.getenv("NEO4J_DATABASE") or None,
+    "max_connection_pool_size": int(os.getenv("NEO4J_POOL_SIZE", "50")),
+    "connection_acquisition_timeout": 30.0,
+    # соединение, простоявшее дольше, проверяется перед выдачей из пула
+    "liveness_check_timeout": 30.0,
+    "max_connection_lifetime": 3600,
+    # сколько драйвер повторяет транзакцию при временных ошибках; запрос чата
+    # при недоступном сервере не должен ждать дольше
+    "max_transaction_retry_time": float(os.getenv("NEO4J_RETRY_TIME", "5")),
+}
+
+# Модель для ответов агента и для извлечения фактов в Mem0
+CHAT_MODEL = os.getenv("MEM0GRAPH_CHAT_MODEL", "openai/gpt-4o-mini")
+
 MEM0_CONFIG = {
     "vector_store": {
         "provider": "chroma",
@@ -15,9 +34,11 @@ MEM0_CONFIG = {
     "graph_store": {
         "provider": "neo4j",
         "config": {
-            "url": "bolt://localhost:7687",
-            "username": "neo4j",
-            "password": "password123"
+            "url": NEO4J["uri"],
+            "username": NEO4J["user"],
+            "password": NEO4J["password"],
+            # общая метка __Entity__ у всех узлов: по ней построены индексы user_id
+            "base_label": True
         }
     },
     
@@ -25,7 +46,7 @@ MEM0_CONFIG = {
     "llm": {
         "provider": "openai",
         "config": {
-            "model": "openai/gpt-4o-mini"
+            "model": CHAT_MODEL
             # base_url и api_key берется из .env автоматически!
         }
     },
@@ -39,3 +60,126 @@ MEM0_CONFIG = {
     }
 }
 
+
+# Локальный эмбеддер поверх модели из MEM0_CONFIG (см. mem0_graph/embedder.py):
+# пакеты из параллельных запросов, ONNX/int8 на CPU, кеш векторов на диске
+EMBEDDER = {
+    "enabled": os.getenv("MEM0GRAPH_EMBEDDER", "1") != "0",
+    "model": MEM0_CONFIG["embedder"]["config"]["model"],
+    "backend": os.getenv("MEM0GRAPH_EMBEDDER_BACKEND", "torch"),  # torch | onnx | onnx-int8
+    "cache_path": os.getenv("MEM0GRAPH_EMBEDDING_CACHE", "./chroma_db/embeddings"),
+    "max_batch": 32,
+    "max_wait_ms": 2.0,
+}
+
+# Индекс уже загруженных чанков (дедупликация при повторной загрузке документов)
+INGEST_INDEX_PATH = os.getenv("MEM0GRAPH_INGEST_INDEX", "./chroma_db/ingest_index.sqlite3")
+
+# Разбиение документов на чанки (см. mem0_graph/chunking.py):
+# бюджет в токенах подобран под окно 256 токенов эмбеддера MiniLM
+CHUNKING = {
+    "strategy": os.getenv("MEM0GRAPH_CHUNKING", "sentence"),
+    "max_tokens": 256,
+    "overlap_tokens": 32,
+}
+
+# Семантический кеш результатов поиска по памяти (см. mem0_graph/cache.py)
+SEARCH_CACHE = {
+    "max_entries": int(os.getenv("MEM0GRAPH_SEARCH_CACHE_SIZE", "512")),
+    "ttl": float(os.getenv("MEM0GRAPH_SEARCH_CACHE_TTL", "300")),
+    "threshold": 0.95,
+}
+
+# Фоновая запись диалога в память (см. mem0_graph/writeback.py)
+WRITE_BEHIND = {
+    "journal_path": os.getenv("MEM0GRAPH_WRITE_JOURNAL", "./chroma_db/write_journal.sqlite3"),
+    "workers": int(os.getenv("MEM0GRAPH_WRITE_WORKERS", "2")),
+    "retries": 3,
+}
+
+# Список воспоминаний в интерфейсе: кеш страниц и числа по версии записей
+# (см. mem0_graph/listing.py)
+MEMORY_LISTING = {
+    "max_pages": 32,  # страниц в кеше на пользователя
+    "max_age": float(os.getenv("MEM0GRAPH_LISTING_MAX_AGE", "60")),
+}
+
+# Гибридный поиск: BM25 по текстам воспоминаний + векторный поиск, слияние RRF
+HYBRID_SEARCH = {
+    "enabled": os.getenv("MEM0GRAPH_HYBRID_SEARCH", "1") != "0",
+    "top_k": 20,  # сколько кандидатов получает сборщик контекста
+    "bm25_k": 20,
+    "rrf_k": 60,
+    "max_documents": 10000,  # предел начальной загрузки индекса из Mem0
+}
+
+# Сборка контекста промпта (см. mem0_graph/context.py)
+CONTEXT = {
+    "max_tokens": int(os.getenv("MEM0GRAPH_CONTEXT_TOKENS", "1000")),
+    "max_items": 10,
+    "mmr_lambda": 0.7,
+    "duplicate_threshold": 0.95,
+}
+
+# Запросы графа для визуализации (см. Neo4jGraphViz в mem0_graph/graph_viz.py)
+GRAPH_QUERY = {
+    "node_label": "__Entity__",
+    "page_size": int(os.getenv("MEM0GRAPH_GRAPH_PAGE_SIZE", "1000")),
+    "max_edges": int(os.getenv("MEM0GRAPH_GRAPH_MAX_EDGES", "5000")),
+    "unique_names": os.getenv("MEM0GRAPH_GRAPH_UNIQUE_NAMES", "0") == "1",
+    "fanout": 25,  # связей на узел за шаг при раскрытии окрестности
+    # больше узлов — граф сворачивается в кластеры (см. mem0_graph/graph_lod.py)
+    "lod_max_nodes": int(os.getenv("MEM0GRAPH_GRAPH_LOD_NODES", "300")),
+    # координаты узлов между отрисовками (см. mem0_graph/layout.py)
+    "layout_path": os.getenv("MEM0GRAPH_GRAPH_LAYOUT", "./chroma_db/graph_layout.sqlite3"),
+    "layout_iterations": 50,
+}
+
+# Аналитика графа: PageRank, сообщества, хабы (см. mem0_graph/analytics.py)
+GRAPH_ANALYTICS = {
+    "node_label": GRAPH_QUERY["node_label"],
+    "max_edges": int(os.getenv("MEM0GRAPH_ANALYTICS_MAX_EDGES", "50000")),
+    "max_age": 300.0,
+    "damping": 0.85,
+    # пауза перед фоновым пересчётом: записи подряд сливаются в один
+    "refresh_delay": 1.0,
+}
+# Расширение поиска через граф: факты из окрестности найденных сущностей
+# (см. mem0_graph/graph_retrieval.py)
+GRAPH_RETRIEVAL = {
+    "enabled": os.getenv("MEM0GRAPH_GRAPH_RETRIEVAL", "1") != "0",
+    "node_label": GRAPH_QUERY["node_label"],
+    "depth": int(os.getenv("MEM0GRAPH_GRAPH_RETRIEVAL_DEPTH", "2")),
+    "fanout": 10,  # связей у каждой стартовой сущности
+    "far_limit": 30,  # связей второго шага на стартовую сущность
+    "max_seeds": 10,
+    "max_facts": 20,
+    "max_tokens": int(os.getenv("MEM0GRAPH_GRAPH_RETRIEVAL_TOKENS", "300")),
+}
+
+# вес центральности упомянутых сущностей при переранжировании воспоминаний (0 — выключено)
+GRAPH_RERANK_WEIGHT = float(os.getenv("MEM0GRAPH_GRAPH_RERANK", "0.3"))
+
+# Пользователь интерфейса по умолчанию (в app.py его можно сменить в боковой панели)
+DEFAULT_USER_ID = os.getenv("MEM0GRAPH_USER", "user_1")
+
+# Много пользователей в одном процессе (см. mem0_graph/tenants.py)
+TENANTS = {
+    "max_agents": int(os.getenv("MEM0GRAPH_MAX_AGENTS", "1000")),  # агентов в LRU
+    "workers": int(os.getenv("MEM0GRAPH_TENANT_WORKERS", "16")),  # потоков на все запросы
+    "per_tenant": int(os.getenv("MEM0GRAPH_TENANT_CONCURRENCY", "2")),  # одновременно на пользователя
+    "max_queued": int(os.getenv("MEM0GRAPH_TENANT_QUEUE", "64")),  # ожидающих на пользователя
+}
+
+# Замеры этапов, токены и стоимость (см. mem0_graph/telemetry.py)
+TELEMETRY = {
+    "enabled": os.getenv("MEM0GRAPH_TELEMETRY", "1") != "0",
+    "window": 2048,  # последних замеров этапа для p50/p95
+    "otel": os.getenv("MEM0GRAPH_OTEL", "0") == "1",  # нужен opentelemetry-api
+    "prometheus_port": int(os.getenv("MEM0GRAPH_PROMETHEUS_PORT", "0")),  # 0 — не поднимать /metrics
+    # $ за миллион токенов запроса и ответа
+    "prices": {
+        "openai/gpt-4o-mini": {"prompt": 0.15, "completion": 0.60},
+        "gpt-4o-mini": {"prompt": 0.15, "completion": 0.60},
+    },
+}
@@ -0,0 +1,138 @@
+"""
+Сборка контекста для промпта: бюджет токенов, MMR-диверсификация и группировка
+воспоминаний по источнику (`metadata.source`).
+"""
+
+import math
+import operator
+
+from .chunking import approx_token_count
+from .hybrid import tokenize
+
+
+def _cosine(a, b):
+    dot = sum(map(operator.mul, a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(x * x for x in b))
+    return dot / norm if norm else 0.0
+
+
+def _jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class ContextBuilder:
+    """Отбирает воспоминания жадным MMR и упаковывает их в бюджет токенов.
+
+    Релевантность берётся из порядка, в котором воспоминания пришли из поиска,
+    сходство между ними — по эмбеддингам из векторного хранилища, а если их нет —
+    по пересечению слов. Почти дубликаты (сходство >= `duplicate_threshold`)
+    в контекст не попадают.
+    """
+
+    def __init__(self, max_tokens=1000, max_items=10, mmr_lambda=0.7,
+                 duplicate_threshold=0.95, counter=approx_token_count):
+        self.max_tokens = max_tokens
+        self.max_items = max_items
+        self.mmr_lambda = mmr_lambda
+        self.duplicate_threshold = duplicate_threshold
+        self.counter = counter
+
+    def _similarity(self, a, b):
+        if a["embedding"] is not None and b["embedding"] is not None:
+            return _cosine(a["embedding"], b["embedding"])
+        return _jaccard(a["terms"], b["terms"])
+
+    def _header(self, source):
+        return f"[source: {source}]"
+
+    def _select(self, candidates):
+        """Жадный MMR с учётом бюджета: кандидат, не влезающий в остаток, пропускается.
+
+        Первое воспоминание из нового источника платит и за строку-заголовок группы.
+        """
+        selected = []
+        sources = set()
+        max_sim = [0.0] * len(candidates)
+        remaining = set(range(len(candidates)))
+        budget = self.max_tokens
+        duplicates = 0
+
+        while remaining and len(selected) < self.max_items:
+            best, best_score = None, None
+            for i in remaining:
+                score = (
+                    self.mmr_lambda * candidates[i]["relevance"]
+                    - (1 - self.mmr_lambda) * max_sim[i]
+                )
+                if best_score is None or score > best_score:
+                    best, best_score = i, score
+            remaining.discard(best)
+
+            item = candidates[best]
+            if max_sim[best] >= self.duplicate_threshold:
+                duplicates += 1
+                continue
+            cost = item["tokens"]
+            if item["source"] and item["source"] not in sources:
+                cost += self.counter(self._header(item["source"])) + 1
+            if cost > budget:
+                continue
+
+            selected.append(item)
+            sources.add(item["source"])
+            budget -= cost
+            for i in remaining:
+                max_sim[i] = max(max_sim[i], self._similarity(candidates[i], item))
+
+        return selected, duplicates
+
+    def build(self, items, embeddings=None):
+        """Возвращает `(context, stats)`.
+
+        `embeddings` — словарь `id воспоминания -> вектор` (необязательно).
+        """
+        embeddings = embeddings or {}
+        texts = [m for m in items if m.get("memory")]
+        n = len(texts)
+
+        candidates = []
+        for rank, m in enumerate(texts):
+            text = m["memory"]
+            candidates.append(
+                {
+                    "item": m,
+                    "line": f"- {text}",
+                    "source": (m.get("metadata") or {}).get("source"),
+                    "relevance": 1.0 - rank / n,
+                    "embedding": embeddings.get(m.get("id")),
+                    "terms": set(tokenize(text)),
+                    # + маркер «-» и перевод строки
+                    "tokens": self.counter(text) + 2,
+                }
+            )
+
+        selected, duplicates = self._select(candidates)
+
+        # воспоминания без источника — первыми, затем группы по источнику
+        # в порядке лучшего воспоминания группы
+        groups = {None: []}
+        for c in selected:
+            groups.setdefault(c["source"], []).append(c["line"])
+
+        lines = []
+        for source, group in groups.items():
+            if source and group:
+                lines.append(self._header(source))
+            lines.extend(group)
+
+        stats = {
+            "tokens": sum(self.counter(line) + 1 for line in lines),
+            "budget": self.max_tokens,
+            "items": len(selected),
+            "candidates": n,
+            "duplicates": duplicates,
+            "sources": [s for s in groups if s],
+        }
+        return "\n".join(lines), stats
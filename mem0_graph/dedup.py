@@ -0,0 +1,116 @@
+"""
+Локальный индекс уже загруженных чанков (SQLite) для пропуска повторной загрузки.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def chunk_hash(text):
+    """Хеш нормализованного текста: регистр и пробелы не влияют на результат."""
+    normalized = _WHITESPACE_RE.sub(" ", text).strip().casefold()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def memory_ids_from_result(result):
+    """Достаёт id воспоминаний, созданных/обновлённых вызовом `Memory.add`."""
+    items = result.get("results", []) if isinstance(result, dict) else (result or [])
+    ids = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        if item.get("event", "ADD") in ("ADD", "UPDATE") and item.get("id"):
+            ids.append(item["id"])
+    return ids
+
+
+class ChunkIndex:
+    """Индекс (user_id, source, hash) -> id воспоминаний, появившихся из чанка."""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chunks (
+                    user_id TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    hash TEXT NOT NULL,
+                    memory_ids TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (user_id, source, hash)
+                )
+                """
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def contains(self, user_id, source, digest):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM chunks WHERE user_id = ? AND source = ? AND hash = ?",
+                (user_id, source or "", digest),
+            ).fetchone()
+        return row is not None
+
+    def record(self, user_id, source, digest, memory_ids):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?)",
+                (user_id, source or "", digest, json.dumps(list(memory_ids)), time.time()),
+            )
+
+    def hashes(self, user_id, source):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT hash FROM chunks WHERE user_id = ? AND source = ?",
+                (user_id, source or ""),
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def memory_ids(self, user_id, source, digest):
+        """Id воспоминаний, появившихся из чанка (пустой список, если записи нет)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT memory_ids FROM chunks WHERE user_id = ? AND source = ? AND hash = ?",
+                (user_id, source or "", digest),
+            ).fetchone()
+        return [] if row is None else json.loads(row[0])
+
+    def remove(self, user_id, source, digest):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM chunks WHERE user_id = ? AND source = ? AND hash = ?",
+                (user_id, source or "", digest),
+            )
+
+    def clear(self, user_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chunks WHERE user_id = ?", (user_id,))
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_chunk_index(path):
+    """Общий для процесса индекс файла `path`: одно соединение SQLite на всех пользователей."""
+    path = os.path.abspath(path)
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = _indexes[path] = ChunkIndex(path)
+        return index
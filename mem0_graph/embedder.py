@@ -0,0 +1,320 @@
+"""
+Локальный эмбеддер для Mem0: микро-пакеты, ONNX/int8 на CPU и кеш векторов на диске.
+
+- Запросы из разных потоков (поиск, фоновая запись, загрузка документов)
+  собираются в пакеты: воркер ждёт до `max_wait_ms` после первого запроса
+  или до `max_batch` текстов и кодирует их одним вызовом модели.
+- Бэкенд `onnx` / `onnx-int8` — ONNX Runtime через sentence-transformers
+  (нужны `optimum` и `onnxruntime`); если он недоступен, используется torch.
+- Вектор ищется сначала в кеше по хешу модели, бэкенда и текста: векторы
+  лежат в файле float16, отображённом в память (`numpy.memmap`), индекс
+  хеш → строка — в SQLite. Кеш рассчитан на один пишущий процесс.
+
+`install_embedder(memory)` подменяет эмбеддер, созданный Mem0 по `MEM0_CONFIG`,
+и переиспользует уже загруженную им модель.
+"""
+
+import hashlib
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from .telemetry import get_telemetry, log_event
+
+# Квантованные int8-веса из репозитория модели на Hugging Face
+ONNX_INT8_FILE = "onnx/model_quint8_avx2.onnx"
+
+
+def text_key(model, text):
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()[:32]
+
+
+class EmbeddingCache:
+    """Кеш `хеш текста -> вектор`: float16-матрица в memmap и индекс в SQLite."""
+
+    def __init__(self, path, dims, initial_rows=1024):
+        self.dims = dims
+        self.vectors_path = path + ".f16"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path + ".sqlite3", check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, row INTEGER NOT NULL)"
+            )
+        self._rows = dict(self._conn.execute("SELECT key, row FROM vectors"))
+        self._capacity = 0
+        self._vectors = None
+        self._grow(max(initial_rows, len(self._rows)))
+        self.hits = 0
+        self.misses = 0
+
+    def _grow(self, capacity):
+        """Увеличить файл векторов до `capacity` строк и заново отобразить его в память."""
+        if self._vectors is not None:
+            self._vectors.flush()
+        size = capacity * self.dims * 2
+        with open(self.vectors_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self._vectors = np.memmap(
+            self.vectors_path, dtype=np.float16, mode="r+", shape=(capacity, self.dims)
+        )
+        self._capacity = capacity
+
+    def __len__(self):
+        return len(self._rows)
+
+    def get_many(self, keys):
+        """`{ключ: вектор float32}` для найденных ключей."""
+        with self._lock:
+            found = {}
+            for key in keys:
+                row = self._rows.get(key)
+                if row is not None:
+                    found[key] = self._vectors[row].astype(np.float32)
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+            return found
+
+    def put_many(self, items):
+        """Сохранить `(ключ, вектор)`; строки в индексе появляются после записи векторов."""
+        with self._lock:
+            new = {}
+            for key, vector in items:
+                if key in self._rows or key in new:
+                    continue
+                row = len(self._rows) + len(new)
+                if row >= self._capacity:
+                    self._grow(self._capacity * 2)
+                self._vectors[row] = vector
+                new[key] = row
+            if not new:
+                return
+            self._vectors.flush()
+            with self._conn:
+                self._conn.executemany("INSERT OR IGNORE INTO vectors VALUES (?, ?)", new.items())
+            self._rows.update(new)
+
+    def close(self):
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+            self._conn.close()
+
+
+class SentenceTransformerBackend:
+    """Кодирование пакета текстов моделью sentence-transformers (torch или ONNX)."""
+
+    def __init__(self, model="sentence-transformers/all-MiniLM-L6-v2", backend="torch",
+                 onnx_file=None, device="cpu", instance=None):
+        self.name = model
+        self.backend = backend
+        self.onnx_file = onnx_file or ONNX_INT8_FILE
+        if instance is not None and backend == "torch":
+            self.model = instance
+            return
+        from sentence_transformers import SentenceTransformer
+
+        if backend == "torch":
+            self.model = SentenceTransformer(model, device=device)
+            return
+        try:
+            kwargs = {}
+            if backend == "onnx-int8":
+                kwargs["model_kwargs"] = {"file_name": self.onnx_file}
+            self.model = SentenceTransformer(model, device=device, backend="onnx", **kwargs)
+        except Exception as e:
+            log_event(
+                "embedder.fallback", logging.WARNING, model=model, backend=backend,
+                fallback="torch", error=str(e),
+            )
+            self.backend = "torch"
+            self.model = instance or SentenceTransformer(model, device=device)
+
+    @property
+    def cache_id(self):
+        """Модель и способ вычисления: векторы torch, ONNX и int8 немного различаются."""
+        if self.backend == "onnx-int8":
+            return f"{self.name}|{self.backend}|{self.onnx_file}"
+        return f"{self.name}|{self.backend}"
+
+    @property
+    def dims(self):
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts):
+        return self.model.encode(texts, batch_size=len(texts), convert_to_numpy=True)
+
+
+class MicroBatcher:
+    """Собирает запросы из разных потоков в пакеты для одного вызова `encode`."""
+
+    def __init__(self, encode, max_batch=32, max_wait_ms=2.0):
+        self.encode = encode
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self.batches = 0
+        self.texts = 0
+        self._thread = threading.Thread(target=self._run, name="embedder-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts):
+        """Future со списком векторов для `texts`."""
+        future = Future()
+        self._queue.put((list(texts), future))
+        return future
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        requests = [first]
+        size = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)
+                break
+            requests.append(request)
+            size += len(request[0])
+        return requests
+
+    def _run(self):
+        while True:
+            requests = self._collect()
+            if requests is None:
+                return
+            texts = [text for request_texts, _ in requests for text in request_texts]
+            try:
+                with get_telemetry().span("embedding.batch", texts=len(texts)):
+                    vectors = self.encode(texts)
+            except Exception as e:
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.texts += len(texts)
+            start = 0
+            for request_texts, future in requests:
+                future.set_result(vectors[start:start + len(request_texts)])
+                start += len(request_texts)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+
+class LocalEmbedder:
+    """Эмбеддер с интерфейсом Mem0 (`embed(text, memory_action)`): кеш, затем пакетная модель."""
+
+    def __init__(self, backend, cache_path=None, max_batch=32, max_wait_ms=2.0, config=None):
+        self.backend = backend
+        # настройки Mem0 (embedding_dims и т.п.) остаются от подменённого эмбеддера
+        self.config = config
+        # ключ кеша включает бэкенд: после смены torch -> int8 старые векторы не подходят
+        self.cache_id = getattr(backend, "cache_id", None) or f"{backend.name}|{backend.backend}"
+        self.cache = EmbeddingCache(cache_path, backend.dims) if cache_path else None
+        self.batcher = MicroBatcher(self._encode, max_batch=max_batch, max_wait_ms=max_wait_ms)
+
+    def _encode(self, texts):
+        """Пакет для модели: повторы внутри пакета кодируются один раз, результат — в кеш."""
+        unique = list(dict.fromkeys(texts))
+        encoded = np.asarray(self.backend.encode(unique), dtype=np.float32)
+        if self.cache is not None:
+            # в кеше float16: новый вектор округляется так же, чтобы ответы не зависели от кеша
+            encoded = encoded.astype(np.float16).astype(np.float32)
+            self.cache.put_many(
+                (text_key(self.cache_id, text), vector) for text, vector in zip(unique, encoded)
+            )
+        by_text = dict(zip(unique, encoded))
+        return [by_text[text] for text in texts]
+
+    def embed_many(self, texts):
+        """Векторы (списки float) для `texts`; промахи кеша уходят в модель одним запросом."""
+        texts = list(texts)
+        with get_telemetry().span("embedding", texts=len(texts)) as span:
+            keys = [text_key(self.cache_id, text) for text in texts]
+            found = self.cache.get_many(keys) if self.cache is not None else {}
+            missing = [text for text, key in zip(texts, keys) if key not in found]
+            span["cached"] = len(texts) - len(missing)
+            if missing:
+                computed = dict(zip(missing, self.batcher.submit(missing).result()))
+        vectors = []
+        for text, key in zip(texts, keys):
+            vector = found[key] if key in found else computed[text]
+            vectors.append(vector.tolist())
+        return vectors
+
+    def embed(self, text, memory_action=None):
+        """Вектор одного текста (так Mem0 вызывает эмбеддер при add и search)."""
+        return self.embed_many([text])[0]
+
+    def stats(self):
+        stats = {
+            "backend": self.backend.backend,
+            "batches": self.batcher.batches,
+            "encoded": self.batcher.texts,
+        }
+        if self.cache is not None:
+            stats.update(cached=len(self.cache), hits=self.cache.hits, misses=self.cache.misses)
+        return stats
+
+    def close(self):
+        self.batcher.close()
+        if self.cache is not None:
+            self.cache.close()
+
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+
+def get_embedder(model, backend="torch", onnx_file=None, cache_path=None, max_batch=32,
+                 max_wait_ms=2.0, instance=None, config=None):
+    """Общий для процесса эмбеддер: пакеты собираются из всех сессий."""
+    global _embedder
+    with _embedder_lock:
+        if _embedder is None:
+            _embedder = LocalEmbedder(
+                SentenceTransformerBackend(model, backend, onnx_file, instance=instance),
+                cache_path=cache_path,
+                max_batch=max_batch,
+                max_wait_ms=max_wait_ms,
+                config=config,
+            )
+        return _embedder
+
+
+def install_embedder(memory, model, **options):
+    """Подменить эмбеддеры Mem0 (векторного хранилища и графа) общим локальным.
+
+    Уже загруженная Mem0 модель sentence-transformers переиспользуется.
+    Возвращает установленный эмбеддер.
+    """
+    stock = getattr(memory, "embedding_model", None)
+    embedder = get_embedder(
+        model,
+        instance=getattr(stock, "model", None),
+        config=getattr(stock, "config", None),
+        **options,
+    )
+    memory.embedding_model = embedder
+    graph = getattr(memory, "graph", None)
+    if graph is not None and hasattr(graph, "embedding_model"):
+        graph.embedding_model = embedder
+    return embedder
@@ -0,0 +1,201 @@
+"""
+Уровни детализации графа (LOD): большой граф сворачивается на сервере до того,
+как попадёт в браузер.
+
+Сообщества ищутся Louvain из networkx; каждое свёрнутое сообщество становится
+одним супер-узлом, а параллельные связи между отображаемыми узлами склеиваются
+в одну по типу связи («works_at ×12»). Раскрытые сообщества показывают свои
+узлы, но не больше бюджета: узлы с наименьшей степенью остаются в супер-узле.
+Координаты для вида считает mem0_graph/layout.py.
+"""
+
+import hashlib
+import math
+from collections import Counter
+
+import networkx as nx
+
+from .graph_model import as_compact_graph, node_size
+
+
+def cluster_id(index):
+    return f"cluster:{index}"
+
+
+def cluster_layout_key(members):
+    """Ключ супер-узла в кеше раскладки: номера кластеров меняются при каждом
+    пересчёте Louvain, а состав — только вместе с графом."""
+    digest = hashlib.sha1("\0".join(sorted(map(str, members))).encode("utf-8")).hexdigest()
+    return f"cluster#{digest[:16]}"
+
+
+class GraphSummarizer:
+    """Сводка графа: супер-узлы сообществ, отсечение по степени, пучки связей.
+
+    Граф до `max_nodes` узлов возвращается без изменений (`summarized=False`).
+    Разбиение на сообщества кешируется по ключу (например, версии снимка графа),
+    поэтому раскрытие кластера не пересчитывает Louvain.
+    """
+
+    def __init__(self, max_nodes=300, resolution=1.0, seed=42, label_members=3):
+        self.max_nodes = max_nodes
+        self.resolution = resolution
+        self.seed = seed
+        self.label_members = label_members
+        self._cache_key = None
+        self._cache = None
+
+    def communities(self, graph, key=None):
+        """Сообщества по убыванию размера: `(список множеств, {узел: номер})`."""
+        if key is not None and key == self._cache_key:
+            return self._cache
+        communities = nx.community.louvain_communities(
+            graph, weight="weight", resolution=self.resolution, seed=self.seed
+        )
+        communities = sorted(communities, key=lambda c: (-len(c), min(c)))
+        membership = {node: i for i, members in enumerate(communities) for node in members}
+        self._cache_key, self._cache = key, (communities, membership)
+        return communities, membership
+
+    def summarize(self, data, expanded=(), key=None):
+        """Вид графа: `{"nodes", "edges", "clusters", "summarized", "stats"}`.
+
+        `data` — CompactGraph или записи GRAPH_RETURN; `expanded` — id кластеров
+        (`cluster:N`), которые нужно показать по узлам.
+        """
+        compact = as_compact_graph(data)
+        if compact.node_count <= self.max_nodes:
+            return self._detail_view(compact)
+
+        graph = compact.to_networkx()
+        communities, membership = self.communities(graph, key)
+        expanded = {cid for cid in expanded if cid.startswith("cluster:")}
+        degree = dict(graph.degree(weight="weight"))
+
+        # бюджет на раскрытые кластеры: всё, что не занято супер-узлами
+        budget = max(self.max_nodes - len(communities), 0)
+        shown = set()
+        for i, members in enumerate(communities):
+            if cluster_id(i) not in expanded:
+                continue
+            ranked = sorted(members, key=lambda node: degree[node], reverse=True)
+            keep = ranked[:budget]
+            shown.update(keep)
+            budget -= len(keep)
+
+        def display(node):
+            return node if node in shown else cluster_id(membership[node])
+
+        nodes = {}
+        clusters = []
+        hidden = Counter(membership[node] for node in graph if node not in shown)
+        for i, members in enumerate(communities):
+            cid = cluster_id(i)
+            top = sorted(members, key=lambda node: degree[node], reverse=True)
+            names = [graph.nodes[node]["label"] for node in top[: self.label_members]]
+            label = ", ".join(names)
+            if len(members) > len(names):
+                label += f" (+{len(members) - len(names)})"
+            clusters.append({"id": cid, "label": label, "size": len(members)})
+            if not hidden[i]:
+                continue
+            colors = Counter(graph.nodes[node]["color"] for node in members)
+            nodes[cid] = {
+                "id": cid,
+                "label": label[:35],
+                "title": f"Кластер {i}: {len(members)} узлов"
+                + (f", скрыто {hidden[i]}" if hidden[i] < len(members) else "")
+                + f"\n{label}",
+                "color": colors.most_common(1)[0][0],
+                "size": 20 + 8 * math.log2(hidden[i]),
+                "shape": "dot",
+                "cluster": cid,
+                "layout_key": cluster_layout_key(members),
+            }
+        for node in shown:
+            attrs = graph.nodes[node]
+            nodes[node] = self._node(
+                node, attrs["label"], attrs["labels"], attrs["color"], cluster_id(membership[node])
+            )
+
+        edges = self._bundle(compact.edges(), display)
+        return {
+            "nodes": list(nodes.values()),
+            "edges": edges,
+            "clusters": clusters,
+            "summarized": True,
+            "stats": {
+                "nodes": compact.node_count,
+                "edges": compact.edge_count,
+                "shown_nodes": len(nodes),
+                "shown_edges": len(edges),
+            },
+        }
+
+    @staticmethod
+    def _node(node_id, label, labels, color, cluster=None):
+        return {
+            "id": node_id,
+            "label": label[:35],
+            "title": f"{label}\nТип: {list(labels)}",
+            "color": color,
+            "size": node_size(labels),
+            "cluster": cluster,
+        }
+
+    def _detail_view(self, compact):
+        nodes = []
+        for i, node_id in enumerate(compact.node_ids):
+            kind = compact.kind(i)
+            nodes.append(self._node(node_id, compact.node_names[i], kind.labels, kind.color))
+        edges = self._bundle(compact.edges(), lambda node: node)
+        return {
+            "nodes": nodes,
+            "edges": edges,
+            "clusters": [],
+            "summarized": False,
+            "stats": {
+                "nodes": len(nodes),
+                "edges": compact.edge_count,
+                "shown_nodes": len(nodes),
+                "shown_edges": len(edges),
+            },
+        }
+
+    @staticmethod
+    def _bundle(edges, display):
+        """Склеивает связи `(источник, тип, цель)` между одними и теми же
+        отображаемыми узлами по типу связи. Связи внутри одного супер-узла не рисуются.
+        """
+        bundles = Counter()
+        for source, relation, target in edges:
+            src, tgt = display(source), display(target)
+            if src == tgt and src.startswith("cluster:"):
+                continue
+            bundles[(src, tgt, relation)] += 1
+
+        edges = []
+        for (src, tgt, relation), count in bundles.items():
+            label = relation if count == 1 else f"{relation} ×{count}"
+            edges.append(
+                {
+                    "source": src,
+                    "target": tgt,
+                    "relation": relation,
+                    "label": label,
+                    "title": label,
+                    "count": count,
+                    "width": 1 + math.log2(count),
+                }
+            )
+        return edges
+
+
+def view_graph(view):
+    """Граф networkx из вида (узлы и пучки связей) — для раскладки."""
+    graph = nx.Graph()
+    graph.add_nodes_from(node["id"] for node in view["nodes"])
+    for edge in view["edges"]:
+        if edge["source"] != edge["target"]:
+            graph.add_edge(edge["source"], edge["target"], weight=edge["count"])
+    return graph
@@ -0,0 +1,308 @@
+"""
+Компактная модель графа для визуализации.
+
+Узлы интернируются в таблицу (id → номер), наборы меток узлов и типы связей —
+в свои таблицы, а цвет и размер считаются один раз на набор меток. Связи
+хранятся в трёх массивах `array` (откуда, тип, куда) вместо словаря со всеми
+полями запроса на каждую связь. Модель строится один раз из потока записей
+Neo4j (или из словарей `record.data()`) и выгружается в PyVis, JSON, GraphML
+и networkx.
+"""
+
+import re
+from array import array
+from xml.sax.saxutils import escape, quoteattr
+
+# Цвет узла по метке, в порядке приоритета
+LABEL_COLORS = (
+    ("user", "#6366f1"),  # Indigo
+    ("__user__", "#6366f1"),
+    ("entity", "#f97316"),  # Orange
+    ("memory", "#22c55e"),  # Green
+    ("person", "#e11d48"),  # Red
+    ("location", "#0ea5e9"),  # Sky
+    ("organization", "#8b5cf6"),  # Violet
+)
+DEFAULT_COLOR = "#94a3b8"  # Slate
+EDGE_COLOR = "#64748b"
+
+_COLOR_RANK = {label: (rank, color) for rank, (label, color) in enumerate(LABEL_COLORS)}
+_LABEL_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def quote_label(label):
+    """Метку нельзя передать параметром Cypher, поэтому она проверяется и экранируется."""
+    if not _LABEL_RE.match(label):
+        raise ValueError(f"Недопустимая метка узла: {label!r}")
+    return f"`{label}`"
+
+
+def node_color(labels):
+    """Цвет узла по его меткам."""
+    best = None
+    for label in labels or ():
+        hit = _COLOR_RANK.get(label.lower())
+        if hit is not None and (best is None or hit < best):
+            best = hit
+    return best[1] if best else DEFAULT_COLOR
+
+
+def node_size(labels):
+    return 25 if (labels and "User" in labels) else 20
+
+
+def node_label(record, prefix):
+    """Читаемая подпись узла `n` или `m` из записи GRAPH_RETURN."""
+    return (record.get(f'{prefix}_name') or
+            record.get(f'{prefix}_memory') or
+            record.get(f'{prefix}_value') or
+            record.get(f'{prefix}_text') or
+            record.get(f'{prefix}_id') or
+            (record[f'{prefix}_labels'][-1] if record[f'{prefix}_labels'] else 'Node'))
+
+
+class NodeKind:
+    """Набор меток узла и посчитанный по нему стиль (таблица поиска)."""
+
+    __slots__ = ("labels", "color", "size", "type_text")
+
+    def __init__(self, labels):
+        self.labels = labels
+        self.color = node_color(labels)
+        self.size = node_size(labels)
+        self.type_text = f"Тип: {list(labels)}"
+
+
+class CompactGraph:
+    """Граф: таблица узлов, таблицы типов и массивы связей.
+
+    Повторная связь (тот же источник, тип и цель) не добавляется.
+    """
+
+    __slots__ = (
+        "node_ids",
+        "node_names",
+        "node_kinds",
+        "kinds",
+        "relations",
+        "src",
+        "rel",
+        "dst",
+        "_node_index",
+        "_kind_index",
+        "_relation_index",
+        "_edge_index",
+    )
+
+    def __init__(self):
+        self.node_ids = []
+        self.node_names = []
+        self.node_kinds = array("I")
+        self.kinds = []
+        self.relations = []
+        self.src = array("I")
+        self.rel = array("I")
+        self.dst = array("I")
+        self._node_index = {}
+        self._kind_index = {}
+        self._relation_index = {}
+        self._edge_index = set()
+
+    @classmethod
+    def from_records(cls, records):
+        graph = cls()
+        for record in records:
+            graph.add_record(record)
+        return graph
+
+    @property
+    def node_count(self):
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self):
+        return len(self.src)
+
+    def __bool__(self):
+        return bool(self.src)
+
+    def _intern_node(self, node_id, record, prefix):
+        index = self._node_index.get(node_id)
+        if index is not None:
+            return index
+        labels = tuple(record[f"{prefix}_labels"] or ())
+        kind = self._kind_index.get(labels)
+        if kind is None:
+            kind = self._kind_index[labels] = len(self.kinds)
+            self.kinds.append(NodeKind(labels))
+        index = self._node_index[node_id] = len(self.node_ids)
+        self.node_ids.append(node_id)
+        self.node_names.append(str(node_label(record, prefix)))
+        self.node_kinds.append(kind)
+        return index
+
+    def _intern_relation(self, relation):
+        index = self._relation_index.get(relation)
+        if index is None:
+            index = self._relation_index[relation] = len(self.relations)
+            self.relations.append(relation)
+        return index
+
+    def add_record(self, record):
+        """Добавить связь из записи GRAPH_RETURN (Record драйвера или словарь).
+
+        Возвращает False, если такая связь уже есть.
+        """
+        src = self._intern_node(record["source"], record, "n")
+        dst = self._intern_node(record["target"], record, "m")
+        rel = self._intern_relation(record["relation"] or "related")
+        key = (src << 64) | (dst << 32) | rel
+        if key in self._edge_index:
+            return False
+        self._edge_index.add(key)
+        self.src.append(src)
+        self.rel.append(rel)
+        self.dst.append(dst)
+        return True
+
+    def kind(self, index):
+        return self.kinds[self.node_kinds[index]]
+
+    def edges(self):
+        """Связи как `(id источника, тип, id цели)`."""
+        ids, relations = self.node_ids, self.relations
+        for s, r, t in zip(self.src, self.rel, self.dst):
+            yield ids[s], relations[r], ids[t]
+
+    def degrees(self):
+        """Степень каждого узла (массив по номерам узлов)."""
+        degree = array("I", bytes(4 * len(self.node_ids)))
+        for s, t in zip(self.src, self.dst):
+            degree[s] += 1
+            if t != s:
+                degree[t] += 1
+        return degree
+
+    def records(self):
+        """Связи в виде словарей с основными полями GRAPH_RETURN (для совместимости)."""
+        for s, r, t in zip(self.src, self.rel, self.dst):
+            yield {
+                "source": self.node_ids[s],
+                "target": self.node_ids[t],
+                "relation": self.relations[r],
+                "n_labels": list(self.kind(s).labels),
+                "m_labels": list(self.kind(t).labels),
+                "n_name": self.node_names[s],
+                "m_name": self.node_names[t],
+            }
+
+    def to_networkx(self):
+        """Неориентированный граф networkx: вес ребра — число связей между парой узлов."""
+        import networkx as nx
+
+        graph = nx.Graph()
+        for i, node_id in enumerate(self.node_ids):
+            kind = self.kind(i)
+            graph.add_node(node_id, label=self.node_names[i], labels=kind.labels, color=kind.color)
+        ids = self.node_ids
+        for s, t in zip(self.src, self.dst):
+            if s == t:
+                continue
+            u, v = ids[s], ids[t]
+            if graph.has_edge(u, v):
+                graph[u][v]["weight"] += 1
+            else:
+                graph.add_edge(u, v, weight=1)
+        return graph
+
+    def to_pyvis(self, net, positions=None, scale=1.0, styles=None):
+        """Добавить узлы и связи в `pyvis.network.Network`.
+
+        Пишет прямо в списки сети: `add_node`/`add_edge` ищут дубликаты
+        перебором списков, что на десятках тысяч связей квадратично.
+        `positions` — `{id узла: (x, y)}`, такие узлы закрепляются без физики;
+        `styles` — `{id узла: параметры}` поверх цвета и размера по типу.
+        """
+        for i, node_id in enumerate(self.node_ids):
+            kind = self.kind(i)
+            name = self.node_names[i]
+            options = {
+                "color": kind.color,
+                "title": f"{name}\n{kind.type_text}",
+                "size": kind.size,
+            }
+            if styles and node_id in styles:
+                options.update(styles[node_id])
+            if positions and node_id in positions:
+                x, y = positions[node_id]
+                options.update(x=x * scale, y=y * scale, physics=False)
+            add_pyvis_node(net, node_id, name[:35], options)
+        for node_id_src, relation, node_id_dst in self.edges():
+            add_pyvis_edge(net, node_id_src, node_id_dst, {"label": relation, "title": relation})
+        return net
+
+    def to_json(self):
+        """Компактное JSON-представление: таблицы узлов и типов, связи — тройки номеров."""
+        return {
+            "nodes": [
+                {"id": node_id, "label": self.node_names[i], "kind": self.node_kinds[i]}
+                for i, node_id in enumerate(self.node_ids)
+            ],
+            "kinds": [
+                {"labels": list(kind.labels), "color": kind.color, "size": kind.size}
+                for kind in self.kinds
+            ],
+            "relations": list(self.relations),
+            "edges": [[s, r, t] for s, r, t in zip(self.src, self.rel, self.dst)],
+        }
+
+    def to_graphml(self, path):
+        """Записать граф в GraphML (потоково, без networkx)."""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            f.write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+            f.write('  <key id="label" for="node" attr.name="label" attr.type="string"/>\n')
+            f.write('  <key id="labels" for="node" attr.name="labels" attr.type="string"/>\n')
+            f.write('  <key id="relation" for="edge" attr.name="relation" attr.type="string"/>\n')
+            f.write('  <graph id="G" edgedefault="directed">\n')
+            for i, node_id in enumerate(self.node_ids):
+                labels = ":".join(self.kind(i).labels)
+                f.write(
+                    f"    <node id={quoteattr(node_id)}>"
+                    f'<data key="label">{escape(self.node_names[i])}</data>'
+                    f'<data key="labels">{escape(labels)}</data></node>\n'
+                )
+            for node_id_src, relation, node_id_dst in self.edges():
+                f.write(
+                    f"    <edge source={quoteattr(node_id_src)} target={quoteattr(node_id_dst)}>"
+                    f'<data key="relation">{escape(relation)}</data></edge>\n'
+                )
+            f.write("  </graph>\n</graphml>\n")
+        return path
+
+
+def as_compact_graph(data):
+    """CompactGraph из списка записей (или сам граф, если он уже компактный)."""
+    return data if isinstance(data, CompactGraph) else CompactGraph.from_records(data)
+
+
+def add_pyvis_node(net, node_id, label, options):
+    """Узел в формате `pyvis.node.Node`, без поиска дубликатов перебором."""
+    if node_id in net.node_map:
+        return
+    options = dict(options, id=node_id, label=label, shape=options.get("shape", "dot"))
+    if net.font_color:
+        options["font"] = {"color": net.font_color}
+    net.nodes.append(options)
+    net.node_ids.append(node_id)
+    net.node_map[node_id] = options
+
+
+def add_pyvis_edge(net, source, target, options):
+    """Связь в формате `pyvis.edge.Edge`."""
+    options = dict(options, color=options.get("color", EDGE_COLOR))
+    options["from"] = source
+    options["to"] = target
+    if net.directed and "arrows" not in options:
+        options["arrows"] = "to"
+    net.edges.append(options)
@@ -0,0 +1,80 @@
+"""
+JSON-представление отрисованного графа для фронтенда: узлы с координатами и
+связи по стабильным id, хеш содержимого и разница между версиями.
+
+Фронтенд, у которого уже есть версия `base`, получает только изменения
+(`upsert` и `remove` для узлов и связей); без неё — граф целиком. Полезная
+нагрузка сжимается gzip.
+"""
+
+import gzip
+import hashlib
+import json
+
+
+def edge_key(edge):
+    return f"{edge['source']}|{edge['relation']}|{edge['target']}"
+
+
+def view_payload(view, positions, scale=1.0):
+    """`{"nodes": {id: узел}, "edges": {id: связь}}` из вида и координат."""
+    nodes = {}
+    for node in view["nodes"]:
+        x, y = positions.get(node["id"], (0.0, 0.0))
+        nodes[node["id"]] = {
+            "id": node["id"],
+            "label": node["label"],
+            "title": node["title"],
+            "color": node["color"],
+            "size": node["size"],
+            "x": round(x * scale, 1),
+            "y": round(y * scale, 1),
+        }
+    edges = {}
+    for edge in view["edges"]:
+        key = edge_key(edge)
+        edges[key] = {
+            "id": key,
+            "from": edge["source"],
+            "to": edge["target"],
+            "label": edge["label"],
+            "title": edge["title"],
+            "width": edge["width"],
+        }
+    return {"nodes": nodes, "edges": edges}
+
+
+def payload_digest(payload, extra=""):
+    """Хеш содержимого: одинаковые граф и координаты дают одинаковый хеш."""
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256((data + extra).encode("utf-8")).hexdigest()[:16]
+
+
+def full_message(payload, version):
+    return {
+        "version": version,
+        "base": None,
+        "nodes": {"upsert": list(payload["nodes"].values()), "remove": []},
+        "edges": {"upsert": list(payload["edges"].values()), "remove": []},
+    }
+
+
+def diff_message(old, new, base, version):
+    """Изменения от `old` к `new`: новые и изменённые элементы, id удалённых."""
+    message = {"version": version, "base": base}
+    for part in ("nodes", "edges"):
+        before, after = old[part], new[part]
+        message[part] = {
+            "upsert": [item for key, item in after.items() if before.get(key) != item],
+            "remove": [key for key in before if key not in after],
+        }
+    return message
+
+
+def encode_message(message):
+    data = json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return gzip.compress(data, compresslevel=6)
+
+
+def decode_message(data):
+    return json.loads(gzip.decompress(data).decode("utf-8"))
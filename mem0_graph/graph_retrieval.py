@@ -0,0 +1,197 @@
+"""
+Расширение поиска через граф: к текстовым воспоминаниям добавляются факты
+из окрестности найденных сущностей в Neo4j.
+
+Стартовые сущности — концы связей, которые вернул `Memory.search` (поле
+`relations`), и сущности, упомянутые в лучших воспоминаниях. Их окрестность
+в 1–2 шага читается одним запросом на всю пачку; факты оцениваются по весу
+стартовой сущности и удалённости и попадают в контекст в пределах своего
+бюджета токенов. Дополнительных вызовов LLM нет.
+"""
+
+import time
+
+from .analytics import mentioned_entities
+from .chunking import approx_token_count
+from .graph_model import quote_label
+
+# Окрестность всех стартовых сущностей одним запросом: до $fanout связей у
+# каждой сущности и до $far_limit связей на втором шаге (свежие первыми)
+NEIGHBOURHOOD_QUERY = """
+        UNWIND $names AS name
+        MATCH (seed:{label} {{user_id: $user_id, name: name}})
+        CALL {{
+            WITH seed
+            MATCH (seed)-[r]-(:{label} {{user_id: $user_id}})
+            RETURN r, 1 AS hop
+            ORDER BY r.created DESC
+            LIMIT $fanout
+          UNION
+            WITH seed
+            MATCH (seed)-[near_r]-(near:{label} {{user_id: $user_id}})
+            WHERE $depth > 1
+            WITH seed, near
+            ORDER BY near_r.created DESC
+            LIMIT $fanout
+            MATCH (near)-[r]-(far:{label} {{user_id: $user_id}})
+            WHERE far <> seed
+            WITH r
+            ORDER BY r.created DESC
+            LIMIT $far_limit
+            RETURN r, 2 AS hop
+        }}
+        WITH name, r, min(hop) AS hop
+        RETURN name AS seed,
+               startNode(r).name AS source,
+               type(r) AS relation,
+               endNode(r).name AS target,
+               hop,
+               r.created AS created
+"""
+
+
+class SearchResults(list):
+    """Нормализованные воспоминания из `Memory.search` и связи графа (`relations`)."""
+
+    def __init__(self, items=(), relations=()):
+        super().__init__(items)
+        self.relations = list(relations)
+
+
+def normalize_relations(result):
+    """Связи из ответа `Memory.search` как `{"source", "relation", "target"}`."""
+    if not isinstance(result, dict):
+        return []
+    relations = []
+    for item in result.get("relations") or []:
+        if not isinstance(item, dict):
+            continue
+        source = item.get("source")
+        target = item.get("destination") or item.get("target")
+        relation = item.get("relationship") or item.get("relation")
+        if source and target and relation:
+            relations.append({"source": source, "relation": relation, "target": target})
+    return relations
+
+
+def fact_line(fact):
+    return f"- {fact['source']} → {fact['relation']} → {fact['target']}"
+
+
+class GraphExpander:
+    """Стартовые сущности → окрестность в Neo4j → оценённые факты в бюджете токенов."""
+
+    def __init__(self, pool=None, node_label="__Entity__", depth=2, fanout=10, far_limit=30,
+                 max_seeds=10, seed_hits=5, hop_decay=0.5, max_facts=20, max_tokens=300):
+        self._pool = pool
+        self.query = NEIGHBOURHOOD_QUERY.format(label=quote_label(node_label))
+        self.depth = depth
+        self.fanout = fanout
+        self.far_limit = far_limit
+        self.max_seeds = max_seeds
+        # сущности ищутся в тексте только `seed_hits` лучших воспоминаний
+        self.seed_hits = seed_hits
+        # вес факта падает в hop_decay раз с каждым шагом от стартовой сущности
+        self.hop_decay = hop_decay
+        self.max_facts = max_facts
+        self.max_tokens = max_tokens
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            from .neo4j_pool import get_pool
+
+            self._pool = get_pool()
+        return self._pool
+
+    def seeds(self, results, relations, entity_names=None):
+        """`{имя узла: вес}`: концы найденных связей (вес 1) и сущности из лучших воспоминаний.
+
+        `entity_names` — `{ключ entity_key: имя узла}` (см. `GraphAnalysis.entity_names`);
+        без него сущности в тексте не ищутся.
+        """
+        weights = {}
+        for relation in relations:
+            for name in (relation["source"], relation["target"]):
+                weights[name] = 1.0
+        if entity_names:
+            hits = results[: self.seed_hits]
+            for rank, item in enumerate(hits):
+                weight = 1.0 - rank / len(hits)
+                for key in mentioned_entities(item.get("memory") or "", entity_names):
+                    name = entity_names[key]
+                    weights[name] = max(weights.get(name, 0.0), weight)
+        top = sorted(weights.items(), key=lambda pair: -pair[1])[: self.max_seeds]
+        return dict(top)
+
+    def neighbourhood(self, user_id, names):
+        """Связи в 1–`depth` шагах от сущностей `names` (один запрос)."""
+        if not names:
+            return []
+        records = self.pool.read(
+            self.query,
+            user_id=user_id,
+            names=list(names),
+            depth=self.depth,
+            fanout=self.fanout,
+            far_limit=self.far_limit,
+        )
+        return [record.data() for record in records]
+
+    def facts(self, relations, records, seeds):
+        """Факты по убыванию оценки, без повторов.
+
+        Связи из ответа поиска получают оценку 1, факты окрестности —
+        `вес стартовой сущности × hop_decay ** шаг`.
+        """
+        facts = {}
+
+        def add(source, relation, target, score, hop, created=None):
+            key = (source, relation, target)
+            if key not in facts or facts[key]["score"] < score:
+                facts[key] = {
+                    "source": source,
+                    "relation": relation,
+                    "target": target,
+                    "score": score,
+                    "hop": hop,
+                    "created": created,
+                }
+
+        for relation in relations:
+            add(relation["source"], relation["relation"], relation["target"], 1.0, 0)
+        for record in records:
+            score = seeds.get(record["seed"], 0.0) * self.hop_decay ** record["hop"]
+            add(record["source"], record["relation"], record["target"], score,
+                record["hop"], record.get("created"))
+        return sorted(facts.values(), key=lambda f: (-f["score"], -(f["created"] or 0)))
+
+    def pack(self, facts):
+        """Строки фактов в пределах `max_facts` и `max_tokens`; не влезающий факт пропускается."""
+        lines, seen, tokens = [], set(), 0
+        for fact in facts:
+            if len(lines) >= self.max_facts:
+                break
+            line = fact_line(fact)
+            cost = approx_token_count(line) + 1
+            if line in seen or tokens + cost > self.max_tokens:
+                continue
+            seen.add(line)
+            lines.append(line)
+            tokens += cost
+        return lines, tokens
+
+    def expand(self, user_id, results, relations, entity_names=None):
+        """`(строки фактов, статистика)` для контекста промпта."""
+        started = time.perf_counter()
+        seeds = self.seeds(results, relations, entity_names)
+        records = self.neighbourhood(user_id, seeds)
+        lines, tokens = self.pack(self.facts(relations, records, seeds))
+        return lines, {
+            "seeds": len(seeds),
+            "neighbours": len(records),
+            "facts": len(lines),
+            "tokens": tokens,
+            "budget": self.max_tokens,
+            "seconds": time.perf_counter() - started,
+        }
@@ -1,33 +1,35 @@
-from neo4j import GraphDatabase
-from pyvis.network import Network
-
+import os
+import threading
+import time
+from collections import OrderedDict
 
-class Neo4jGraphViz:
-    """Визуализация нативного графа знаний из Neo4j"""
-    
-    def __init__(self, uri="bolt://localhost:7687", user="neo4j", password="password123"):
-        self.uri = uri
-        self.user = user
-        self.password = password
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+from pyvis.network import Network
 
-    def close(self):
-        """Закрыть соединение с базой"""
-        if self.driver:
-            self.driver.close()
+from .graph_model import (
+    CompactGraph,
+    add_pyvis_edge,
+    add_pyvis_node,
+    as_compact_graph,
+    node_label,
+    quote_label as _quote_label,
+)
+from .graph_payload import (
+    diff_message,
+    encode_message,
+    full_message,
+    payload_digest,
+    view_payload,
+)
+from .neo4j_pool import get_pool
+from .telemetry import get_telemetry, log_error
+from .watermark import get_watermarks
 
-    def get_graph_data(self, user_id="user_1"):
-        """
-        Запрашивает узлы и связи из Neo4j.
-        Mem0 создаёт узлы с лейблами: User, Memory, Entity
-        """
-        query = """
-        MATCH (n)-[r]->(m)
-        WHERE n.user_id = $user_id OR m.user_id = $user_id OR 
-              n.user_id IS NULL OR m.user_id IS NULL
+# Общий список полей записи о связи (n)-[r]->(m)
+GRAPH_RETURN = """
         RETURN 
-            toString(id(n)) as source,
-            toString(id(m)) as target,
+            elementId(n) as source,
+            elementId(m) as target,
+            elementId(r) as rel_id,
             type(r) as relation,
             labels(n) as n_labels,
             labels(m) as m_labels,
@@ -40,17 +42,423 @@ class Neo4jGraphViz:
             n.text as n_text,
             m.text as m_text,
             n.id as n_id,
-            m.id as m_id
-        LIMIT 1000
+            m.id as m_id,
+            r.created as created
+"""
+
+
+# Связи пользователя, страница за страницей (keyset по elementId(r)).
+# Поиск начинается с индекса по user_id базовой метки узлов Mem0, поэтому
+# Neo4j не сканирует весь граф, а чужие узлы и узлы без user_id не попадают в выдачу.
+GRAPH_PAGE_QUERY = """
+        MATCH (n:{label} {{user_id: $user_id}})-[r]->(m:{label} {{user_id: $user_id}})
+        WHERE elementId(r) > $after
+          AND ($since IS NULL OR r.created > $since)
+""" + GRAPH_RETURN + """
+        ORDER BY rel_id
+        LIMIT $page_size
+"""
+
+# Один шаг расширения окрестности: для всех узлов фронтира одним запросом,
+# не больше $fanout связей на узел (свежие первыми), с фильтром по типам связей.
+EXPAND_QUERY = """
+        UNWIND $frontier AS node_id
+        MATCH (seed)
+        WHERE elementId(seed) = node_id AND seed.user_id = $user_id
+        CALL {{
+            WITH seed
+            MATCH (seed)-[r]-(other:{label} {{user_id: $user_id}})
+            WHERE $types IS NULL OR type(r) IN $types
+            RETURN r
+            ORDER BY r.created DESC
+            LIMIT $fanout
+        }}
+        WITH DISTINCT r
+        WITH r, startNode(r) AS n, endNode(r) AS m
+""" + GRAPH_RETURN
+
+# Поиск узлов пользователя по началу имени (индекс (user_id, name))
+FIND_NODES_QUERY = """
+        MATCH (n:{label})
+        WHERE n.user_id = $user_id AND n.name STARTS WITH $prefix
+        RETURN elementId(n) as id, n.name as name, labels(n) as labels
+        ORDER BY name
+        LIMIT $limit
+"""
+
+# Настройки визуализации: координаты посчитаны на сервере (mem0_graph/layout.py),
+# физика в браузере выключена
+STATIC_OPTIONS = """
+        var options = {
+          "nodes": { "font": { "size": 14, "face": "Arial" }},
+          "edges": { 
+            "font": { "size": 10, "align": "middle", "face": "Arial" },
+            "smooth": false
+          },
+          "physics": { "enabled": false },
+          "interaction": { "hover": true, "tooltipDelay": 200, "hideEdgesOnDrag": true }
+        }
+"""
+
+# (uri, label) для которых схема уже проверена в этом процессе
+_schema_ready = set()
+# (uri, label) -> время последней неудачи: пока Neo4j недоступен, сессии не повторяют попытку
+_schema_failed_at = {}
+
+# Узел-отметка выполненной миграции: {name} — что именно мигрировано
+MIGRATION_LABEL = "__Mem0GraphMigration__"
+
+
+def schema_statements(label="__Entity__", unique_names=False):
+    """Индексы (и, по желанию, ограничения), на которые опираются запросы графа."""
+    quoted = _quote_label(label)
+    name = label.strip("_").lower()
+    statements = [
+        f"CREATE INDEX {name}_user_id IF NOT EXISTS FOR (n:{quoted}) ON (n.user_id)",
+        f"CREATE INDEX {name}_user_name IF NOT EXISTS FOR (n:{quoted}) ON (n.user_id, n.name)",
+    ]
+    if unique_names:
+        # Mem0 сливает сущности по (name, user_id); если в графе пишутся ещё agent_id/run_id,
+        # одно имя может повторяться, поэтому ограничение включается явно
+        statements.append(
+            f"CREATE CONSTRAINT {name}_user_name_unique IF NOT EXISTS "
+            f"FOR (n:{quoted}) REQUIRE (n.user_id, n.name) IS UNIQUE"
+        )
+    return statements
+
+
+def graph_nodes(data):
+    """`{id узла: подпись}` для всех узлов в записях."""
+    nodes = {}
+    for record in data:
+        nodes.setdefault(record['source'], str(node_label(record, 'n')))
+        nodes.setdefault(record['target'], str(node_label(record, 'm')))
+    return nodes
+
+
+class GraphSnapshot:
+    """Закешированный граф пользователя и версия данных, из которых он собран."""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.graph = CompactGraph()
+        self.version = None
+        self.full_version = None
+        self.max_created = None
+        self.fetched_at = 0.0
+        self.rendered = {}  # раскрытые кластеры -> (версия, хеш содержимого, вид) последней отрисовки
+
+    def replace(self, records):
+        # новый граф подменяет старый только после полного чтения потока
+        graph = CompactGraph()
+        max_created = self._add(graph, records, None)
+        self.graph, self.max_created = graph, max_created
+
+    def merge(self, records, max_edges=None):
+        """Догрузить новые связи; граф не растёт больше `max_edges` связей."""
+        self.max_created = self._add(self.graph, records, self.max_created, max_edges)
+
+    @staticmethod
+    def _add(graph, records, max_created, max_edges=None):
+        """Добавить связи из записей (Record драйвера или словарей); повторы пропускаются."""
+        for record in records:
+            if max_edges is not None and graph.edge_count >= max_edges:
+                break
+            graph.add_record(record)
+            created = record.get("created")
+            if created is not None and (max_created is None or created > max_created):
+                max_created = created
+        return max_created
+
+    def records(self):
+        return list(self.graph.records())
+
+
+class Neo4jGraphViz:
+    """Визуализация нативного графа знаний из Neo4j"""
+    
+    def __init__(self, uri=None, user=None, password=None, pool=None,
+                 snapshot_max_age=300.0, node_label="__Entity__", page_size=1000,
+                 max_edges=5000, unique_names=False, fanout=25, frontier_batch=500,
+                 lod_max_nodes=300, layout_path=":memory:", layout_iterations=50,
+                 layout_scale=1000.0, html_cache_size=16, payload_history=8, analytics=None):
+        # общий для процесса пул соединений; параметры по умолчанию — NEO4J в config.py
+        self.pool = pool or get_pool(uri, user, password)
+        self.driver = self.pool.driver
+        self.uri = self.pool.uri
+        self.user = self.pool.user
+        # узлы Mem0 с base_label=True несут метку __Entity__ и свойство user_id
+        self.node_label = node_label
+        label = _quote_label(node_label)
+        self.page_query = GRAPH_PAGE_QUERY.format(label=label)
+        self.expand_query = EXPAND_QUERY.format(label=label)
+        self.find_query = FIND_NODES_QUERY.format(label=label)
+        self.page_size = page_size
+        self.max_edges = max_edges
+        self.unique_names = unique_names
+        # окрестность узла: не больше fanout связей на узел за шаг,
+        # фронтир уходит в Neo4j пачками по frontier_batch узлов
+        self.fanout = fanout
+        self.frontier_batch = frontier_batch
+        # больше lod_max_nodes узлов — граф показывается сводкой по кластерам
+        self.lod_max_nodes = lod_max_nodes
+        self._summarizer = None
+        self.last_view = None
+        # координаты узлов считаются на сервере и сохраняются между отрисовками
+        self.layout_path = layout_path
+        self.layout_iterations = layout_iterations
+        self.layout_scale = layout_scale
+        self._layout_cache = None
+        # HTML по хешу содержимого и последние версии полезной нагрузки по пользователям
+        # (для ответов разницей); ничего не пишется на диск
+        self.html_cache_size = html_cache_size
+        self.payload_history = payload_history
+        self._html_cache = OrderedDict()
+        self._payloads = {}
+        self._written = {}
+        self._render_lock = threading.Lock()
+        self.last_digest = None
+        # снимок графа по user_id; старше snapshot_max_age секунд — перечитывается целиком
+        # (на случай записей в Neo4j из других процессов)
+        self.snapshot_max_age = snapshot_max_age
+        self._snapshots = {}
+        self._snapshot_lock = threading.Lock()
+        # GraphAnalytics (mem0_graph/analytics.py): размер узла по PageRank, цвет по сообществу
+        self.analytics = analytics
+
+    def close(self):
+        """Освободить ресурсы визуализации (общий пул закрывается `close_pools()`)"""
+        if self._layout_cache is not None:
+            self._layout_cache.close()
+
+    def ensure_schema(self, force=False, retry_after=60.0):
+        """Создаёт индексы по user_id (идемпотентно, один раз на процесс).
+
+        Ошибки печатаются и не мешают работе; после неудачи повторная попытка
+        делается не раньше чем через `retry_after` секунд. Возвращает True,
+        если всё создано. Разметку старых узлов делает `migrate_base_label()`.
+        """
+        key = (self.uri, self.node_label)
+        if key in _schema_ready and not force:
+            return True
+        failed_at = _schema_failed_at.get(key)
+        if failed_at is not None and not force and time.monotonic() - failed_at < retry_after:
+            return False
+
+        ok = True
+        with self.pool.session() as session:
+            for statement in schema_statements(self.node_label, self.unique_names):
+                try:
+                    session.run(statement).consume()
+                except Exception as e:
+                    ok = False
+                    log_error("Neo4jGraphViz.ensure_schema", e)
+        if ok:
+            _schema_ready.add(key)
+            _schema_failed_at.pop(key, None)
+        else:
+            _schema_failed_at[key] = time.monotonic()
+        return ok
+
+    def migrate_base_label(self, batch_size=10000):
+        """Однократная миграция: базовая метка узлам, записанным до включения base_label.
+
+        Без неё индексный запрос по `node_label` не видит старых узлов. Проход
+        по всем узлам идёт пачками по `batch_size` в отдельных транзакциях;
+        после него в граф пишется узел-отметка, и повторный вызов ничего не
+        делает. Возвращает число размеченных узлов (None — миграция уже была).
+        """
+        name = f"base_label:{self.node_label}"
+        migration = _quote_label(MIGRATION_LABEL)
+        if self.pool.read(f"MATCH (m:{migration} {{name: $name}}) RETURN m.name", name=name):
+            return None
+        quoted = _quote_label(self.node_label)
+        with self.pool.session() as session:
+            summary = session.run(
+                f"""
+                MATCH (n) WHERE n.user_id IS NOT NULL AND NOT n:{quoted}
+                CALL {{ WITH n SET n:{quoted} }} IN TRANSACTIONS OF {int(batch_size)} ROWS
+                """
+            ).consume()
+            session.run(
+                f"MERGE (m:{migration} {{name: $name}}) SET m.finished_at = datetime()",
+                name=name,
+            ).consume()
+        return summary.counters.labels_added
+
+    def _record_pages(self, user_id, since=None, page_size=None):
+        """Страницы записей драйвера (`neo4j.Record`) по возрастанию elementId(r)."""
+        page_size = page_size or self.page_size
+        after = ""
+        while True:
+            # каждая страница — своя транзакция чтения: соединение не держится между страницами
+            page = self.pool.read(
+                self.page_query,
+                user_id=user_id,
+                since=since,
+                after=after,
+                page_size=page_size,
+            )
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            after = page[-1]["rel_id"]
+
+    def iter_graph_pages(self, user_id="user_1", since=None, page_size=None):
+        """Связи пользователя страницами по `page_size`, по возрастанию elementId(r).
+
+        Каждая страница — отдельный запрос, продолжающий с последнего elementId,
+        поэтому большие графы не приходится держать в одном результате.
+        С `since` возвращаются только связи, созданные позже этой отметки (r.created).
+        """
+        for page in self._record_pages(user_id, since, page_size):
+            yield [record.data() for record in page]
+
+    def iter_graph_records(self, user_id="user_1", since=None, max_edges=None):
+        """Поток записей драйвера (не больше `max_edges`) — без копирования в словари."""
+        if max_edges is None:
+            max_edges = self.max_edges
+        if max_edges <= 0:
+            return
+        count = 0
+        for page in self._record_pages(user_id, since, min(self.page_size, max_edges)):
+            for record in page:
+                if count >= max_edges:
+                    return
+                count += 1
+                yield record
+
+    def get_graph_data(self, user_id="user_1", since=None, max_edges=None):
+        """
+        Запрашивает связи пользователя из Neo4j (не больше `max_edges`).
+        Mem0 создаёт узлы с базовой меткой __Entity__ и свойством user_id.
+        С `since` возвращаются только связи, созданные позже этой отметки (r.created).
+        """
+        return [
+            record.data()
+            for record in self.iter_graph_records(user_id, since=since, max_edges=max_edges)
+        ]
+
+    def load_graph(self, user_id="user_1", since=None, max_edges=None):
+        """Граф пользователя в компактной модели, собранный прямо из потока записей."""
+        return CompactGraph.from_records(
+            self.iter_graph_records(user_id, since=since, max_edges=max_edges)
+        )
+
+    def find_nodes(self, user_id="user_1", prefix="", limit=20):
+        """Узлы пользователя, имя которых начинается с `prefix` (Mem0 хранит имена в нижнем регистре)."""
+        records = self.pool.read(
+            self.find_query, user_id=user_id, prefix=prefix.strip().lower(), limit=limit
+        )
+        return [record.data() for record in records]
+
+    def relation_types(self):
+        """Все типы связей в базе (для фильтра окрестности)."""
+        records = self.pool.read(
+            "CALL db.relationshipTypes() YIELD relationshipType RETURN relationshipType"
+        )
+        return sorted(record["relationshipType"] for record in records)
+
+    def expand(self, user_id, node_ids, fanout=None, relation_types=None):
+        """Связи узлов `node_ids` (в обе стороны) — один шаг окрестности.
+
+        Не больше `fanout` связей на узел; `relation_types` — список типов связей
+        или None для всех. Записи в формате GRAPH_RETURN.
         """
-        
-        with self.driver.session() as session:
-            result = session.run(query, user_id=user_id)
-            return [record.data() for record in result]
-
-    def build_pyvis_graph(self, data):
-        """Строит интерактивный граф PyVis из данных Neo4j"""
-        net = Network(
+        node_ids = list(node_ids)
+        fanout = fanout or self.fanout
+        types = list(relation_types) if relation_types else None
+        data = []
+        for start in range(0, len(node_ids), self.frontier_batch):
+            records = self.pool.read(
+                self.expand_query,
+                user_id=user_id,
+                frontier=node_ids[start:start + self.frontier_batch],
+                fanout=fanout,
+                types=types,
+            )
+            data.extend(record.data() for record in records)
+        return data
+
+    def get_neighbourhood(self, user_id, node_ids, depth=1, fanout=None,
+                          relation_types=None, max_edges=None):
+        """Окрестность узлов `node_ids` глубиной `depth` шагов.
+
+        `fanout` — число или список по шагам (например `[50, 10]`: у стартового
+        узла до 50 связей, у соседей — до 10). Каждый шаг — один запрос на пачку
+        фронтира, уже посещённые узлы повторно не расширяются. Всего не больше
+        `max_edges` связей.
+        """
+        max_edges = max_edges or self.max_edges
+        visited = set(node_ids)
+        frontier = list(node_ids)
+        edges = {}
+
+        for hop in range(depth):
+            if isinstance(fanout, (list, tuple)):
+                hop_fanout = fanout[min(hop, len(fanout) - 1)]
+            else:
+                hop_fanout = fanout
+            next_frontier = []
+            for record in self.expand(user_id, frontier, hop_fanout, relation_types):
+                if len(edges) >= max_edges:
+                    break
+                edges.setdefault(record["rel_id"], record)
+                for node_id in (record["source"], record["target"]):
+                    if node_id not in visited:
+                        visited.add(node_id)
+                        next_frontier.append(node_id)
+            frontier = next_frontier
+            if not frontier or len(edges) >= max_edges:
+                break
+
+        return list(edges.values())
+
+    def get_graph_snapshot(self, user_id="user_1", force=False):
+        """Граф пользователя из кеша; перечитываются только изменения.
+
+        Возвращает `(snapshot, changed)`. Если после прошлого запроса агент ничего
+        не записывал, Neo4j не опрашивается. Если были только добавления, догружаются
+        связи с `r.created` новее последней известной; после удалений (или без
+        отметок времени) граф перечитывается целиком.
+        """
+        version, full_version = get_watermarks().get(user_id)
+        with self._snapshot_lock, get_telemetry().span("graph.snapshot") as span:
+            snapshot = self._snapshots.setdefault(user_id, GraphSnapshot(user_id))
+
+            expired = time.monotonic() - snapshot.fetched_at > self.snapshot_max_age
+            if snapshot.version == version and not force and not expired:
+                span["cached"] = True
+                return snapshot, False
+
+            incremental = (
+                snapshot.version is not None
+                and snapshot.full_version == full_version
+                and snapshot.max_created is not None
+                and not force
+                and not expired
+            )
+            if incremental:
+                room = self.max_edges - snapshot.graph.edge_count
+                # граф уже упёрся в max_edges — Neo4j не спрашиваем
+                if room > 0:
+                    snapshot.merge(
+                        self.iter_graph_records(user_id, since=snapshot.max_created, max_edges=room),
+                        max_edges=self.max_edges,
+                    )
+            else:
+                snapshot.replace(self.iter_graph_records(user_id))
+                snapshot.fetched_at = time.monotonic()
+
+            snapshot.version = version
+            snapshot.full_version = full_version
+            return snapshot, True
+
+    @staticmethod
+    def _network():
+        return Network(
             height="650px", 
             width="100%", 
             bgcolor="#1a1a2e", 
@@ -59,114 +467,229 @@ class Neo4jGraphViz:
             filter_menu=True,
             cdn_resources="remote"
         )
-        net.barnes_hut(gravity=-80000, central_gravity=0.3, spring_length=250)
-
-        nodes = {}
-        
-        for record in data:
-            src = str(record['source'])
-            tgt = str(record['target'])
-            rel = record['relation'] if record['relation'] else 'related'
-            
-            # Получаем читаемые подписи
-            def get_label(record, prefix):
-                return (record.get(f'{prefix}_name') or 
-                        record.get(f'{prefix}_memory') or 
-                        record.get(f'{prefix}_value') or 
-                        record.get(f'{prefix}_text') or 
-                        record.get(f'{prefix}_id') or 
-                        (record[f'{prefix}_labels'][-1] if record[f'{prefix}_labels'] else 'Node'))
-
-            src_label = get_label(record, 'n')
-            tgt_label = get_label(record, 'm')
-            
-            # Цвета по типу узла
-            def get_color(labels):
-                if not labels:
-                    return "#94a3b8"
-                
-                # Приводим все метки к нижнему регистру для проверки
-                lower_labels = [l.lower() for l in labels]
-                
-                if 'user' in lower_labels or '__user__' in lower_labels:
-                    return "#6366f1"  # Indigo
-                elif 'entity' in lower_labels:
-                    return "#f97316"  # Orange
-                elif 'memory' in lower_labels:
-                    return "#22c55e"  # Green
-                elif 'person' in lower_labels:
-                    return "#e11d48"  # Red
-                elif 'location' in lower_labels:
-                    return "#0ea5e9"  # Sky
-                elif 'organization' in lower_labels:
-                    return "#8b5cf6"  # Violet
-                else:
-                    return "#94a3b8"  # Slate
-
-            
-            # Добавляем узлы
-            if src not in nodes:
-                net.add_node(
-                    src, 
-                    label=str(src_label)[:35], 
-                    title=f"{src_label}\nТип: {record['n_labels']}",
-                    color=get_color(record['n_labels']),
-                    size=25 if (record['n_labels'] and 'User' in record['n_labels']) else 20
-                )
-                nodes[src] = True
-                
-            if tgt not in nodes:
-                net.add_node(
-                    tgt,
-                    label=str(tgt_label)[:35],
-                    title=f"{tgt_label}\nТип: {record['m_labels']}",
-                    color=get_color(record['m_labels']),
-                    size=25 if (record['m_labels'] and 'User' in record['m_labels']) else 20
-                )
-                nodes[tgt] = True
-            
-            # Добавляем связь
-            net.add_edge(src, tgt, label=rel, title=rel, color="#64748b")
 
+    def analysis(self, user_id="user_1"):
+        """Метрики графа пользователя (None без аналитики или при ошибке)."""
+        if self.analytics is None:
+            return None
+        try:
+            with get_telemetry().span("graph.analytics"):
+                return self.analytics.analyze(user_id)
+        except Exception as e:
+            log_error("Neo4jGraphViz.analysis", e, user_id=user_id)
+            return None
+
+    def build_pyvis_graph(self, data, positions=None, analysis=None):
+        """Строит интерактивный граф PyVis из данных Neo4j (записи или CompactGraph).
+
+        Без `positions` граф раскладывается физикой в браузере. С `analysis`
+        (GraphAnalysis) размер узла задаёт PageRank, а цвет — сообщество.
+        """
+        net = self._network()
+        if not positions:
+            net.barnes_hut(gravity=-80000, central_gravity=0.3, spring_length=250)
+        styles = analysis.node_styles() if analysis is not None else None
+        return as_compact_graph(data).to_pyvis(
+            net, positions, scale=self.layout_scale, styles=styles
+        )
+
+    def layout(self, user_id, graph, keys=None):
+        """Координаты узлов `graph` (networkx) с опорой на сохранённые для пользователя.
+
+        `keys` — `{id узла: ключ в кеше}` для узлов, чей id нестабилен (супер-узлы
+        `cluster:N` хранятся по составу). Новые и сдвинутые узлы записываются
+        обратно в кеш раскладки.
+        """
+        from .layout import stable_layout
+
+        keys = {node: (keys or {}).get(node, node) for node in graph.nodes}
+        stored = self.layout_cache.get(user_id, keys.values())
+        previous = {node: stored[key] for node, key in keys.items() if key in stored}
+        positions = stable_layout(graph, previous, iterations=self.layout_iterations)
+        changed = {
+            keys[node]: xy for node, xy in positions.items() if previous.get(node) != xy
+        }
+        if changed:
+            self.layout_cache.put(user_id, changed)
+        return positions
+
+    @property
+    def layout_cache(self):
+        if self._layout_cache is None:
+            from .layout import LayoutCache
+
+            self._layout_cache = LayoutCache(self.layout_path)
+        return self._layout_cache
+
+    def build_view_graph(self, payload):
+        """Граф PyVis из полезной нагрузки `view_payload` (координаты уже растянуты)."""
+        net = self._network()
+        for node in payload["nodes"].values():
+            options = {key: node[key] for key in ("title", "color", "size", "x", "y")}
+            add_pyvis_node(net, node["id"], node["label"], dict(options, physics=False))
+        for edge in payload["edges"].values():
+            add_pyvis_edge(
+                net,
+                edge["from"],
+                edge["to"],
+                {"label": edge["label"], "title": edge["title"], "width": edge["width"]},
+            )
         return net
 
-    def save_graph(self, user_id="user_1", filename="knowledge_graph.html"):
-        """Полный цикл: запрос → построение → сохранение HTML"""
-        data = self.get_graph_data(user_id)
-        
-        if not data:
+    @property
+    def summarizer(self):
+        # networkx нужен только для больших графов — импортируется при первом обращении
+        if self._summarizer is None:
+            from .graph_lod import GraphSummarizer
+
+            self._summarizer = GraphSummarizer(max_nodes=self.lod_max_nodes)
+        return self._summarizer
+
+    def _render(self, data, expanded=(), key=None, user_id="user_1"):
+        """Вид графа, его полезная нагрузка (узлы с координатами, связи) и хеш содержимого."""
+        from .graph_lod import view_graph
+
+        telemetry = get_telemetry()
+        with telemetry.span("graph.summarize"):
+            view = self.summarizer.summarize(data, expanded=expanded, key=key)
+        analysis = self.analysis(user_id)
+        if analysis is not None:
+            styles = analysis.node_styles()
+            for node in view["nodes"]:
+                node.update(styles.get(node["id"], ()))
+        with telemetry.span("graph.layout", nodes=len(view["nodes"])):
+            keys = {
+                node["id"]: node["layout_key"] for node in view["nodes"] if "layout_key" in node
+            }
+            positions = self.layout(user_id, view_graph(view), keys)
+        payload = view_payload(view, positions, self.layout_scale)
+        digest = payload_digest(payload, STATIC_OPTIONS)
+
+        with self._render_lock:
+            payloads = self._payloads.setdefault(user_id, OrderedDict())
+            payloads[digest] = payload
+            payloads.move_to_end(digest)
+            while len(payloads) > self.payload_history:
+                payloads.popitem(last=False)
+        self.last_view = view
+        self.last_digest = digest
+        return view, payload, digest
+
+    def _cached_html(self, digest):
+        with self._render_lock:
+            html = self._html_cache.get(digest)
+            if html is not None:
+                self._html_cache.move_to_end(digest)
+            return html
+
+    def render_html(self, data, expanded=(), key=None, user_id="user_1"):
+        """HTML графа строкой, без записи на диск.
+
+        Больше `lod_max_nodes` узлов — сводка по кластерам. Координаты берутся из
+        кеша раскладки пользователя, поэтому узлы не прыгают между обновлениями.
+        HTML кешируется по хешу содержимого: одинаковый граф не пересобирается.
+        `key` — версия данных, по которой кешируется разбиение на сообщества.
+        """
+        _, payload, digest = self._render(data, expanded, key, user_id)
+        html = self._cached_html(digest)
+        if html is None:
+            with get_telemetry().span("graph.pyvis", nodes=len(payload["nodes"])):
+                net = self.build_view_graph(payload)
+                net.set_options(STATIC_OPTIONS)
+                html = net.generate_html()
+            with self._render_lock:
+                self._html_cache[digest] = html
+                while len(self._html_cache) > self.html_cache_size:
+                    self._html_cache.popitem(last=False)
+        return html
+
+    def _rendered_snapshot(self, user_id, expanded, force):
+        """Снимок и запись о последней отрисовке `(версия, хеш, вид)` для раскрытых кластеров."""
+        snapshot, changed = self.get_graph_snapshot(user_id, force=force)
+        rendered = snapshot.rendered.get(frozenset(expanded))
+        if changed or rendered is None or rendered[0] != snapshot.version:
+            rendered = None
+        return snapshot, rendered
+
+    def graph_html(self, user_id="user_1", expanded=(), force=False):
+        """Полный цикл: снимок графа → вид → HTML строкой (None, если граф пуст).
+
+        Большой граф сворачивается в кластеры; `expanded` — id кластеров, которые
+        нужно показать по узлам. Вид последней отрисовки — в `self.last_view`.
+        Если граф не менялся, HTML берётся из кеша.
+        """
+        with get_telemetry().span("graph.render", user_id=user_id):
+            return self._graph_html(user_id, expanded, force)
+
+    def _graph_html(self, user_id, expanded, force):
+        snapshot, rendered = self._rendered_snapshot(user_id, expanded, force)
+        if not snapshot.graph:
+            self.last_view = None
             return None
-        
-        net = self.build_pyvis_graph(data)
-        
-        # Настройки визуализации
-        net.set_options("""
-        var options = {
-          "nodes": { "font": { "size": 14, "face": "Arial" }},
-          "edges": { 
-            "font": { "size": 10, "align": "middle", "face": "Arial" },
-            "smooth": { "type": "continuous", "roundness": 0.3 }
-          },
-          "physics": { 
-            "enabled": true,
-            "barnesHut": { "gravitationalConstant": -80000, "springLength": 250 },
-            "stabilization": { "enabled": true, "iterations": 100 }
-          },
-          "interaction": { "hover": true, "tooltipDelay": 200 }
-        }
-        """)
-        
-        net.save_graph(filename)
+
+        if rendered is not None:
+            html = self._cached_html(rendered[1])
+            if html is not None:
+                _, self.last_digest, self.last_view = rendered
+                return html
+
+        html = self.render_html(
+            snapshot.graph, expanded, key=(user_id, snapshot.version), user_id=user_id
+        )
+        snapshot.rendered[frozenset(expanded)] = (snapshot.version, self.last_digest, self.last_view)
+        return html
+
+    def graph_payload(self, user_id="user_1", base=None, expanded=(), force=False):
+        """Сжатое (gzip) JSON-представление графа для фронтенда.
+
+        Если `base` — хеш версии, которая уже есть у клиента, и она ещё в истории,
+        возвращаются только изменения; иначе граф целиком. Новый хеш — в поле `version`.
+        """
+        snapshot, rendered = self._rendered_snapshot(user_id, expanded, force)
+        if not snapshot.graph:
+            return encode_message(full_message({"nodes": {}, "edges": {}}, None))
+
+        with self._render_lock:
+            payloads = self._payloads.get(user_id, {})
+            payload = payloads.get(rendered[1]) if rendered is not None else None
+            digest = rendered[1] if payload is not None else None
+        if payload is None:
+            view, payload, digest = self._render(
+                snapshot.graph, expanded, key=(user_id, snapshot.version), user_id=user_id
+            )
+            snapshot.rendered[frozenset(expanded)] = (snapshot.version, digest, view)
+
+        with self._render_lock:
+            previous = self._payloads.get(user_id, {}).get(base) if base else None
+        if previous is not None:
+            message = diff_message(previous, payload, base, digest)
+        else:
+            message = full_message(payload, digest)
+        return encode_message(message)
+
+    def write_html(self, data, filename, expanded=(), key=None, user_id="user_1"):
+        """Строит граф по записям (или CompactGraph) и сохраняет HTML в файл."""
+        html = self.render_html(data, expanded, key, user_id)
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(html)
+        return filename
+
+    def save_graph(self, user_id="user_1", filename="knowledge_graph.html", force=False,
+                   expanded=()):
+        """То же, что `graph_html`, но с записью в файл (для скриптов).
+
+        Файл перезаписывается, только если содержимое изменилось.
+        """
+        html = self.graph_html(user_id, expanded=expanded, force=force)
+        if html is None:
+            return None
+        if self._written.get(filename) != self.last_digest or not os.path.exists(filename):
+            with open(filename, "w", encoding="utf-8") as f:
+                f.write(html)
+            self._written[filename] = self.last_digest
         return filename
 
     def test_connection(self):
         """Проверка подключения к Neo4j"""
-        try:
-            with self.driver.session() as session:
-                result = session.run("RETURN 'OK' as status")
-                record = result.single()
-                return record['status'] == 'OK'
-        except Exception as e:
-            print(f"Connection error: {e}")
-            return False
+        return self.pool.verify()
 
@@ -0,0 +1,214 @@
+"""
+Гибридный поиск: локальный BM25 по текстам воспоминаний + векторный поиск Mem0,
+объединённые через reciprocal-rank fusion (RRF).
+
+BM25-индекс живёт в процессе и обновляется по событиям `Memory.add`
+(ADD / UPDATE / DELETE), поэтому точные совпадения (имена, номера, ID)
+находятся без дополнительных сетевых запросов.
+"""
+
+import math
+import re
+import threading
+from collections import Counter
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.casefold()) if text else []
+
+
+class BM25Index:
+    """Инкрементальный BM25 (Okapi): добавление и удаление документа — O(длина документа).
+
+    `rank_bm25` умеет только пересобирать индекс по всему корпусу, поэтому
+    здесь используется собственный инвертированный индекс с теми же формулами.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._docs = {}  # doc_id -> (Counter терминов, длина, текст, payload)
+        self._postings = {}  # термин -> {doc_id: tf}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._docs
+
+    def add(self, doc_id, text, payload=None):
+        """Добавить или заменить документ."""
+        if doc_id in self._docs:
+            self.remove(doc_id)
+        terms = Counter(tokenize(text))
+        length = sum(terms.values())
+        self._docs[doc_id] = (terms, length, text, payload)
+        self._total_length += length
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+
+    def remove(self, doc_id):
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return False
+        terms, length = doc[0], doc[1]
+        self._total_length -= length
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        return True
+
+    def get(self, doc_id):
+        """`(text, payload)` документа или None."""
+        doc = self._docs.get(doc_id)
+        return (doc[2], doc[3]) if doc else None
+
+    def search(self, query, k=10):
+        """Список `(doc_id, score)` по убыванию BM25; считаются только документы,
+        содержащие хотя бы один термин запроса."""
+        n_docs = len(self._docs)
+        if not n_docs:
+            return []
+        avg_length = self._total_length / n_docs or 1.0
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log((n_docs - df + 0.5) / (df + 0.5) + 1.0)
+            for doc_id, tf in postings.items():
+                length = self._docs[doc_id][1]
+                norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def result_key(item):
+    """Ключ воспоминания для слияния списков: id, а без него — текст."""
+    return item.get("id") or item.get("memory")
+
+
+def reciprocal_rank_fusion(ranked_lists, k=60, weights=None):
+    """RRF: score(d) = Σ w_i / (k + rank_i(d)). Возвращает элементы по убыванию score.
+
+    В каждом элементе результата поле `fusion_score` содержит итоговую оценку.
+    """
+    weights = weights or [1.0] * len(ranked_lists)
+    scores = {}
+    items = {}
+    for ranked, weight in zip(ranked_lists, weights):
+        for rank, item in enumerate(ranked, start=1):
+            key = result_key(item)
+            if key is None:
+                continue
+            scores[key] = scores.get(key, 0.0) + weight / (k + rank)
+            # первым сохраняем вариант из более приоритетного списка (с векторным score)
+            items.setdefault(key, item)
+    fused = sorted(scores, key=scores.get, reverse=True)
+    return [{**items[key], "fusion_score": scores[key]} for key in fused]
+
+
+class HybridRetriever:
+    """BM25-индексы пользователей и слияние с результатами векторного поиска."""
+
+    def __init__(self, bm25_k=20, rrf_k=60, weights=(1.0, 1.0)):
+        self.bm25_k = bm25_k
+        self.rrf_k = rrf_k
+        self.weights = list(weights)
+        self._lock = threading.Lock()
+        self._indexes = {}
+
+    def is_loaded(self, user_id):
+        with self._lock:
+            return user_id in self._indexes
+
+    def load(self, user_id, memories):
+        """Построить индекс пользователя по нормализованным воспоминаниям."""
+        index = BM25Index()
+        for m in memories:
+            if m.get("id") and m.get("memory"):
+                index.add(m["id"], m["memory"], {"metadata": m.get("metadata")})
+        with self._lock:
+            self._indexes[user_id] = index
+
+    def reset(self, user_id):
+        """Забыть индекс пользователя (пересоберётся при следующем поиске)."""
+        with self._lock:
+            self._indexes.pop(user_id, None)
+
+    def apply_add_result(self, user_id, result, metadata=None):
+        """Применить события из ответа `Memory.add` к уже загруженному индексу."""
+        items = result.get("results", []) if isinstance(result, dict) else (result or [])
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is None:
+                return
+            for item in items:
+                if not isinstance(item, dict) or not item.get("id"):
+                    continue
+                event = item.get("event", "ADD")
+                if event in ("ADD", "UPDATE") and item.get("memory"):
+                    # при UPDATE сохраняем metadata исходного воспоминания
+                    existing = index.get(item["id"])
+                    payload = existing[1] if existing else {"metadata": metadata}
+                    index.add(item["id"], item["memory"], payload)
+                elif event == "DELETE":
+                    index.remove(item["id"])
+
+    def remove(self, user_id, memory_ids):
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                for memory_id in memory_ids:
+                    index.remove(memory_id)
+
+    def keyword_search(self, user_id, query, k=None):
+        """Результаты BM25 в формате `Mem0Agent._normalize_results`."""
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is None:
+                return []
+            results = []
+            for doc_id, score in index.search(query, k or self.bm25_k):
+                text, payload = index.get(doc_id)
+                results.append(
+                    {
+                        "id": doc_id,
+                        "memory": text,
+                        "score": None,
+                        "bm25_score": score,
+                        "metadata": (payload or {}).get("metadata"),
+                        "raw": None,
+                    }
+                )
+            return results
+
+    def search(self, user_id, query, vector_results, top_k=10):
+        """Слияние векторных результатов с BM25 через RRF."""
+        keyword_results = self.keyword_search(user_id, query)
+        if not keyword_results:
+            return list(vector_results)[:top_k]
+        fused = reciprocal_rank_fusion(
+            [list(vector_results), keyword_results], k=self.rrf_k, weights=self.weights
+        )
+        return fused[:top_k]
+
+
+_retriever = None
+_retriever_lock = threading.Lock()
+
+
+def get_hybrid_retriever(**options):
+    """Общий для процесса ретривер: индексы обновляются записями из любой сессии."""
+    global _retriever
+    with _retriever_lock:
+        if _retriever is None:
+            _retriever = HybridRetriever(**options)
+        return _retriever
@@ -0,0 +1,149 @@
+"""
+Пакетная загрузка чанков в Mem0: пул потоков, повторы с backoff и прогресс.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from .dedup import chunk_hash, memory_ids_from_result
+from .telemetry import log_error
+
+
+class IngestPipeline:
+    """Параллельно отправляет чанки в `Memory.add` с ограниченным числом воркеров.
+
+    Чанки принимаются любым итерируемым объектом (в том числе генератором):
+    одновременно в работе держится не больше `max_workers * 2` чанков,
+    поэтому память не растёт вместе с размером документа.
+
+    Если передан `index` (ChunkIndex), уже загруженные чанки пропускаются
+    до обращения к модели, а успешные — записываются в индекс.
+    """
+
+    def __init__(self, memory, max_workers=4, retries=3, backoff=1.0, max_backoff=30.0,
+                 index=None):
+        self.memory = memory
+        self.index = index
+        self.max_workers = max(1, int(max_workers))
+        self.retries = max(0, int(retries))
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def _add_with_retry(self, index, chunk, digest, user_id, metadata, source):
+        """Один чанк: `memory.add` с экспоненциальной паузой между попытками."""
+        attempts = 0
+        started = time.perf_counter()
+        while True:
+            attempts += 1
+            try:
+                res = self.memory.add(chunk, user_id=user_id, metadata=metadata)
+                if self.index is not None:
+                    self.index.record(user_id, source, digest, memory_ids_from_result(res))
+                return {
+                    "index": index,
+                    "status": "ok",
+                    "result": res,
+                    "error": None,
+                    "attempts": attempts,
+                    "chars": len(chunk),
+                    "hash": digest,
+                    "elapsed": time.perf_counter() - started,
+                }
+            except Exception as e:
+                if attempts > self.retries:
+                    return {
+                        "index": index,
+                        "status": "error",
+                        "result": None,
+                        "error": f"{type(e).__name__}: {e}",
+                        "attempts": attempts,
+                        "chars": len(chunk),
+                        "hash": digest,
+                        "elapsed": time.perf_counter() - started,
+                    }
+                delay = min(self.max_backoff, self.backoff * (2 ** (attempts - 1)))
+                time.sleep(delay)
+
+    def _report_progress(self, on_progress, results, total, item):
+        if not on_progress:
+            return
+        try:
+            on_progress(len(results), total, item)
+        except Exception as e:
+            log_error("IngestPipeline.on_progress", e)
+
+    def run(self, chunks, user_id, metadata=None, on_progress=None, source=None):
+        """Загружает чанки и возвращает отчёт.
+
+        `on_progress(done, total, item)` вызывается после каждого чанка;
+        `total` равен None, пока генератор чанков не исчерпан.
+        `source` — ключ документа в индексе дедупликации.
+        """
+        results = []
+        seen = set()
+        total = len(chunks) if hasattr(chunks, "__len__") else None
+        started = time.perf_counter()
+        max_in_flight = self.max_workers * 2
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = set()
+            submitted = 0
+            stream = iter(chunks)
+            exhausted = False
+
+            while pending or not exhausted:
+                while not exhausted and len(pending) < max_in_flight:
+                    try:
+                        chunk = next(stream)
+                    except StopIteration:
+                        exhausted = True
+                        if total is None:
+                            total = submitted
+                        break
+                    digest = chunk_hash(chunk)
+                    if digest in seen or (
+                        self.index is not None and self.index.contains(user_id, source, digest)
+                    ):
+                        item = {
+                            "index": submitted,
+                            "status": "skipped",
+                            "result": None,
+                            "error": None,
+                            "attempts": 0,
+                            "chars": len(chunk),
+                            "hash": digest,
+                            "elapsed": 0.0,
+                        }
+                        results.append(item)
+                        self._report_progress(on_progress, results, total, item)
+                    else:
+                        pending.add(
+                            pool.submit(
+                                self._add_with_retry,
+                                submitted, chunk, digest, user_id, metadata, source,
+                            )
+                        )
+                    seen.add(digest)
+                    submitted += 1
+
+                if not pending:
+                    break
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = future.result()
+                    results.append(item)
+                    self._report_progress(on_progress, results, total, item)
+
+        results.sort(key=lambda r: r["index"])
+        failures = [r for r in results if r["status"] == "error"]
+        skipped = sum(1 for r in results if r["status"] == "skipped")
+        return {
+            "total": len(results),
+            "succeeded": len(results) - len(failures) - skipped,
+            "skipped": skipped,
+            "failed": len(failures),
+            "results": results,
+            "failures": failures,
+            "elapsed": time.perf_counter() - started,
+        }
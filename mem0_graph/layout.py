@@ -0,0 +1,113 @@
+"""
+Раскладка графа на сервере с сохранением координат между обновлениями.
+
+Координаты узлов хранятся в SQLite по (user_id, id узла) в нормированном виде
+(примерно [-1, 1]); супер-узлы кластеров — по хешу состава, а не по
+номеру `cluster:N`, который меняется при пересчёте сообществ. При следующей отрисовке известные узлы остаются на своих
+местах, а новые ставятся рядом с соседями и доводятся spring_layout, поэтому
+граф не «прыгает» при обновлении, а браузеру не нужна физика.
+"""
+
+import os
+import random
+import sqlite3
+import threading
+import time
+
+import networkx as nx
+
+
+def stable_layout(graph, previous=None, seed=42, iterations=50, fix_threshold=0.5):
+    """Координаты узлов `graph` с опорой на прошлые `previous` ({узел: (x, y)}).
+
+    - все узлы известны — координаты возвращаются как есть, без пересчёта;
+    - новых узлов не больше `fix_threshold` — известные закрепляются, считаются только новые;
+    - иначе раскладка пересчитывается целиком, стартуя с прошлых координат.
+    """
+    previous = previous or {}
+    nodes = list(graph)
+    if not nodes:
+        return {}
+    known = {node: previous[node] for node in nodes if node in previous}
+    if len(known) == len(nodes):
+        return dict(known)
+    if not known:
+        positions = nx.spring_layout(graph, seed=seed, iterations=iterations)
+        return {node: (float(x), float(y)) for node, (x, y) in positions.items()}
+
+    initial = dict(known)
+    for node in nodes:
+        if node in initial:
+            continue
+        # новый узел — в центр уже размещённых соседей, с небольшим детерминированным сдвигом
+        rng = random.Random(f"{seed}:{node}")
+        anchors = [initial[n] for n in graph.neighbors(node) if n in initial]
+        if anchors:
+            x = sum(a[0] for a in anchors) / len(anchors) + rng.uniform(-0.05, 0.05)
+            y = sum(a[1] for a in anchors) / len(anchors) + rng.uniform(-0.05, 0.05)
+        else:
+            x, y = rng.uniform(-1, 1), rng.uniform(-1, 1)
+        initial[node] = (x, y)
+
+    new_share = 1 - len(known) / len(nodes)
+    fixed = list(known) if new_share <= fix_threshold else None
+    positions = nx.spring_layout(
+        graph, pos=initial, fixed=fixed, seed=seed, iterations=iterations
+    )
+    return {node: (float(x), float(y)) for node, (x, y) in positions.items()}
+
+
+class LayoutCache:
+    """Координаты узлов по (user_id, node_id) в SQLite."""
+
+    def __init__(self, path):
+        self.path = path
+        if path != ":memory:":
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS positions (
+                    user_id TEXT NOT NULL,
+                    node_id TEXT NOT NULL,
+                    x REAL NOT NULL,
+                    y REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (user_id, node_id)
+                )
+                """
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get(self, user_id, node_ids, batch=500):
+        """`{node_id: (x, y)}` для известных узлов из `node_ids`."""
+        node_ids = list(node_ids)
+        positions = {}
+        with self._lock:
+            for start in range(0, len(node_ids), batch):
+                part = node_ids[start:start + batch]
+                rows = self._conn.execute(
+                    "SELECT node_id, x, y FROM positions WHERE user_id = ? AND node_id IN (%s)"
+                    % ",".join("?" * len(part)),
+                    (user_id, *part),
+                ).fetchall()
+                positions.update((node_id, (x, y)) for node_id, x, y in rows)
+        return positions
+
+    def put(self, user_id, positions):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO positions VALUES (?, ?, ?, ?, ?)",
+                [(user_id, node_id, x, y, now) for node_id, (x, y) in positions.items()],
+            )
+
+    def clear(self, user_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM positions WHERE user_id = ?", (user_id,))
@@ -0,0 +1,169 @@
+"""
+Постраничный список воспоминаний пользователя и их число без выгрузки всей памяти.
+
+Страницы читаются прямо из коллекции Chroma (`where` по user_id, `limit` /
+`offset`), число воспоминаний — запросом одних id. Если у хранилища нет
+коллекции Chroma, используется `Memory.get_all` с лимитом.
+
+Результаты кешируются по пользователю и версии его водяного знака записей
+(см. watermark.py): любая запись в память делает кеш пользователя устаревшим.
+Записи из других процессов подхватываются через `max_age` секунд.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from .telemetry import get_telemetry
+from .watermark import get_watermarks
+
+# Служебные поля полезной нагрузки Mem0 в Chroma; остальное — пользовательские метаданные
+_CORE_FIELDS = ("data", "hash", "created_at", "updated_at")
+_PROMOTED_FIELDS = ("user_id", "agent_id", "run_id", "actor_id", "role")
+
+
+def payload_item(memory_id, payload):
+    """Запись Chroma в формате элемента `Memory.get_all`."""
+    payload = payload or {}
+    item = {"id": memory_id, "memory": payload.get("data")}
+    for key in _CORE_FIELDS[1:] + _PROMOTED_FIELDS:
+        if key in payload:
+            item[key] = payload[key]
+    metadata = {
+        k: v for k, v in payload.items() if k not in _CORE_FIELDS and k not in _PROMOTED_FIELDS
+    }
+    if metadata:
+        item["metadata"] = metadata
+    return item
+
+
+def _collection(memory):
+    return getattr(getattr(memory, "vector_store", None), "collection", None)
+
+
+class MemoryListing:
+    """Кеш страниц и числа воспоминаний по пользователям."""
+
+    def __init__(self, max_pages=32, max_age=60.0, clock=time.monotonic):
+        self.max_pages = max_pages
+        self.max_age = max_age
+        self.clock = clock
+        self._lock = threading.Lock()
+        # user_id -> {"version", "expires", "count", "pages": OrderedDict((offset, limit) -> items)}
+        self._users = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _entry(self, user_id):
+        """Запись кеша пользователя для текущей версии (устаревшая сбрасывается)."""
+        version = get_watermarks().get(user_id)[0]
+        now = self.clock()
+        entry = self._users.get(user_id)
+        if entry is None or entry["version"] != version or entry["expires"] <= now:
+            entry = self._users[user_id] = {
+                "version": version,
+                "expires": now + self.max_age,
+                "count": None,
+                "pages": OrderedDict(),
+            }
+        return entry
+
+    def _fetch(self, memory, user_id, offset, limit):
+        collection = _collection(memory)
+        if collection is not None:
+            found = collection.get(
+                where={"user_id": user_id}, limit=limit, offset=offset, include=["metadatas"]
+            )
+            return [payload_item(i, p) for i, p in zip(found["ids"], found["metadatas"])]
+        # без Chroma: сервер режет только хвост, начало страницы отбрасывается здесь
+        if limit is None:
+            raw = memory.get_all(user_id=user_id)
+        else:
+            raw = memory.get_all(user_id=user_id, limit=offset + limit)
+        items = raw.get("results", []) if isinstance(raw, dict) else raw or []
+        end = None if limit is None else offset + limit
+        return list(items[offset:end])
+
+    def page(self, memory, user_id, page=0, page_size=10):
+        """Воспоминания страницы `page` (с нуля) в формате `Memory.get_all`."""
+        key = (page * page_size, page_size)
+        with self._lock:
+            entry = self._entry(user_id)
+            items = entry["pages"].get(key)
+            if items is not None:
+                entry["pages"].move_to_end(key)
+                self.hits += 1
+                return items
+            self.misses += 1
+            version = entry["version"]
+
+        with get_telemetry().span("chroma.page"):
+            items = self._fetch(memory, user_id, *key)
+        with self._lock:
+            entry = self._entry(user_id)
+            # пока читали, могла пройти запись — такую страницу не кешируем
+            if entry["version"] == version:
+                entry["pages"][key] = items
+                while len(entry["pages"]) > self.max_pages:
+                    entry["pages"].popitem(last=False)
+        return items
+
+    def count(self, memory, user_id):
+        """Число воспоминаний пользователя (в Chroma — запросом одних id)."""
+        with self._lock:
+            entry = self._entry(user_id)
+            if entry["count"] is not None:
+                self.hits += 1
+                return entry["count"]
+            self.misses += 1
+            version = entry["version"]
+
+        collection = _collection(memory)
+        with get_telemetry().span("chroma.count"):
+            if collection is not None:
+                count = len(collection.get(where={"user_id": user_id}, include=[])["ids"])
+            else:
+                count = len(self._fetch(memory, user_id, 0, None))
+        with self._lock:
+            entry = self._entry(user_id)
+            if entry["version"] == version:
+                entry["count"] = count
+        return count
+
+    def iterate(self, memory, user_id, batch_size=100):
+        """Все воспоминания пользователя, читаемые пачками по `batch_size`, без кеша."""
+        if _collection(memory) is None:
+            # get_all не умеет смещение: читаем один раз целиком
+            yield from self._fetch(memory, user_id, 0, None)
+            return
+        offset = 0
+        while True:
+            items = self._fetch(memory, user_id, offset, batch_size)
+            yield from items
+            if len(items) < batch_size:
+                return
+            offset += batch_size
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {"users": len(self._users), "hits": self.hits, "misses": self.misses}
+
+
+_listing = None
+_listing_lock = threading.Lock()
+
+
+def get_memory_listing(**options):
+    """Общий для процесса кеш: запись из любой сессии делает его устаревшим для пользователя."""
+    global _listing
+    with _listing_lock:
+        if _listing is None:
+            _listing = MemoryListing(**options)
+        return _listing
@@ -0,0 +1,112 @@
+"""
+Потоковое извлечение текста из документов (PDF, TXT, DOCX).
+
+Экстракторы — генераторы: они отдают текст по страницам/абзацам,
+не собирая весь документ в одну строку.
+"""
+
+import io
+import os
+
+
+def iter_pdf(fileobj):
+    """PDF: по одной странице за раз."""
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(fileobj)
+    for page in reader.pages:
+        text = page.extract_text() or ""
+        if text.strip():
+            yield text
+
+
+def iter_txt(fileobj, encoding="utf-8"):
+    """TXT: абзацы, разделённые пустыми строками; файл читается построчно."""
+    if isinstance(fileobj, io.TextIOBase):
+        stream = fileobj
+    else:
+        stream = io.TextIOWrapper(fileobj, encoding=encoding, errors="replace")
+
+    paragraph = []
+    for line in stream:
+        if line.strip():
+            paragraph.append(line.rstrip("\n"))
+        elif paragraph:
+            yield "\n".join(paragraph)
+            paragraph = []
+    if paragraph:
+        yield "\n".join(paragraph)
+
+    if stream is not fileobj:
+        # не закрываем исходный файл вместе с обёрткой
+        stream.detach()
+
+
+def iter_docx(fileobj):
+    """DOCX: абзацы документа (нужен пакет python-docx)."""
+    import docx
+
+    document = docx.Document(fileobj)
+    for paragraph in document.paragraphs:
+        text = paragraph.text
+        if text.strip():
+            yield text
+
+
+# расширение -> экстрактор
+EXTRACTORS = {
+    ".pdf": iter_pdf,
+    ".txt": iter_txt,
+    ".md": iter_txt,
+    ".docx": iter_docx,
+}
+
+# MIME-тип -> расширение (Streamlit отдаёт uploaded_file.type)
+MIME_TYPES = {
+    "application/pdf": ".pdf",
+    "text/plain": ".txt",
+    "text/markdown": ".md",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": ".docx",
+}
+
+
+def register_extractor(extension, extractor, mime_type=None):
+    """Подключить свой экстрактор: `extractor(fileobj)` должен быть генератором строк."""
+    extension = extension.lower()
+    if not extension.startswith("."):
+        extension = f".{extension}"
+    EXTRACTORS[extension] = extractor
+    if mime_type:
+        MIME_TYPES[mime_type] = extension
+
+
+def supported_extensions():
+    return sorted(ext.lstrip(".") for ext in EXTRACTORS)
+
+
+def get_extractor(filename=None, mime_type=None):
+    """Подбирает экстрактор по MIME-типу или расширению файла."""
+    extension = MIME_TYPES.get(mime_type) if mime_type else None
+    if extension is None and filename:
+        extension = os.path.splitext(filename)[1].lower()
+    extractor = EXTRACTORS.get(extension)
+    if extractor is None:
+        raise ValueError(f"Неподдерживаемый тип документа: {mime_type or filename}")
+    return extractor
+
+
+def iter_document(source, filename=None, mime_type=None):
+    """Генератор текстовых сегментов документа.
+
+    `source` — путь к файлу или открытый бинарный файловый объект
+    (например, `UploadedFile` из Streamlit).
+    """
+    if isinstance(source, (str, os.PathLike)):
+        filename = filename or os.fspath(source)
+        extractor = get_extractor(filename, mime_type)
+        with open(source, "rb") as f:
+            yield from extractor(f)
+    else:
+        filename = filename or getattr(source, "name", None)
+        extractor = get_extractor(filename, mime_type)
+        yield from extractor(source)
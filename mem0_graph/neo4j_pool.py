@@ -0,0 +1,220 @@
+"""
+Общий для процесса драйвер Neo4j: один пул соединений на (uri, пользователь, база)
+вместо драйвера на каждую сессию Streamlit, скрипт и Mem0.
+
+Параметры пула — из `NEO4J` в config.py (переменные окружения NEO4J_*).
+Соединение, простоявшее в пуле дольше `liveness_check_timeout`, проверяется
+перед выдачей. Чтение и запись идут управляемыми транзакциями
+(`execute_read` / `execute_write`): временные ошибки, в том числе
+недоступность сервера, повторяет сам драйвер не дольше
+`max_transaction_retry_time`. Своих повторов поверх них нет — иначе запрос
+чата при упавшем сервере ждал бы в несколько раз дольше этого срока.
+
+`metrics` и `share_with_mem0` опираются на внутренние поля драйвера и
+langchain `Neo4jGraph`; они используются только для проверенных версий
+пакетов (`DRIVER_VERSIONS`, `LANGCHAIN_NEO4J_VERSIONS`), для прочих —
+предупреждение в лог и прежнее поведение.
+"""
+
+import hashlib
+import logging
+import threading
+from importlib import metadata
+from itertools import takewhile
+
+import neo4j
+from neo4j import GraphDatabase
+
+from .config import NEO4J
+from .telemetry import get_telemetry, log_error, log_event
+
+# Версии [от, до), с которыми проверены обращения к внутренним полям
+DRIVER_VERSIONS = ((5, 0), (7, 0))
+LANGCHAIN_NEO4J_VERSIONS = ((0, 2), (1, 0))
+
+_warned = set()
+
+
+def _version_tuple(version):
+    """`"5.28.1"` -> `(5, 28)`; суффиксы вроде `0rc1` отбрасываются."""
+    parts = []
+    for part in str(version).split(".")[:2]:
+        digits = "".join(takewhile(str.isdigit, part))
+        if not digits:
+            break
+        parts.append(int(digits))
+    return tuple(parts)
+
+
+def _langchain_neo4j_version():
+    try:
+        return _version_tuple(metadata.version("langchain-neo4j"))
+    except metadata.PackageNotFoundError:
+        return ()
+
+
+def _warn_once(key, event, **fields):
+    if key not in _warned:
+        _warned.add(key)
+        log_event(event, level=logging.WARNING, **fields)
+
+
+def _supported(package, version, bounds):
+    """Версия в проверенном диапазоне; иначе — одно предупреждение в лог на пакет."""
+    low, high = bounds
+    if version and low <= version < high:
+        return True
+    _warn_once(
+        package, "neo4j.untested_version", package=package,
+        version=".".join(map(str, version)) or None,
+        tested=f"{'.'.join(map(str, low))}..{'.'.join(map(str, high))}",
+    )
+    return False
+
+
+class Neo4jPool:
+    """Драйвер с пулом соединений и счётчиками использования."""
+
+    def __init__(self, uri, user, password, database=None, **driver_options):
+        self.uri = uri
+        self.user = user
+        self.database = database
+        self.driver = GraphDatabase.driver(uri, auth=(user, password), **driver_options)
+        self.max_pool_size = driver_options.get("max_connection_pool_size")
+        self._lock = threading.Lock()
+        self._stats = {
+            "reads": 0,
+            "writes": 0,
+            "failures": 0,
+            "active": 0,
+            "max_active": 0,
+        }
+
+    def _count(self, key, delta=1):
+        with self._lock:
+            self._stats[key] += delta
+            if key == "active" and self._stats["active"] > self._stats["max_active"]:
+                self._stats["max_active"] = self._stats["active"]
+
+    def session(self, **options):
+        """Сессия для авто-транзакций (DDL, `CALL ... IN TRANSACTIONS`)."""
+        options.setdefault("database", self.database)
+        return self.driver.session(**options)
+
+    def _execute(self, kind, work, args, kwargs):
+        self._count(kind)
+        self._count("active")
+        try:
+            with get_telemetry().span("neo4j.read" if kind == "reads" else "neo4j.write"):
+                with self.session() as session:
+                    run = session.execute_read if kind == "reads" else session.execute_write
+                    return run(work, *args, **kwargs)
+        except Exception:
+            # драйвер уже исчерпал свои повторы
+            self._count("failures")
+            raise
+        finally:
+            self._count("active", -1)
+
+    def execute_read(self, work, *args, **kwargs):
+        """`work(tx, *args, **kwargs)` в транзакции чтения."""
+        return self._execute("reads", work, args, kwargs)
+
+    def execute_write(self, work, *args, **kwargs):
+        """`work(tx, *args, **kwargs)` в транзакции записи."""
+        return self._execute("writes", work, args, kwargs)
+
+    def read(self, query, **params):
+        """Записи (`neo4j.Record`) запроса на чтение."""
+        return self.execute_read(lambda tx: list(tx.run(query, **params)))
+
+    def write(self, query, **params):
+        return self.execute_write(lambda tx: list(tx.run(query, **params)))
+
+    def verify(self):
+        """Проверка доступности сервера."""
+        try:
+            self.driver.verify_connectivity()
+            return True
+        except Exception as e:
+            log_error("Neo4jPool.verify", e)
+            return False
+
+    def metrics(self):
+        """Счётчики запросов и состояние пула соединений."""
+        with self._lock:
+            metrics = dict(self._stats)
+        metrics["max_pool_size"] = self.max_pool_size
+        # у драйвера нет публичных метрик пула: читаем внутреннее состояние
+        # только у проверенных версий и только если оно устроено как ожидается
+        if not _supported("neo4j", _version_tuple(neo4j.__version__), DRIVER_VERSIONS):
+            return metrics
+        connections = getattr(getattr(self.driver, "_pool", None), "connections", None)
+        if not isinstance(connections, dict):
+            _warn_once("driver._pool", "neo4j.pool_metrics_unavailable", version=neo4j.__version__)
+        else:
+            opened = [c for queue in list(connections.values()) for c in list(queue)]
+            metrics["pool_connections"] = len(opened)
+            metrics["pool_in_use"] = sum(1 for c in opened if getattr(c, "in_use", False))
+        return metrics
+
+    def close(self):
+        self.driver.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(uri=None, user=None, password=None, database=None, **options):
+    """Общий пул для (uri, user, пароль, database); недостающие параметры — из `NEO4J`."""
+    settings = dict(NEO4J)
+    settings.update({k: v for k, v in options.items() if v is not None})
+    uri = uri or settings.pop("uri")
+    user = user or settings.pop("user")
+    password = password or settings.pop("password")
+    database = database or settings.pop("database")
+    for key in ("uri", "user", "password", "database"):
+        settings.pop(key, None)
+
+    # пароль в ключе только хешем: с другим паролем — другой пул, а не чужой
+    key = (uri, user, database, hashlib.sha256(str(password).encode("utf-8")).hexdigest())
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = Neo4jPool(uri, user, password, database, **settings)
+        return pool
+
+
+def close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+def share_with_mem0(memory, pool=None):
+    """Подменить собственный драйвер графового хранилища Mem0 общим пулом.
+
+    Mem0 (через langchain Neo4jGraph) открывает свой драйвер; если версия
+    langchain-neo4j проверена и внутренняя структура совпадает, он закрывается
+    и заменяется общим. Иначе у Mem0 остаётся свой драйвер (с предупреждением
+    в логе). Возвращает True при успехе.
+    """
+    store = getattr(getattr(memory, "graph", None), "graph", None)
+    own = getattr(store, "_driver", None)
+    if own is None:
+        return False
+    if not _supported("langchain-neo4j", _langchain_neo4j_version(), LANGCHAIN_NEO4J_VERSIONS):
+        return False
+    if not hasattr(own, "close"):
+        _warn_once("Neo4jGraph._driver", "neo4j.share_skipped", store=type(store).__name__)
+        return False
+    pool = pool or get_pool()
+    if own is not pool.driver:
+        store._driver = pool.driver
+        try:
+            own.close()
+        except Exception as e:
+            log_error("share_with_mem0", e)
+    return True
@@ -0,0 +1,136 @@
+"""
+Общие для процесса ресурсы: Mem0 `Memory` (модель эмбеддингов, Chroma, Neo4j),
+клиент OpenAI и агенты по user_id (через `TenantService`, см. tenants.py).
+
+Всё создаётся при первом обращении, а тяжёлые библиотеки (mem0, openai,
+sentence-transformers, neo4j) импортируются только тогда — импорт
+`mem0_graph.agent` их не тянет. Сессии Streamlit и агенты разных
+пользователей делят одну `Memory` и одну модель.
+
+`warm_up()` создаёт ресурсы заранее и делает первый (самый медленный) вызов
+модели — при старте сервиса или в фоне, пока рисуется первая страница.
+"""
+
+import os
+import threading
+import time
+
+from .config import EMBEDDER, MEM0_CONFIG, TENANTS
+from .telemetry import log_error
+
+_lock = threading.RLock()
+_memory = None
+_chat_client = None
+_warm_up_thread = None
+
+
+def get_memory():
+    """Общая `Memory` по `MEM0_CONFIG`: граф через пул Neo4j, эмбеддер — пакетный с кешем."""
+    global _memory
+    with _lock:
+        if _memory is None:
+            from mem0 import Memory
+
+            from .neo4j_pool import share_with_mem0
+
+            # Mem0 подхватит OPENAI_BASE_URL и OPENROUTER_API_KEY из среды
+            memory = Memory.from_config(MEM0_CONFIG)
+            # граф Mem0 ходит в Neo4j через общий пул, а не через свой драйвер
+            share_with_mem0(memory)
+            if EMBEDDER["enabled"]:
+                from .embedder import install_embedder
+
+                # пакетный эмбеддер с кешем вместо поштучного кодирования Mem0
+                options = dict(EMBEDDER)
+                del options["enabled"]
+                install_embedder(memory, **options)
+            from .cache import share_query_embeddings
+            from .telemetry import instrument_memory
+
+            # вектор запроса, посчитанный для кеша поиска, Mem0 не считает повторно
+            share_query_embeddings(memory)
+
+            # замеры Chroma, извлечения фактов и графа внутри Mem0
+            instrument_memory(memory)
+            _memory = memory
+        return _memory
+
+
+def chat_client_options():
+    """Ключ и адрес OpenAI-совместимого API для клиентов чата."""
+    return {
+        "api_key": os.getenv("OPENROUTER_API_KEY"),
+        "base_url": os.getenv("OPENAI_BASE_URL", "https://openrouter.ai/api/v1"),
+    }
+
+
+def get_chat_client():
+    """Общий `openai.OpenAI`: клиент потокобезопасен и держит пул соединений."""
+    global _chat_client
+    with _lock:
+        if _chat_client is None:
+            import openai
+
+            _chat_client = openai.OpenAI(**chat_client_options())
+        return _chat_client
+
+
+def new_async_chat_client():
+    """Новый `openai.AsyncOpenAI`: его соединения привязаны к event loop, поэтому он не общий."""
+    import openai
+
+    return openai.AsyncOpenAI(**chat_client_options())
+
+
+def get_service():
+    """Общий для процесса `TenantService` с настройками `TENANTS`: запросы всех сессий идут через него."""
+    from .tenants import get_tenant_service
+
+    return get_tenant_service(**TENANTS)
+
+
+def get_agent(user_id="user_1"):
+    """Агент пользователя `user_id` из общего для процесса `TenantService` (все делят `get_memory()`)."""
+    return get_service().agent(user_id)
+
+
+def warm_up(background=False):
+    """Создать `Memory` и клиент чата, прогнать модель эмбеддингов и проверить Neo4j.
+
+    Возвращает `{этап: секунды}` (None — этап не удался). С `background=True`
+    прогрев идёт в фоновом потоке (один на процесс), возвращается поток;
+    `get_memory()` и `get_agent()` из других потоков дождутся его.
+    """
+    global _warm_up_thread
+    if background:
+        with _lock:
+            if _warm_up_thread is None:
+                _warm_up_thread = threading.Thread(target=warm_up, name="mem0-warm-up", daemon=True)
+                _warm_up_thread.start()
+            return _warm_up_thread
+
+    def memory_embedding():
+        # первый вызов модели медленный: ленивая инициализация весов и потоков BLAS
+        get_memory().embedding_model.embed("прогрев", "search")
+
+    def neo4j():
+        from .neo4j_pool import get_pool
+
+        if not get_pool().verify():
+            raise RuntimeError("Neo4j недоступен")
+
+    timings = {}
+    for stage, step in (
+        ("memory", get_memory),
+        ("embedding", memory_embedding),
+        ("neo4j", neo4j),
+        ("chat_client", get_chat_client),
+    ):
+        started = time.perf_counter()
+        try:
+            step()
+            timings[stage] = time.perf_counter() - started
+        except Exception as e:
+            log_error("warm_up", e, stage=stage)
+            timings[stage] = None
+    return timings
@@ -0,0 +1,372 @@
+"""
+Замеры этапов, счётчики токенов и стоимости, структурные логи.
+
+- `span(name, **attrs)` — контекстный менеджер вокруг этапа: длительность
+  попадает в гистограмму этапа (корзины Prometheus и окно последних значений
+  для p50/p95), исключение — в счётчик ошибок. Вложенные этапы знают своего
+  родителя (`contextvars`), поэтому работают и в потоках, и в asyncio.
+- `record_llm_usage(...)` — токены запроса и ответа и стоимость по ценам
+  из `TELEMETRY["prices"]`; без `usage` в ответе токены оцениваются по тексту.
+- Логи — строки JSON в логгер `mem0_graph` (`log_event`, `log_error`).
+- Экспорт: `summary()` для интерфейса, `prometheus_text()` в текстовом формате
+  Prometheus (`serve_prometheus(port)` отдаёт его по HTTP), при `otel=True` и
+  установленном `opentelemetry-api` — ещё спаны и метрики OpenTelemetry.
+
+Внутренние этапы Mem0 (извлечение фактов LLM, Chroma, граф) замеряются
+обёртками, которые ставит `instrument_memory(memory)`.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import ExitStack, contextmanager
+
+logger = logging.getLogger("mem0_graph")
+
+# секунды: от быстрых попаданий в кеш до долгих ответов LLM
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+_current_span = contextvars.ContextVar("mem0_graph_span", default=None)
+
+
+def log_event(event, level=logging.INFO, **fields):
+    """Строка JSON `{"event": ..., **fields}` в логгер `mem0_graph`."""
+    if not logger.isEnabledFor(level):
+        return
+    record = {"event": event}
+    span = _current_span.get()
+    if span is not None:
+        record["span"] = span
+    record.update(fields)
+    logger.log(level, json.dumps(record, ensure_ascii=False, default=str))
+
+
+def log_error(where, error, **fields):
+    """Ошибка, после которой работа продолжается: лог и счётчик `errors_total{where}`.
+
+    `error` — исключение или уже готовое описание строкой.
+    """
+    get_telemetry().count("errors_total", where=where)
+    error_type = type(error).__name__ if isinstance(error, BaseException) else None
+    log_event("error", logging.ERROR, where=where, error_type=error_type, error=str(error), **fields)
+
+
+class Histogram:
+    """Гистограмма длительностей: корзины для Prometheus и окно последних значений для квантилей."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window=2048):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.recent = deque(maxlen=window)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.errors = 0
+
+    def observe(self, value, error=False):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.recent.append(value)
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self.errors += error
+
+    def quantile(self, q):
+        """Квантиль по окну последних значений (0.0 без данных)."""
+        values = sorted(self.recent)
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_label_value(v)}"' for k, v in labels) + "}"
+
+
+class Telemetry:
+    """Гистограммы этапов и счётчики процесса; потокобезопасно."""
+
+    def __init__(self, enabled=True, buckets=DEFAULT_BUCKETS, window=2048, prices=None,
+                 otel=False, prefix="mem0graph"):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.window = window
+        # {модель: {"prompt": $, "completion": $}} за миллион токенов
+        self.prices = prices or {}
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms = {}  # этап -> Histogram
+        self._counters = {}  # (имя, ((метка, значение), ...)) -> число
+        self._otel = None
+        if otel:
+            self._setup_otel()
+
+    def _setup_otel(self):
+        try:
+            from opentelemetry import metrics, trace
+        except ImportError as e:
+            log_event("otel_unavailable", logging.WARNING, error=str(e))
+            return
+        meter = metrics.get_meter("mem0_graph")
+        self._otel = {
+            "tracer": trace.get_tracer("mem0_graph"),
+            "duration": meter.create_histogram(
+                f"{self.prefix}.stage.duration", unit="s", description="Длительность этапа"
+            ),
+            "counters": {},
+            "meter": meter,
+        }
+
+    def observe(self, stage, seconds, error=False):
+        """Добавить замер этапа `stage` (секунды)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram(self.buckets, self.window)
+            histogram.observe(seconds, error)
+        if self._otel is not None:
+            self._otel["duration"].record(seconds, {"stage": stage, "error": bool(error)})
+
+    def count(self, name, value=1, **labels):
+        """Увеличить счётчик `name` с метками `labels`."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        if self._otel is not None:
+            counters = self._otel["counters"]
+            counter = counters.get(name)
+            if counter is None:
+                counter = counters[name] = self._otel["meter"].create_counter(f"{self.prefix}.{name}")
+            counter.add(value, labels)
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """Замер этапа `name`; внутри можно дополнять `attrs` (они уходят в лог и спан OTel)."""
+        if not self.enabled:
+            yield attrs
+            return
+        parent = _current_span.get()
+        token = _current_span.set(name)
+        error = None
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                otel_span = None
+                if self._otel is not None:
+                    otel_span = stack.enter_context(
+                        self._otel["tracer"].start_as_current_span(name)
+                    )
+                try:
+                    yield attrs
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    if otel_span is not None:
+                        for key, value in attrs.items():
+                            if isinstance(value, (str, bool, int, float)):
+                                otel_span.set_attribute(key, value)
+        finally:
+            seconds = time.perf_counter() - started
+            _current_span.reset(token)
+            self.observe(name, seconds, error is not None)
+            if logger.isEnabledFor(logging.DEBUG):
+                log_event(
+                    "span", logging.DEBUG, name=name, parent=parent, ms=round(seconds * 1000, 3),
+                    error=type(error).__name__ if error is not None else None, **attrs,
+                )
+
+    def wrap(self, name, fn):
+        """`fn`, каждый вызов которого замеряется как этап `name`."""
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with self.span(name):
+                return fn(*args, **kwargs)
+
+        wrapper.telemetry_stage = name
+        return wrapper
+
+    def record_llm_usage(self, model, usage=None, messages=None, answer=None, stage="llm"):
+        """Токены и стоимость вызова модели; `(prompt, completion)`.
+
+        `usage` — поле ответа OpenAI (`prompt_tokens`, `completion_tokens`); если его нет,
+        токены оцениваются по тексту сообщений и ответа.
+        """
+        prompt = getattr(usage, "prompt_tokens", None)
+        completion = getattr(usage, "completion_tokens", None)
+        estimated = prompt is None or completion is None
+        if estimated:
+            from .chunking import approx_token_count
+
+            prompt = sum(approx_token_count(m.get("content") or "") for m in messages or ())
+            completion = approx_token_count(answer or "")
+        self.count("llm_tokens_total", prompt, model=model, kind="prompt", stage=stage)
+        self.count("llm_tokens_total", completion, model=model, kind="completion", stage=stage)
+        self.count("llm_calls_total", model=model, stage=stage, estimated=estimated)
+        price = self.prices.get(model)
+        if price:
+            cost = (prompt * price["prompt"] + completion * price["completion"]) / 1_000_000
+            self.count("llm_cost_usd_total", cost, model=model, stage=stage)
+        return prompt, completion
+
+    def summary(self):
+        """`{этап: {calls, errors, p50, p95, mean, max}}` (мс) — для интерфейса и скриптов."""
+        with self._lock:
+            stages = {}
+            for stage, h in sorted(self._histograms.items()):
+                stages[stage] = {
+                    "calls": h.count,
+                    "errors": h.errors,
+                    "p50": h.quantile(0.5) * 1000,
+                    "p95": h.quantile(0.95) * 1000,
+                    "mean": h.sum / h.count * 1000 if h.count else 0.0,
+                    "max": h.max * 1000,
+                }
+            return stages
+
+    def counters(self, name=None):
+        """`{(имя, метки): значение}`; с `name` — только этого счётчика."""
+        with self._lock:
+            return {key: value for key, value in self._counters.items()
+                    if name is None or key[0] == name}
+
+    def total(self, name, **labels):
+        """Сумма счётчика `name` по записям, у которых совпадают метки `labels`."""
+        wanted = set(labels.items())
+        return sum(value for (_, key_labels), value in self.counters(name).items()
+                   if wanted <= set(key_labels))
+
+    def prometheus_text(self):
+        """Все гистограммы и счётчики в текстовом формате Prometheus 0.0.4."""
+        metric = f"{self.prefix}_stage_seconds"
+        lines = [f"# HELP {metric} Длительность этапов обработки запросов",
+                 f"# TYPE {metric} histogram"]
+        errors = [f"# TYPE {self.prefix}_stage_errors_total counter"]
+        with self._lock:
+            for stage, h in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), h.counts):
+                    cumulative += count
+                    lines.append(
+                        f"{metric}_bucket{_labels((('stage', stage), ('le', bound)))} {cumulative}"
+                    )
+                lines.append(f"{metric}_sum{_labels((('stage', stage),))} {h.sum}")
+                lines.append(f"{metric}_count{_labels((('stage', stage),))} {h.count}")
+                errors.append(
+                    f"{self.prefix}_stage_errors_total{_labels((('stage', stage),))} {h.errors}"
+                )
+            counters = sorted(self._counters.items())
+        lines += errors
+        declared = set()
+        for (name, labels), value in counters:
+            full = f"{self.prefix}_{name}"
+            if full not in declared:
+                declared.add(full)
+                lines.append(f"# TYPE {full} counter")
+            lines.append(f"{full}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+def serve_prometheus(telemetry, port, host="0.0.0.0"):
+    """HTTP-сервер в фоновом потоке: `GET /metrics` отдаёт `prometheus_text()`."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = telemetry.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="prometheus-exporter", daemon=True).start()
+    log_event("prometheus_started", port=server.server_address[1])
+    return server
+
+
+# Методы внутренних компонентов Mem0 и этапы, под которыми они замеряются
+MEM0_STAGES = (
+    ("vector_store", ("search", "insert", "update", "delete", "get", "list"), "chroma"),
+    ("llm", ("generate_response",), "mem0.extract"),
+    ("graph", ("add", "search", "delete_all"), "mem0.graph"),
+    ("graph.llm", ("generate_response",), "mem0.graph_extract"),
+)
+
+
+def instrument_memory(memory, telemetry=None):
+    """Обернуть методы Chroma, LLM и графа внутри `memory` замерами; число обёрнутых методов."""
+    telemetry = telemetry or get_telemetry()
+    wrapped = 0
+    for path, methods, prefix in MEM0_STAGES:
+        target = memory
+        for attr in path.split("."):
+            target = getattr(target, attr, None)
+        if target is None:
+            continue
+        for method in methods:
+            fn = getattr(target, method, None)
+            if fn is None or hasattr(fn, "telemetry_stage"):
+                continue
+            setattr(target, method, telemetry.wrap(f"{prefix}.{method}", fn))
+            wrapped += 1
+    return wrapped
+
+
+_telemetry = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry(**options):
+    """Общие для процесса замеры; параметры по умолчанию — `TELEMETRY` из config.py."""
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None:
+            from .config import TELEMETRY
+
+            settings = dict(TELEMETRY)
+            settings.update(options)
+            port = settings.pop("prometheus_port", 0)
+            _telemetry = Telemetry(**settings)
+            if port:
+                try:
+                    serve_prometheus(_telemetry, port)
+                except OSError as e:
+                    # порт занят другим процессом (например, вторым воркером)
+                    log_event("prometheus_unavailable", logging.WARNING, port=port, error=str(e))
+        return _telemetry
+
+
+def span(name, **attrs):
+    """`get_telemetry().span(...)`."""
+    return get_telemetry().span(name, **attrs)
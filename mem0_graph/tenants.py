@@ -0,0 +1,321 @@
+"""
+Много пользователей в одном процессе: агенты по user_id поверх общих ресурсов
+и справедливая очередь запросов.
+
+- Агент (`Mem0Agent`) лёгкий: `Memory` с моделью эмбеддингов, Chroma, пул
+  Neo4j, клиент OpenAI, кеши и очередь записи общие для процесса
+  (см. resources.py). Агенты хранятся в LRU не больше `max_agents` штук.
+- Запросы выполняет общий пул из `workers` потоков. Очереди пользователей
+  обходятся по кругу — по одному заданию за проход, поэтому пользователь
+  с сотней запросов не задерживает тех, у кого один. Одновременно у
+  пользователя выполняется не больше `per_tenant` запросов, ждут не больше
+  `max_queued` — лишние отклоняются с `TenantBusy`.
+- Потоковый ответ (`chat_stream`) тоже генерируется в пуле и занимает слот
+  пользователя до конца; фрагменты передаются читателю через очередь.
+"""
+
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+from .telemetry import get_telemetry
+
+
+class TenantBusy(RuntimeError):
+    """Очередь запросов пользователя заполнена."""
+
+
+class TenantScheduler:
+    """Пул потоков с очередью на каждого пользователя и круговым обходом очередей."""
+
+    def __init__(self, workers=16, per_tenant=2, max_queued=64, clock=time.monotonic):
+        self.per_tenant = per_tenant
+        self.max_queued = max_queued
+        self.clock = clock
+        self._cond = threading.Condition()
+        self._queues = {}  # user_id -> deque[(fn, args, kwargs, future, enqueued)]
+        self._running = {}  # user_id -> выполняется сейчас
+        # пользователи с ожидающими заданиями и свободным слотом, в порядке обхода
+        self._ready = deque()
+        self._scheduled = set()
+        self._closed = False
+        self._tenants = {}  # user_id -> счётчики
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"tenant-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _counters(self, user_id):
+        counters = self._tenants.get(user_id)
+        if counters is None:
+            counters = self._tenants[user_id] = {
+                "submitted": 0, "done": 0, "failed": 0, "rejected": 0,
+                "max_running": 0, "wait": 0.0, "max_wait": 0.0,
+            }
+        return counters
+
+    def _schedule(self, user_id):
+        """Поставить пользователя в обход, если у него есть задания и свободный слот."""
+        if (
+            self._queues.get(user_id)
+            and self._running.get(user_id, 0) < self.per_tenant
+            and user_id not in self._scheduled
+        ):
+            self._ready.append(user_id)
+            self._scheduled.add(user_id)
+            self._cond.notify()
+
+    def submit(self, user_id, fn, *args, **kwargs):
+        """Future с результатом `fn(*args, **kwargs)`; `TenantBusy`, если очередь полна."""
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("TenantScheduler is closed")
+            counters = self._counters(user_id)
+            queue = self._queues.setdefault(user_id, deque())
+            if len(queue) >= self.max_queued:
+                counters["rejected"] += 1
+                raise TenantBusy(f"too many queued requests for {user_id}")
+            counters["submitted"] += 1
+            queue.append((fn, args, kwargs, future, self.clock()))
+            self._schedule(user_id)
+        return future
+
+    def _next(self):
+        """Следующее задание по кругу; None — планировщик закрыт."""
+        with self._cond:
+            while not self._ready:
+                if self._closed:
+                    return None
+                self._cond.wait()
+            user_id = self._ready.popleft()
+            self._scheduled.discard(user_id)
+            queue = self._queues[user_id]
+            job = queue.popleft()
+            running = self._running[user_id] = self._running.get(user_id, 0) + 1
+            counters = self._counters(user_id)
+            counters["max_running"] = max(counters["max_running"], running)
+            wait = self.clock() - job[4]
+            counters["wait"] += wait
+            counters["max_wait"] = max(counters["max_wait"], wait)
+            # остальные задания пользователя — в конец обхода, после других пользователей
+            self._schedule(user_id)
+        get_telemetry().observe("tenant.wait", wait)
+        return user_id, job
+
+    def _finish(self, user_id, ok):
+        with self._cond:
+            self._running[user_id] -= 1
+            counters = self._counters(user_id)
+            counters["done" if ok else "failed"] += 1
+            if not self._running[user_id]:
+                del self._running[user_id]
+            if not self._queues[user_id] and user_id not in self._running:
+                del self._queues[user_id]
+            else:
+                self._schedule(user_id)
+
+    def _worker(self):
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            user_id, (fn, args, kwargs, future, _) = item
+            ok = False
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                    ok = True
+                except BaseException as e:
+                    future.set_exception(e)
+            self._finish(user_id, ok)
+
+    def pending(self, user_id=None):
+        """Ожидающие и выполняющиеся задания пользователя (или всех)."""
+        with self._cond:
+            if user_id is not None:
+                return len(self._queues.get(user_id, ())) + self._running.get(user_id, 0)
+            return sum(map(len, self._queues.values())) + sum(self._running.values())
+
+    def tenant_stats(self, user_id):
+        with self._cond:
+            counters = dict(self._counters(user_id))
+            counters["queued"] = len(self._queues.get(user_id, ()))
+            counters["running"] = self._running.get(user_id, 0)
+            return counters
+
+    def stats(self):
+        with self._cond:
+            started = sum(c["done"] + c["failed"] for c in self._tenants.values())
+            started += sum(self._running.values())
+            wait = sum(c["wait"] for c in self._tenants.values())
+            return {
+                "tenants": len(self._tenants),
+                "active": len(self._queues),
+                "queued": sum(map(len, self._queues.values())),
+                "running": sum(self._running.values()),
+                "done": sum(c["done"] for c in self._tenants.values()),
+                "failed": sum(c["failed"] for c in self._tenants.values()),
+                "rejected": sum(c["rejected"] for c in self._tenants.values()),
+                "avg_wait": wait / started if started else 0.0,
+                "max_wait": max((c["max_wait"] for c in self._tenants.values()), default=0.0),
+            }
+
+    def close(self, timeout=None):
+        """Отменить ожидающие задания и дождаться выполняющихся."""
+        with self._cond:
+            self._closed = True
+            for queue in self._queues.values():
+                for job in queue:
+                    job[3].cancel()
+                queue.clear()
+            self._ready.clear()
+            self._scheduled.clear()
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+
+
+def _default_agent(user_id):
+    from .agent import Mem0Agent
+
+    return Mem0Agent(user_id=user_id)
+
+
+class TenantService:
+    """Агенты пользователей (LRU) и их запросы через `TenantScheduler`."""
+
+    def __init__(self, agent_factory=None, max_agents=1000, workers=16, per_tenant=2,
+                 max_queued=64):
+        self.agent_factory = agent_factory or _default_agent
+        self.max_agents = max_agents
+        self.scheduler = TenantScheduler(workers, per_tenant, max_queued)
+        self._lock = threading.Lock()
+        self._agents = OrderedDict()
+        self._creating = {}  # user_id -> Event, пока агент создаётся
+        self.created = 0
+        self.evicted = 0
+
+    def agent(self, user_id):
+        """Агент пользователя; давно не использованные вытесняются сверх `max_agents`."""
+        while True:
+            with self._lock:
+                agent = self._agents.get(user_id)
+                if agent is not None:
+                    self._agents.move_to_end(user_id)
+                    return agent
+                creating = self._creating.get(user_id)
+                if creating is None:
+                    creating = self._creating[user_id] = threading.Event()
+                    break
+            # агента создаёт другой поток — ждём его, а не создаём второй
+            creating.wait()
+
+        try:
+            agent = self.agent_factory(user_id)
+        finally:
+            with self._lock:
+                del self._creating[user_id]
+                creating.set()
+        with self._lock:
+            self._agents[user_id] = agent
+            self.created += 1
+            while len(self._agents) > self.max_agents:
+                # выполняющийся запрос держит ссылку на агента и спокойно доработает
+                self._agents.popitem(last=False)
+                self.evicted += 1
+        return agent
+
+    def _call(self, user_id, method, args, kwargs):
+        return getattr(self.agent(user_id), method)(*args, **kwargs)
+
+    def submit(self, user_id, method, *args, **kwargs):
+        """Future с результатом `Mem0Agent.<method>(*args, **kwargs)` пользователя `user_id`."""
+        return self.scheduler.submit(user_id, self._call, user_id, method, args, kwargs)
+
+    def call(self, user_id, method, *args, timeout=None, **kwargs):
+        """Синхронный вызов метода агента через очередь пользователя."""
+        return self.submit(user_id, method, *args, **kwargs).result(timeout)
+
+    def chat(self, user_id, message, timeout=None):
+        return self.call(user_id, "chat", message, timeout=timeout)
+
+    def chat_stream(self, user_id, message, idle_timeout=60.0):
+        """`ChatStream` ответа, который генерируется в очереди пользователя.
+
+        `TenantBusy` поднимается сразу. Следующий фрагмент запрашивается у
+        модели, только когда читатель попросил его, поэтому диалог попадает
+        в память лишь после того, как поток дочитан. Если читатель бросил
+        поток (или молчит дольше `idle_timeout` секунд), генерация прерывается.
+        """
+        from .agent import ChatStream
+
+        fragments = queue.Queue()
+        demand = threading.Semaphore(0)
+        stop = threading.Event()
+        done = object()
+
+        def produce():
+            stream = self.agent(user_id).chat_stream(message)
+            try:
+                while demand.acquire(timeout=idle_timeout) and not stop.is_set():
+                    try:
+                        delta = next(stream)
+                    except StopIteration:
+                        return
+                    fragments.put((stream.context_stats, delta))
+            finally:
+                stream.close()
+
+        future = self.scheduler.submit(user_id, produce)
+        # конец потока — и после генерации, и если задание отменили, не начав
+        future.add_done_callback(lambda _: fragments.put(done))
+
+        def consume(reply):
+            try:
+                while True:
+                    demand.release()
+                    item = fragments.get()
+                    if item is done:
+                        break
+                    reply.context_stats, delta = item
+                    yield delta
+                future.result()  # ошибка генерации (например, при создании агента)
+            finally:
+                stop.set()
+                demand.release()
+                future.cancel()
+
+        return ChatStream(consume)
+
+    def search(self, user_id, query, timeout=None):
+        return self.call(user_id, "search", query, timeout=timeout)
+
+    def add_memory(self, user_id, text, metadata=None, timeout=None, **options):
+        return self.call(user_id, "add_memory", text, metadata, timeout=timeout, **options)
+
+    def stats(self):
+        stats = self.scheduler.stats()
+        with self._lock:
+            stats.update(agents=len(self._agents), created=self.created, evicted=self.evicted)
+        return stats
+
+    def close(self, timeout=None):
+        self.scheduler.close(timeout)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_tenant_service(**options):
+    """Общий для процесса сервис: все сессии и пользователи делят один пул потоков."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = TenantService(**options)
+        return _service
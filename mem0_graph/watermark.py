@@ -0,0 +1,52 @@
+"""
+Счётчики записей в память по пользователям (водяные знаки изменений).
+
+Агент увеличивает счётчик после каждой записи; кеши (снимок графа и т.п.)
+сравнивают его со своей версией и перечитывают данные только при изменениях.
+Отдельный счётчик `full` растёт, когда что-то было удалено: такие изменения
+нельзя догнать инкрементально, нужен полный перезапрос.
+"""
+
+import threading
+
+
+class WriteWatermarks:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+
+    def bump(self, user_id, full=False):
+        """Отметить запись; `full=True` — были удаления. Возвращает новую версию."""
+        with self._lock:
+            version, full_version = self._versions.get(user_id, (0, 0))
+            version += 1
+            if full:
+                full_version = version
+            self._versions[user_id] = (version, full_version)
+            return version
+
+    def get(self, user_id):
+        """`(version, full_version)`: текущая версия и версия последнего удаления."""
+        with self._lock:
+            return self._versions.get(user_id, (0, 0))
+
+
+def has_deletions(result):
+    """Удалил ли вызов `Memory.add` что-то (воспоминания или связи в графе)."""
+    if not isinstance(result, dict):
+        return False
+    for item in result.get("results") or []:
+        if isinstance(item, dict) and item.get("event") == "DELETE":
+            return True
+    relations = result.get("relations")
+    if isinstance(relations, dict) and relations.get("deleted_entities"):
+        return any(relations["deleted_entities"])
+    return False
+
+
+_watermarks = WriteWatermarks()
+
+
+def get_watermarks():
+    """Общие для процесса счётчики: их читают и агент, и визуализация графа."""
+    return _watermarks
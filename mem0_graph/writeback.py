@@ -0,0 +1,352 @@
+"""
+Фоновая (write-behind) очередь записей диалога в Mem0 с журналом в SQLite.
+
+Ответ агента возвращается сразу, а `Memory.add` выполняют фоновые потоки.
+Задания сначала пишутся в журнал, поэтому переживают перезапуск процесса:
+незавершённые записи повторно ставятся в очередь при старте.
+Задания, не применённые и после всех повторов, остаются в журнале со
+статусом `failed`: их число видно в `stats()`, а `retry_failed()` ставит
+их в очередь снова.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+
+from .telemetry import get_telemetry, log_error, log_event
+
+
+class WriteBehindQueue:
+    """Очередь `Memory.add` с журналом, повторами и склейкой соседних заданий.
+
+    Задания одного пользователя всегда попадают к одному и тому же воркеру,
+    поэтому порядок записей пользователя сохраняется; подряд идущие задания
+    пользователя объединяются в один вызов `add` со списком сообщений.
+    После каждой попытки вызывается `on_applied(user_id, result)`
+    (`result` равен None, если запись не удалась).
+    """
+
+    def __init__(self, memory, journal_path, workers=2, retries=3, backoff=1.0,
+                 max_batch_messages=20, on_applied=None):
+        self.memory = memory
+        self.journal_path = journal_path
+        self.retries = retries
+        self.backoff = backoff
+        self.max_batch_messages = max_batch_messages
+        self.on_applied = on_applied
+
+        if journal_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(journal_path)), exist_ok=True)
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(journal_path, check_same_thread=False)
+        with self._db_lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+
+        self._cond = threading.Condition()
+        self._pending = {}  # user_id -> число незавершённых заданий
+        self._closed = False
+        self._queues = [queue.Queue() for _ in range(max(1, workers))]
+        self._threads = [
+            threading.Thread(target=self._worker, args=(q,), daemon=True, name=f"mem0-writeback-{i}")
+            for i, q in enumerate(self._queues)
+        ]
+        for thread in self._threads:
+            thread.start()
+        self._replay()
+
+    # --- журнал ---
+
+    def _replay(self):
+        """Возвращает в очередь задания, не завершённые до перезапуска."""
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT id, user_id FROM jobs WHERE status = 'pending' ORDER BY id"
+            ).fetchall()
+        for job_id, user_id in rows:
+            self._dispatch(job_id, user_id)
+        failed = self.failed()
+        if failed:
+            log_event(
+                "writeback.failed_jobs", level=logging.WARNING,
+                journal=self.journal_path, failed=failed,
+            )
+
+    def _load(self, job_id):
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT user_id, payload FROM jobs WHERE id = ? AND status = 'pending'",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        payload = json.loads(row[1])
+        return {"id": job_id, "user_id": row[0], **payload}
+
+    def _finish(self, job_ids):
+        with self._db_lock, self._conn:
+            self._conn.executemany("DELETE FROM jobs WHERE id = ?", [(i,) for i in job_ids])
+
+    def _fail(self, job_ids, attempts, error):
+        with self._db_lock, self._conn:
+            self._conn.executemany(
+                "UPDATE jobs SET status = 'failed', attempts = ?, error = ? WHERE id = ?",
+                [(attempts, error, i) for i in job_ids],
+            )
+
+    # --- очередь ---
+
+    def _dispatch(self, job_id, user_id):
+        with self._cond:
+            self._pending[user_id] = self._pending.get(user_id, 0) + 1
+        # стабильный хеш: задания пользователя всегда у одного воркера
+        index = zlib.crc32(user_id.encode("utf-8")) % len(self._queues)
+        self._queues[index].put((job_id, user_id))
+
+    def _done(self, user_id, count=1):
+        with self._cond:
+            left = self._pending.get(user_id, 0) - count
+            if left > 0:
+                self._pending[user_id] = left
+            else:
+                self._pending.pop(user_id, None)
+            self._cond.notify_all()
+
+    def enqueue(self, user_id, messages, metadata=None):
+        """Записать задание в журнал и поставить в очередь; возвращает id задания."""
+        if self._closed:
+            raise RuntimeError("WriteBehindQueue закрыта")
+        payload = json.dumps({"messages": messages, "metadata": metadata}, ensure_ascii=False)
+        with self._db_lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (user_id, payload, created_at) VALUES (?, ?, ?)",
+                (user_id, payload, time.time()),
+            )
+            job_id = cursor.lastrowid
+        self._dispatch(job_id, user_id)
+        return job_id
+
+    def discard(self, user_id):
+        """Отменить ещё не начатые задания пользователя (например, перед очисткой памяти)."""
+        with self._db_lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE user_id = ? AND status = 'pending'", (user_id,)
+            )
+        return cursor.rowcount
+
+    def failed(self, user_id=None):
+        """Число заданий, не применённых и после всех повторов."""
+        query = "SELECT COUNT(*) FROM jobs WHERE status = 'failed'"
+        params = ()
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params = (user_id,)
+        with self._db_lock:
+            return self._conn.execute(query, params).fetchone()[0]
+
+    def retry_failed(self, user_id=None):
+        """Вернуть в очередь упавшие задания (всех или одного пользователя); возвращает их число."""
+        if self._closed:
+            raise RuntimeError("WriteBehindQueue закрыта")
+        query = "SELECT id, user_id FROM jobs WHERE status = 'failed'"
+        params = ()
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params = (user_id,)
+        with self._db_lock, self._conn:
+            rows = self._conn.execute(query + " ORDER BY id", params).fetchall()
+            self._conn.executemany(
+                "UPDATE jobs SET status = 'pending', error = NULL WHERE id = ?",
+                [(job_id,) for job_id, _ in rows],
+            )
+        for job_id, job_user in rows:
+            self._dispatch(job_id, job_user)
+        return len(rows)
+
+    def stats(self):
+        """Незавершённые и упавшие задания и путь журнала."""
+        return {"journal": self.journal_path, "pending": self.pending(), "failed": self.failed()}
+
+    def _count(self, user_id=None):
+        if user_id is None:
+            return sum(self._pending.values())
+        return self._pending.get(user_id, 0)
+
+    def pending(self, user_id=None):
+        """Число ещё не применённых заданий (всех или одного пользователя)."""
+        with self._cond:
+            return self._count(user_id)
+
+    def flush(self, user_id=None, timeout=None):
+        """Дождаться применения заданий (всех или одного пользователя).
+
+        Возвращает False, если истёк `timeout`.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._count(user_id):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """Дождаться очереди и остановить воркеры; незавершённое останется в журнале."""
+        self.flush(timeout=timeout)
+        self._closed = True
+        for q in self._queues:
+            q.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        with self._db_lock:
+            self._conn.close()
+
+    # --- воркеры ---
+
+    def _worker(self, jobs):
+        while True:
+            item = jobs.get()
+            if item is None:
+                return
+            batch = [item]
+            # забираем то, что уже накопилось, чтобы склеить соседние задания
+            while True:
+                try:
+                    extra = jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if extra is None:
+                    jobs.put(None)
+                    break
+                batch.append(extra)
+
+            for group in self._group(batch):
+                self._apply(group)
+
+    def _group(self, batch):
+        """Склеивает подряд идущие задания одного пользователя с одинаковыми metadata."""
+        group = []
+        size = 0
+        for job_id, user_id in batch:
+            job = self._load(job_id)
+            if job is None:
+                # задание отменено через discard()
+                self._done(user_id)
+                continue
+            if group and (
+                job["user_id"] != group[0]["user_id"]
+                or job["metadata"] != group[0]["metadata"]
+                or size + len(job["messages"]) > self.max_batch_messages
+            ):
+                yield group
+                group, size = [], 0
+            group.append(job)
+            size += len(job["messages"])
+        if group:
+            yield group
+
+    def _apply(self, group):
+        user_id = group[0]["user_id"]
+        metadata = group[0]["metadata"]
+        messages = [m for job in group for m in job["messages"]]
+        job_ids = [job["id"] for job in group]
+
+        attempts = 0
+        result = None
+        while True:
+            attempts += 1
+            try:
+                # извлечение фактов LLM, эмбеддинги, Chroma и граф внутри Mem0
+                with get_telemetry().span("memory.add", user_id=user_id, jobs=len(group)):
+                    result = self.memory.add(messages, user_id=user_id, metadata=metadata)
+                self._finish(job_ids)
+                break
+            except Exception as e:
+                if attempts > self.retries:
+                    log_error("WriteBehindQueue._apply", e, jobs=job_ids, attempts=attempts)
+                    self._fail(job_ids, attempts, f"{type(e).__name__}: {e}")
+                    break
+                time.sleep(self.backoff * (2 ** (attempts - 1)))
+
+        if self.on_applied:
+            try:
+                self.on_applied(user_id, result)
+            except Exception as e:
+                log_error("WriteBehindQueue.on_applied", e, user_id=user_id)
+        self._done(user_id, len(group))
+
+
+_write_queues = {}  # ключ хранилища Memory -> WriteBehindQueue
+_write_queue_lock = threading.Lock()
+
+# Поля настроек векторного хранилища, которые определяют, куда пишет Memory
+_STORE_FIELDS = ("collection_name", "path", "host", "port", "url")
+
+
+def memory_key(memory):
+    """Стабильный между перезапусками ключ хранилища `Memory` (None, если настроек нет).
+
+    Собирается из провайдера и адреса векторного хранилища (коллекция,
+    путь, хост), без ключей доступа.
+    """
+    vector_store = getattr(getattr(memory, "config", None), "vector_store", None)
+    if vector_store is None:
+        return None
+    config = getattr(vector_store, "config", None)
+    if not isinstance(config, dict):
+        config = {field: getattr(config, field, None) for field in _STORE_FIELDS}
+    key = {"provider": getattr(vector_store, "provider", None)}
+    key.update((field, config.get(field)) for field in _STORE_FIELDS)
+    return json.dumps(key, sort_keys=True, default=str)
+
+
+def journal_path_for(journal_path, key):
+    """`journal.sqlite3` -> `journal-<хеш ключа>.sqlite3`."""
+    root, ext = os.path.splitext(journal_path)
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+    return f"{root}-{digest}{ext}"
+
+
+def get_write_queue(memory, journal_path, **options):
+    """Одна очередь на хранилище `Memory`: задания применяются к той памяти, для которой записаны.
+
+    Имя журнала выводится из настроек векторного хранилища (`memory_key`),
+    поэтому после перезапуска задания попадают в ту же память независимо
+    от порядка создания. `Memory` на одном хранилище делят одну очередь.
+    Без настроек хранилища (заглушки) очередь привязана к объекту, а журнал
+    держится в памяти процесса и перезапуск не переживает.
+    """
+    key = memory_key(memory)
+    with _write_queue_lock:
+        # очередь держит ссылку на memory, поэтому id не переиспользуется
+        writer = _write_queues.get(key if key is not None else id(memory))
+        if writer is None:
+            if key is None:
+                log_event(
+                    "writeback.unkeyed_memory", level=logging.WARNING,
+                    memory=type(memory).__name__,
+                )
+                writer = _write_queues[id(memory)] = WriteBehindQueue(memory, ":memory:", **options)
+            else:
+                writer = _write_queues[key] = WriteBehindQueue(
+                    memory, journal_path_for(journal_path, key), **options
+                )
+        return writer
@@ -0,0 +1,68 @@
+"""
+Микро-бенчмарк стратегий разбиения на фикстурах из data/.
+
+Запуск: python scripts/bench_chunking.py [--repeat 20] [файлы...]
+"""
+
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mem0_graph.chunking import ParagraphChunker, approx_token_count, get_chunker
+from mem0_graph.loaders import iter_document
+
+STRATEGIES = {
+    "legacy (2000 chars)": lambda: ParagraphChunker(max_chars=2000),
+    "token 256/32": lambda: get_chunker("token", max_tokens=256, overlap_tokens=32),
+    "sentence 256/32": lambda: get_chunker("sentence", max_tokens=256, overlap_tokens=32),
+    "markdown 256/32": lambda: get_chunker("markdown", max_tokens=256, overlap_tokens=32),
+}
+
+
+def bench_file(path, repeat):
+    segments = list(iter_document(path))
+    size_mb = sum(len(s.encode("utf-8")) for s in segments) / 1e6
+    print(f"\n{os.path.basename(path)}: {len(segments)} сегментов, {size_mb:.3f} MB текста")
+    print(f"{'стратегия':<22}{'чанков':>8}{'ток. ср':>9}{'ток. max':>10}{'MB/s':>10}")
+
+    for name, factory in STRATEGIES.items():
+        chunker = factory()
+        chunks = list(chunker.chunks(segments))
+        tokens = [approx_token_count(c) for c in chunks] or [0]
+
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in chunker.chunks(segments):
+                pass
+            timings.append(time.perf_counter() - started)
+        best = min(timings) or 1e-9
+
+        print(
+            f"{name:<22}{len(chunks):>8}{statistics.mean(tokens):>9.0f}"
+            f"{max(tokens):>10}{size_mb / best:>10.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    files = args.files or sorted(glob.glob(os.path.join(root, "data", "*")))
+    for path in files:
+        try:
+            bench_file(path, args.repeat)
+        except Exception as e:
+            print(f"\n{os.path.basename(path)}: пропущен ({e})")
+
+
+if __name__ == "__main__":
+    main()
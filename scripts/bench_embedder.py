@@ -0,0 +1,98 @@
+"""
+Пропускная способность эмбеддеров на CPU: штатный путь Mem0 (поштучный
+`SentenceTransformer.encode` из каждого потока) против `LocalEmbedder`
+(mem0_graph/embedder.py) с микро-пакетами — для бэкендов torch и ONNX/int8,
+с холодным и прогретым кешем векторов.
+
+Тексты — синтетические короткие факты, как те, что Mem0 извлекает из диалога;
+`--threads` потоков одновременно запрашивают по одному тексту, как параллельные
+поиски и загрузка документов. Дополнительно печатается косинус между векторами
+штатной модели и каждого бэкенда (int8 немного расходится с float32).
+
+Запуск: python scripts/bench_embedder.py [--texts 2000] [--threads 8] [--backends torch onnx-int8]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from mem0_graph.config import EMBEDDER
+from mem0_graph.embedder import LocalEmbedder, SentenceTransformerBackend
+
+SUBJECTS = ["Анна", "Борис", "пользователь", "коллега", "брат", "менеджер", "клиент"]
+VERBS = ["любит", "работает в", "живёт в", "изучает", "планирует поездку в", "читает про"]
+OBJECTS = ["Берлин", "шахматы", "машинное обучение", "отдел продаж", "горные лыжи", "джаз", "Python"]
+
+
+def make_texts(n, seed=7):
+    rng = random.Random(seed)
+    return [
+        f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)} "
+        f"с {rng.randint(1990, 2030)} года"
+        for _ in range(n)
+    ]
+
+
+def throughput(embed, texts, threads):
+    """Текстов в секунду при `threads` параллельных запросах по одному тексту."""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        vectors = list(pool.map(embed, texts))
+    return len(texts) / (time.perf_counter() - started), vectors
+
+
+def cosine(a, b):
+    a, b = np.asarray(a), np.asarray(b)
+    return float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx-int8"])
+    parser.add_argument("--max-batch", type=int, default=EMBEDDER["max_batch"])
+    parser.add_argument("--max-wait-ms", type=float, default=EMBEDDER["max_wait_ms"])
+    args = parser.parse_args()
+
+    texts = make_texts(args.texts)
+    stock = SentenceTransformerBackend(EMBEDDER["model"], "torch").model
+    stock.encode(texts[:8])  # прогрев
+
+    rate, reference = throughput(
+        lambda text: stock.encode(text, convert_to_numpy=True).tolist(), texts, args.threads
+    )
+    print(f"{'эмбеддер':<28} {'текстов/с':>10} {'пакетов':>8} {'косинус':>8}")
+    print(f"{'Mem0 (поштучно, torch)':<28} {rate:10.1f} {len(texts):>8} {1.0:8.4f}")
+
+    for backend_name in args.backends:
+        backend = SentenceTransformerBackend(EMBEDDER["model"], backend_name, instance=stock)
+        with tempfile.TemporaryDirectory() as tmp:
+            embedder = LocalEmbedder(
+                backend,
+                cache_path=os.path.join(tmp, "embeddings"),
+                max_batch=args.max_batch,
+                max_wait_ms=args.max_wait_ms,
+            )
+            try:
+                for phase in ("холодный кеш", "прогретый кеш"):
+                    batches = embedder.batcher.batches
+                    rate, vectors = throughput(embedder.embed, texts, args.threads)
+                    similarity = min(cosine(a, b) for a, b in zip(reference, vectors))
+                    title = f"{backend.backend}, {phase}"
+                    print(f"{title:<28} {rate:10.1f} {embedder.batcher.batches - batches:>8} "
+                          f"{similarity:8.4f}")
+            finally:
+                embedder.close()
+
+
+if __name__ == "__main__":
+    main()
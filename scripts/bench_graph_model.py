@@ -0,0 +1,127 @@
+"""
+Бенчмарк компактной модели графа (mem0_graph/graph_model.py) против прежнего
+представления: словарь записей `record.data()` + построение PyVis через
+`add_node`/`add_edge` с замыканиями на каждую запись.
+
+Для 1k / 10k / 100k связей печатаются время построения модели и сети PyVis
+и память, которую занимает граф (tracemalloc). Прежнее построение PyVis
+квадратично по числу связей, поэтому выше `--legacy-max` оно пропускается.
+
+Запуск: python scripts/bench_graph_model.py [--sizes 1000 10000 100000] [--legacy-max 10000]
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyvis.network import Network
+
+from mem0_graph.graph_model import CompactGraph, node_color, node_label
+
+RELATIONS = ["works_at", "knows", "lives_in", "likes", "manages", "member_of"]
+KINDS = [["__Entity__", "person"], ["__Entity__", "organization"], ["__Entity__", "location"]]
+
+
+def make_records(n_edges, rng):
+    """Записи в формате GRAPH_RETURN, как после `record.data()`."""
+    n_nodes = max(2, n_edges // 3)
+    kinds = [rng.choice(KINDS) for _ in range(n_nodes)]
+    records = []
+    for i in range(n_edges):
+        s, t = rng.randrange(n_nodes), rng.randrange(n_nodes)
+        records.append(
+            {
+                "source": f"4:db:{s}",
+                "target": f"4:db:{t}",
+                "rel_id": f"5:db:{i}",
+                "relation": rng.choice(RELATIONS),
+                "n_labels": list(kinds[s]),
+                "m_labels": list(kinds[t]),
+                "n_memory": None,
+                "m_memory": None,
+                "n_value": None,
+                "m_value": None,
+                "n_name": f"entity_{s}",
+                "m_name": f"entity_{t}",
+                "n_text": None,
+                "m_text": None,
+                "n_id": None,
+                "m_id": None,
+                "created": 1700000000000 + i,
+            }
+        )
+    return records
+
+
+def legacy_snapshot(records):
+    """Прежний снимок: (source, relation, target) -> копия записи."""
+    return {(r["source"], r["relation"], r["target"]): dict(r) for r in records}
+
+
+def legacy_pyvis(records):
+    """Прежний build_pyvis_graph: add_node/add_edge и вызовы подписи/цвета на каждую запись."""
+    net = Network()
+    nodes = {}
+    for record in records:
+        src, tgt = str(record["source"]), str(record["target"])
+        rel = record["relation"] or "related"
+        src_label, tgt_label = node_label(record, "n"), node_label(record, "m")
+        if src not in nodes:
+            net.add_node(src, label=str(src_label)[:35], title=f"{src_label}\nТип: {record['n_labels']}",
+                         color=node_color(record["n_labels"]), size=20)
+            nodes[src] = True
+        if tgt not in nodes:
+            net.add_node(tgt, label=str(tgt_label)[:35], title=f"{tgt_label}\nТип: {record['m_labels']}",
+                         color=node_color(record["m_labels"]), size=20)
+            nodes[tgt] = True
+        net.add_edge(src, tgt, label=rel, title=rel, color="#64748b")
+    return net
+
+
+def measure(build, *args):
+    """`(результат, секунды, байт удерживается после построения)`."""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build(*args)
+    elapsed = time.perf_counter() - started
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--legacy-max", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'связей':>8} {'модель':>10} {'время, мс':>10} {'память, МБ':>11} {'PyVis, мс':>10}")
+    for size in args.sizes:
+        records = make_records(size, random.Random(args.seed))
+
+        snapshot, legacy_ms, legacy_mem = measure(legacy_snapshot, records)
+        if size <= args.legacy_max:
+            _, legacy_net, _ = measure(legacy_pyvis, records)
+            legacy_net = f"{legacy_net * 1000:10.1f}"
+        else:
+            legacy_net = f"{'пропущено':>10}"
+        del snapshot
+
+        graph, compact_ms, compact_mem = measure(CompactGraph.from_records, records)
+        _, compact_net, _ = measure(graph.to_pyvis, Network())
+
+        print(f"{size:>8} {'словари':>10} {legacy_ms * 1000:10.1f} {legacy_mem / 2**20:11.2f} {legacy_net}")
+        print(f"{size:>8} {'compact':>10} {compact_ms * 1000:10.1f} {compact_mem / 2**20:11.2f} "
+              f"{compact_net * 1000:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Сравнение контекста промпта: только векторный поиск Mem0 против поиска,
+расширенного фактами из окрестности найденных сущностей в Neo4j
+(mem0_graph/graph_retrieval.py).
+
+Для каждого вопроса замеряются задержка поиска, сборки контекста и расширения
+через граф, число фактов и токенов. Если для вопроса задан ожидаемый ответ
+(`expect`), проверяется, попал ли он в контекст: многошаговые вопросы
+(«в какой стране работает Алиса?») должны находиться без вызовов LLM.
+Нужны запущенный Neo4j и заполненная память пользователя.
+
+Вопросы — аргументами или файлом JSONL со строками {"question": ..., "expect": ...}.
+
+Запуск: python scripts/bench_graph_retrieval.py [--user user_1] [--questions q.jsonl] [--repeat 5] [вопрос ...]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mem0_graph.agent import Mem0Agent
+from mem0_graph.neo4j_pool import close_pools
+
+DEFAULT_QUESTIONS = [
+    {"question": "Где я работаю?", "expect": None},
+    {"question": "В какой стране находится компания, где я работаю?", "expect": None},
+]
+
+
+def load_questions(args):
+    questions = [{"question": q, "expect": None} for q in args.question]
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as f:
+            questions += [json.loads(line) for line in f if line.strip()]
+    return questions or DEFAULT_QUESTIONS
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def run(agent, question):
+    """Один замер: `(мс поиска, мс контекста без графа, мс расширения, контексты, статистика графа)`."""
+    agent.search_cache.invalidate(agent.user_id)
+
+    started = time.perf_counter()
+    results = agent._retrieve(question)
+    search_ms = (time.perf_counter() - started) * 1000
+
+    agent.graph_expansion = False
+    started = time.perf_counter()
+    plain, _ = agent._build_context(results, results.relations)
+    plain_ms = (time.perf_counter() - started) * 1000
+
+    agent.graph_expansion = True
+    augmented, stats = agent._build_context(
+        results, results.relations, agent.analytics.analyze(agent.user_id)
+    )
+    graph = stats.get("graph") or {"seconds": 0.0, "facts": 0, "tokens": 0}
+    return search_ms, plain_ms, graph["seconds"] * 1000, plain, augmented, graph
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("question", nargs="*")
+    parser.add_argument("--user", default="user_1")
+    parser.add_argument("--questions", help="JSONL с полями question и expect")
+    parser.add_argument("--repeat", type=int, default=3, help="повторов на вопрос для задержки")
+    parser.add_argument("--show", action="store_true", help="печатать контексты")
+    args = parser.parse_args()
+
+    agent = Mem0Agent(user_id=args.user)
+    questions = load_questions(args)
+    search_times, plain_times, graph_times = [], [], []
+    hits = {"plain": 0, "graph": 0}
+    expected = 0
+
+    try:
+        for item in questions:
+            for _ in range(args.repeat):
+                search_ms, plain_ms, graph_ms, plain, augmented, graph = run(agent, item["question"])
+                search_times.append(search_ms)
+                plain_times.append(plain_ms)
+                graph_times.append(graph_ms)
+
+            line = (f"{item['question'][:50]:<50} поиск {search_ms:7.1f} мс, "
+                    f"граф +{graph_ms:6.1f} мс, фактов {graph['facts']:>3} ({graph['tokens']} ток.)")
+            if item.get("expect"):
+                expected += 1
+                found = {
+                    "plain": item["expect"].lower() in plain.lower(),
+                    "graph": item["expect"].lower() in augmented.lower(),
+                }
+                for key, ok in found.items():
+                    hits[key] += ok
+                line += f"  ответ: вектор {'да' if found['plain'] else 'нет'}, " \
+                        f"граф {'да' if found['graph'] else 'нет'}"
+            print(line)
+            if args.show:
+                print(f"--- только вектор ---\n{plain}\n--- с графом ---\n{augmented}\n")
+    finally:
+        agent.writer.close()
+        close_pools()
+
+    print(f"\nЗадержка, мс        {'p50':>8} {'p95':>8}")
+    for title, values in (
+        ("поиск Mem0", search_times),
+        ("контекст", plain_times),
+        ("расширение графом", graph_times),
+    ):
+        print(f"{title:<19} {percentile(values, 0.5):8.1f} {percentile(values, 0.95):8.1f}")
+    total = [s + p + g for s, p, g in zip(search_times, plain_times, graph_times)]
+    print(f"{'итого с графом':<19} {statistics.median(total):8.1f} {percentile(total, 0.95):8.1f}")
+    if expected:
+        print(f"\nОтвет в контексте: вектор {hits['plain']}/{expected}, с графом {hits['graph']}/{expected}")
+
+
+if __name__ == "__main__":
+    main()
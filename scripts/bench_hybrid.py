@@ -0,0 +1,126 @@
+"""
+Бенчмарк гибридного поиска (BM25 + вектор, RRF) на синтетическом корпусе.
+
+Векторный поиск заменён локальной заглушкой: хешированные эмбеддинги слов без
+цифр, как у эмбеддера, который плохо различает номера и идентификаторы.
+Скрипт печатает recall@k для вектора, BM25 и гибрида и задержку BM25+RRF.
+
+Запуск: python scripts/bench_hybrid.py [--docs 5000] [--queries 500] [--k 10]
+"""
+
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mem0_graph.hybrid import HybridRetriever, tokenize
+
+FIRST = ["Анна", "Борис", "Вера", "Глеб", "Дарья", "Егор", "Жанна", "Иван", "Кира", "Лев"]
+LAST = ["Иванов", "Петров", "Сидоров", "Кузнецов", "Смирнов", "Попов", "Волков", "Зайцев"]
+DEPTS = ["продаж", "логистики", "маркетинга", "разработки", "поддержки", "финансов"]
+HOBBIES = ["шахматы", "бег", "фотографию", "горные лыжи", "джаз", "садоводство", "кино"]
+DIMS = 64
+
+
+def embed(text):
+    """Заглушка эмбеддера: слова без цифр, хешированные в DIMS измерений."""
+    vector = [0.0] * DIMS
+    for token in tokenize(text):
+        if any(ch.isdigit() for ch in token):
+            continue
+        h = zlib.crc32(token.encode("utf-8"))
+        vector[h % DIMS] += 1.0 if (h >> 8) & 1 else -1.0
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def make_corpus(n_docs, rng):
+    docs = []
+    for i in range(n_docs):
+        text = (
+            f"{rng.choice(FIRST)} {rng.choice(LAST)} работает в отделе {rng.choice(DEPTS)}, "
+            f"номер договора DG-{10000 + i}, увлекается: {rng.choice(HOBBIES)}."
+        )
+        docs.append({"id": f"m{i}", "memory": text, "metadata": None})
+    return docs
+
+
+def make_queries(docs, n_queries, rng):
+    queries = []
+    for doc in rng.sample(docs, n_queries):
+        number = doc["memory"].split("DG-")[1].split(",")[0]
+        if rng.random() < 0.5:
+            queries.append((f"Кто работает по договору DG-{number}?", doc["id"], "exact"))
+        else:
+            name = " ".join(doc["memory"].split()[:2])
+            hobby = doc["memory"].rsplit(": ", 1)[1].rstrip(".")
+            queries.append((f"Чем увлекается {name}, который любит {hobby}?", doc["id"], "semantic"))
+    return queries
+
+
+def vector_search(doc_vectors, docs, query, k):
+    q = embed(query)
+    scored = sorted(
+        ((sum(a * b for a, b in zip(q, v)), i) for i, v in enumerate(doc_vectors)), reverse=True
+    )[:k]
+    return [{**docs[i], "score": s} for s, i in scored]
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    docs = make_corpus(args.docs, rng)
+    queries = make_queries(docs, min(args.queries, args.docs), rng)
+    doc_vectors = [embed(d["memory"]) for d in docs]
+
+    retriever = HybridRetriever()
+    started = time.perf_counter()
+    retriever.load("bench", docs)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    hits = {"vector": {}, "bm25": {}, "hybrid": {}}
+    latencies = []
+    for query, target, kind in queries:
+        vector = vector_search(doc_vectors, docs, query, args.k * 2)
+
+        started = time.perf_counter()
+        fused = retriever.search("bench", query, vector, top_k=args.k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        keyword = retriever.keyword_search("bench", query, args.k)
+
+        for name, results in (("vector", vector[: args.k]), ("bm25", keyword), ("hybrid", fused)):
+            found = any(r["id"] == target for r in results)
+            hits[name].setdefault(kind, []).append(found)
+
+    print(f"Корпус: {args.docs} воспоминаний, запросов: {len(queries)}, k={args.k}")
+    print(f"Построение BM25-индекса: {build_ms:.1f} мс")
+    print(f"{'метод':<8}{'exact':>10}{'semantic':>10}{'всего':>10}")
+    for name, by_kind in hits.items():
+        all_hits = [h for values in by_kind.values() for h in values]
+        row = [statistics.mean(by_kind.get(kind, [0])) for kind in ("exact", "semantic")]
+        print(f"{name:<8}{row[0]:>10.3f}{row[1]:>10.3f}{statistics.mean(all_hits):>10.3f}")
+    print(
+        f"BM25 + RRF: p50 {percentile(latencies, 0.5):.2f} мс, "
+        f"p95 {percentile(latencies, 0.95):.2f} мс"
+    )
+
+
+if __name__ == "__main__":
+    main()
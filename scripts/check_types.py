@@ -1,14 +1,16 @@
-from neo4j import GraphDatabase
+import os
+import sys
 
-uri = "bolt://localhost:7687"
-user = "neo4j"
-password = "password123"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-driver = GraphDatabase.driver(uri, auth=(user, password))
+from mem0_graph.neo4j_pool import close_pools, get_pool
+
+# параметры подключения — NEO4J в mem0_graph/config.py (переменные NEO4J_*)
+pool = get_pool()
 
 
 def check_labels_type():
-    with driver.session() as session:
+    with pool.session() as session:
         result = session.run("MATCH (n) RETURN labels(n) as labels LIMIT 1")
         for record in result:
             print(f"Type of labels in Record: {type(record['labels'])}")
@@ -25,5 +27,5 @@ if __name__ == "__main__":
     try:
         check_labels_type()
     finally:
-        driver.close()
+        close_pools()
 
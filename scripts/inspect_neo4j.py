@@ -1,14 +1,16 @@
-from neo4j import GraphDatabase
+import os
+import sys
 
-uri = "bolt://localhost:7687"
-user = "neo4j"
-password = "password123"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-driver = GraphDatabase.driver(uri, auth=(user, password))
+from mem0_graph.neo4j_pool import close_pools, get_pool
+
+# параметры подключения — NEO4J в mem0_graph/config.py (переменные NEO4J_*)
+pool = get_pool()
 
 
 def print_graph_structure():
-    with driver.session() as session:
+    with pool.session() as session:
         print("--- Node Labels ---")
         result = session.run("MATCH (n) RETURN DISTINCT labels(n) as labels, count(n) as count")
         for record in result:
@@ -34,5 +36,5 @@ if __name__ == "__main__":
     try:
         print_graph_structure()
     finally:
-        driver.close()
+        close_pools()
 
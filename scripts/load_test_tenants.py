@@ -0,0 +1,237 @@
+"""
+Нагрузочный тест многопользовательского сервиса (mem0_graph/tenants.py):
+тысячи пользователей с настоящими `Mem0Agent` поверх одной локальной
+заглушки Mem0 и заглушки LLM с заданными задержками — без моделей, Chroma,
+Neo4j и сети.
+
+Небольшая доля «тяжёлых» пользователей присылает большую часть запросов
+разом. Печатаются пропускная способность, задержки p50/p95/p99 лёгких и
+тяжёлых пользователей, число отклонённых запросов и агентов в LRU.
+С `--compare` та же нагрузка прогоняется через обычный пул потоков
+(одна общая очередь FIFO): там лёгкие пользователи ждут за очередью тяжёлых.
+
+Журнал записи и индекс чанков создаются во временном каталоге; граф
+(переранжирование и расширение) выключен.
+
+Запуск: python scripts/load_test_tenants.py [--users 2000] [--requests 10000] [--workers 16] [--compare]
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# до импорта mem0_graph: конфиг читает окружение при импорте
+_TMP = tempfile.mkdtemp(prefix="mem0graph-load-")
+os.environ.update(
+    MEM0GRAPH_WRITE_JOURNAL=os.path.join(_TMP, "write_journal.sqlite3"),
+    MEM0GRAPH_INGEST_INDEX=os.path.join(_TMP, "ingest_index.sqlite3"),
+    MEM0GRAPH_GRAPH_RETRIEVAL="0",
+    MEM0GRAPH_GRAPH_RERANK="0",
+)
+
+from mem0_graph.agent import Mem0Agent  # noqa: E402
+from mem0_graph.config import WRITE_BEHIND  # noqa: E402
+from mem0_graph.telemetry import get_telemetry  # noqa: E402
+from mem0_graph.tenants import TenantBusy, TenantService  # noqa: E402
+from mem0_graph.writeback import get_write_queue  # noqa: E402
+
+TOPICS = ["Берлин", "шахматы", "джаз", "Python", "горные лыжи", "отдел продаж", "кофе"]
+
+
+class StandInEmbedder:
+    """Хеш текста вместо модели; задержка — как у прогретой модели на CPU."""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def embed(self, text, memory_action=None):
+        time.sleep(self.delay)
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [b / 255 for b in digest[:16]]
+
+
+class StandInMemory:
+    """Mem0 в памяти процесса: search/get_all/add с задержками хранилища и извлечения фактов."""
+
+    def __init__(self, search_delay, add_delay, embed_delay):
+        self.search_delay = search_delay
+        self.add_delay = add_delay
+        self.embedding_model = StandInEmbedder(embed_delay)
+        self.vector_store = SimpleNamespace(collection=None)
+        self._lock = threading.Lock()
+        self._facts = {}  # user_id -> [item]
+        self._next_id = 0
+
+    def _items(self, user_id):
+        with self._lock:
+            return list(self._facts.get(user_id, ()))
+
+    def search(self, query, user_id):
+        time.sleep(self.search_delay)
+        items = self._items(user_id)[-10:]
+        return {"results": [dict(item, score=0.5) for item in items], "relations": []}
+
+    def get_all(self, user_id, limit=100):
+        return {"results": self._items(user_id)[:limit]}
+
+    def add(self, messages, user_id, metadata=None):
+        time.sleep(self.add_delay)
+        text = " / ".join(m["content"] for m in messages if m["role"] == "user")
+        with self._lock:
+            self._next_id += 1
+            item = {"id": f"m{self._next_id}", "memory": text, "user_id": user_id}
+            self._facts.setdefault(user_id, []).append(item)
+        return {"results": [dict(item, event="ADD")]}
+
+
+class StandInLLM:
+    """Клиент с интерфейсом `client.chat.completions.create`, отвечающий через `delay` секунд."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, **options):
+        time.sleep(self.delay)
+        message = SimpleNamespace(content=f"Ответ на: {messages[-1]['content'][:40]}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def make_workload(args, rng):
+    """Пользователи запросов в порядке поступления: тяжёлые присылают свою долю пачками."""
+    users = [f"user_{i}" for i in range(args.users)]
+    heavy = users[: max(1, int(args.users * args.heavy))]
+    light = users[len(heavy):] or heavy
+    heavy_requests = int(args.requests * args.heavy_share)
+    burst = [rng.choice(heavy) for _ in range(heavy_requests)]
+    rest = [rng.choice(light) for _ in range(args.requests - heavy_requests)]
+    # пачка тяжёлых приходит первой, лёгкие — вперемешку с её хвостом
+    split = len(burst) // 2
+    tail = burst[split:] + rest
+    rng.shuffle(tail)
+    return burst[:split] + tail, set(heavy)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def report(title, latencies, heavy, rejected, seconds):
+    done = sum(len(v) for v in latencies.values())
+    print(f"\n{title}: {done} запросов за {seconds:.1f} с ({done / seconds:.0f} в секунду), "
+          f"отклонено {rejected}")
+    print(f"{'пользователи':<14} {'запросов':>8} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9}")
+    for group, is_heavy in (("лёгкие", False), ("тяжёлые", True)):
+        values = [ms for user, v in latencies.items() if (user in heavy) == is_heavy for ms in v]
+        print(f"{group:<14} {len(values):>8} {percentile(values, 0.5):9.1f} "
+              f"{percentile(values, 0.95):9.1f} {percentile(values, 0.99):9.1f}")
+
+
+def run(submit, workload, rate):
+    """Отправить запросы (`rate` в секунду, 0 — разом) и собрать задержки по пользователям."""
+    latencies = {}
+    lock = threading.Lock()
+    futures = []
+    rejected = 0
+    started = time.perf_counter()
+
+    for n, user_id in enumerate(workload):
+        if rate:
+            delay = started + n / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        sent = time.perf_counter()
+        try:
+            future = submit(user_id, f"Что я говорил про {TOPICS[n % len(TOPICS)]}? #{n}")
+        except TenantBusy:
+            rejected += 1
+            continue
+
+        def done(future, user_id=user_id, sent=sent):
+            ms = (time.perf_counter() - sent) * 1000
+            with lock:
+                latencies.setdefault(user_id, []).append(ms)
+
+        future.add_done_callback(done)
+        futures.append(future)
+
+    wait(futures)
+    return latencies, rejected, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--heavy", type=float, default=0.01, help="доля тяжёлых пользователей")
+    parser.add_argument("--heavy-share", type=float, default=0.5, help="их доля запросов")
+    parser.add_argument("--rate", type=float, default=0, help="запросов в секунду (0 — разом)")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--per-tenant", type=int, default=2)
+    parser.add_argument("--max-queued", type=int, default=64)
+    parser.add_argument("--max-agents", type=int, default=1000)
+    parser.add_argument("--search-ms", type=float, default=5.0)
+    parser.add_argument("--embed-ms", type=float, default=2.0)
+    parser.add_argument("--llm-ms", type=float, default=20.0)
+    parser.add_argument("--add-ms", type=float, default=10.0)
+    parser.add_argument("--compare", action="store_true", help="прогнать и через общий FIFO-пул")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    memory = StandInMemory(args.search_ms / 1000, args.add_ms / 1000, args.embed_ms / 1000)
+    llm = StandInLLM(args.llm_ms / 1000)
+    workload, heavy = make_workload(args, random.Random(args.seed))
+
+    # все агенты делят одну память и один клиент, как get_memory()/get_chat_client()
+    service = TenantService(
+        agent_factory=lambda user_id: Mem0Agent(user_id=user_id, memory=memory, client=llm),
+        max_agents=args.max_agents,
+        workers=args.workers,
+        per_tenant=args.per_tenant,
+        max_queued=args.max_queued,
+    )
+    try:
+        latencies, rejected, seconds = run(
+            lambda user_id, message: service.submit(user_id, "chat", message), workload, args.rate
+        )
+        report("Справедливая очередь", latencies, heavy, rejected, seconds)
+        stats = service.stats()
+        print(f"агентов в LRU {stats['agents']}, создано {stats['created']}, "
+              f"вытеснено {stats['evicted']}; ожидание в очереди: среднее "
+              f"{stats['avg_wait'] * 1000:.1f} мс, максимум {stats['max_wait'] * 1000:.1f} мс")
+
+        if args.compare:
+            with ThreadPoolExecutor(max_workers=args.workers) as pool:
+                latencies, rejected, seconds = run(
+                    lambda user_id, message: pool.submit(service.agent(user_id).chat, message),
+                    workload,
+                    args.rate,
+                )
+            report("Общий FIFO-пул", latencies, heavy, rejected, seconds)
+    finally:
+        service.close()
+        writer = get_write_queue(memory, **WRITE_BEHIND)
+        writer.flush(timeout=30)
+        writer.close()
+
+    print(f"\n{'этап':<20} {'вызовов':>8} {'p50, мс':>9} {'p95, мс':>9}")
+    for stage, stat in get_telemetry().summary().items():
+        print(f"{stage:<20} {stat['calls']:>8} {stat['p50']:9.1f} {stat['p95']:9.1f}")
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"\nпик памяти процесса {peak:.0f} МБ, временный каталог {_TMP}")
+
+
+if __name__ == "__main__":
+    main()
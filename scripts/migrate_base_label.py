@@ -0,0 +1,54 @@
+"""
+Однократная миграция графа под base_label: узлам с user_id, записанным
+Mem0 до включения `base_label` в MEM0_CONFIG, добавляется метка `__Entity__`.
+
+Без неё индексные запросы графа (Neo4jGraphViz, GraphAnalytics) не видят
+старых узлов. Проход по всем узлам идёт пачками в отдельных транзакциях;
+по окончании в граф пишется узел-отметка `__Mem0GraphMigration__`, и
+повторный запуск ничего не делает (`--force` — выполнить заново).
+
+Запуск: python scripts/migrate_base_label.py [--batch-size 10000] [--force]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mem0_graph.config import GRAPH_QUERY
+from mem0_graph.graph_viz import MIGRATION_LABEL, Neo4jGraphViz
+from mem0_graph.neo4j_pool import close_pools
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--force", action="store_true", help="выполнить, даже если отметка уже есть")
+    args = parser.parse_args()
+
+    viz = Neo4jGraphViz(**GRAPH_QUERY)
+    try:
+        if args.force:
+            with viz.pool.session() as session:
+                session.run(
+                    f"MATCH (m:{MIGRATION_LABEL} {{name: $name}}) DELETE m",
+                    name=f"base_label:{viz.node_label}",
+                ).consume()
+        viz.ensure_schema(force=True)
+
+        started = time.perf_counter()
+        labelled = viz.migrate_base_label(batch_size=args.batch_size)
+        elapsed = time.perf_counter() - started
+        if labelled is None:
+            print("Миграция уже выполнена (есть отметка в графе); --force — выполнить заново")
+        else:
+            print(f"Метка {viz.node_label} добавлена {labelled} узлам за {elapsed:.1f} с")
+    finally:
+        viz.close()
+        close_pools()
+
+
+if __name__ == "__main__":
+    main()
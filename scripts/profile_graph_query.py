@@ -0,0 +1,100 @@
+"""
+Профилирование запроса графа: старый OR/IS NULL-запрос против индексного
+постраничного (Neo4jGraphViz.iter_graph_pages).
+
+Для каждого запроса выполняется PROFILE и печатаются операторы плана,
+db hits, число строк и время. Индексный план должен начинаться с
+NodeIndexSeek, а не с AllNodesScan / NodeByLabelScan.
+
+Запуск: python scripts/profile_graph_query.py [--user user_1] [--page-size 1000] [--no-schema]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mem0_graph.config import GRAPH_QUERY
+from mem0_graph.graph_viz import GRAPH_RETURN, Neo4jGraphViz
+from mem0_graph.neo4j_pool import close_pools
+
+LEGACY_QUERY = """
+        MATCH (n)-[r]->(m)
+        WHERE (n.user_id = $user_id OR m.user_id = $user_id OR
+               n.user_id IS NULL OR m.user_id IS NULL)
+          AND ($since IS NULL OR r.created > $since)
+        """ + GRAPH_RETURN + """
+        LIMIT 1000
+        """
+
+SCAN_OPERATORS = ("AllNodesScan", "NodeByLabelScan", "AllRelationshipsScan")
+
+
+def walk(plan, depth=0):
+    """Операторы плана сверху вниз: (глубина, оператор, db hits, строки)."""
+    yield depth, plan["operatorType"], plan.get("dbHits", 0), plan.get("rows", 0)
+    for child in plan.get("children", []):
+        yield from walk(child, depth + 1)
+
+
+def profile(session, title, query, **params):
+    started = time.perf_counter()
+    result = session.run("PROFILE " + query, **params)
+    rows = len(list(result))
+    summary = result.consume()
+    elapsed = (time.perf_counter() - started) * 1000
+
+    operators = list(walk(summary.profile))
+    print(f"\n=== {title}: {rows} строк, {elapsed:.1f} мс, "
+          f"db hits {sum(op[2] for op in operators)} ===")
+    for depth, operator, hits, op_rows in operators:
+        print(f"{'  ' * depth}{operator:<40} db hits {hits:>10}  rows {op_rows:>8}")
+    return [op[1] for op in operators]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--user", default="user_1")
+    parser.add_argument("--page-size", type=int, default=GRAPH_QUERY["page_size"])
+    parser.add_argument("--no-schema", action="store_true", help="не создавать индексы перед замером")
+    args = parser.parse_args()
+
+    viz = Neo4jGraphViz(**GRAPH_QUERY)
+    try:
+        if not args.no_schema:
+            viz.ensure_schema()
+
+        with viz.pool.session() as session:
+            profile(session, "OR/IS NULL (старый)", LEGACY_QUERY, user_id=args.user, since=None)
+            operators = profile(
+                session,
+                "Индексный, первая страница",
+                viz.page_query,
+                user_id=args.user,
+                since=None,
+                after="",
+                page_size=args.page_size,
+            )
+
+        if not any("IndexSeek" in op for op in operators):
+            print("\nВНИМАНИЕ: индекс по user_id не используется — проверьте ensure_schema()")
+        scans = [op for op in operators if op.startswith(SCAN_OPERATORS)]
+        if scans:
+            print(f"ВНИМАНИЕ: в плане есть полные сканы: {', '.join(scans)}")
+
+        started = time.perf_counter()
+        pages = edges = 0
+        for page in viz.iter_graph_pages(args.user, page_size=args.page_size):
+            pages += 1
+            edges += len(page)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"\nВсе страницы: {edges} связей, {pages} страниц по {args.page_size}, {elapsed:.1f} мс")
+    finally:
+        viz.close()
+        close_pools()
+
+
+if __name__ == "__main__":
+    main()
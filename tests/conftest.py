@@ -0,0 +1,41 @@
+import itertools
+
+import pytest
+
+_users = itertools.count()
+
+
+@pytest.fixture
+def make_agent(tmp_path, monkeypatch):
+    """Фабрика агентов поверх заглушек: журнал и индекс во временном каталоге, граф выключен.
+
+    Кеш поиска и BM25 общие для процесса, поэтому по умолчанию у каждого
+    агента новый user_id.
+    """
+    from mem0_graph import agent as agent_module
+
+    monkeypatch.setattr(agent_module, "INGEST_INDEX_PATH", str(tmp_path / "index.sqlite3"))
+    monkeypatch.setattr(
+        agent_module, "WRITE_BEHIND",
+        {"journal_path": str(tmp_path / "journal.sqlite3"), "workers": 1, "backoff": 0},
+    )
+    monkeypatch.setattr(agent_module, "GRAPH_RERANK_WEIGHT", 0)
+    agents = []
+
+    def make(memory, client=None, user_id=None, async_client=None):
+        """`Mem0Agent`, а с `async_client` — `AsyncMem0Agent` поверх такого же агента."""
+        user_id = user_id or f"test-user-{next(_users)}"
+        if async_client is not None:
+            from mem0_graph.async_agent import AsyncMem0Agent
+
+            wrapper = AsyncMem0Agent(user_id, memory, client or object(), async_client)
+            agent = wrapper._agent
+        else:
+            wrapper = agent = agent_module.Mem0Agent(user_id, memory, client or object())
+        agent.graph_expansion = False
+        agents.append(agent)
+        return wrapper
+
+    yield make
+    for writer in {id(a.writer): a.writer for a in agents}.values():
+        writer.close(timeout=5)
@@ -0,0 +1,182 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("networkx")
+
+from mem0_graph.analytics import GraphAnalysis, GraphAnalytics, entity_key, rerank
+from mem0_graph.watermark import get_watermarks
+
+
+class Record(dict):
+    def data(self):
+        return dict(self)
+
+
+def edge(rel_id, source, target, created=1):
+    return Record(
+        rel_id=rel_id, source=source, target=target, n_name=source, m_name=target,
+        relation="knows", created=created,
+    )
+
+
+def star(prefix, size, created=1):
+    return [edge(f"{prefix}{i}", f"{prefix}_hub", f"{prefix}_{i}", created) for i in range(size)]
+
+
+class FakePool:
+    """Отвечает на запрос проекции записями новее `since`, на запрос сирот — списком."""
+
+    def __init__(self, edges, orphans=()):
+        self.edges = edges
+        self.orphans = [Record(id=o, name=o) for o in orphans]
+        self.queries = 0
+
+    def read(self, query, **params):
+        self.queries += 1
+        if "NOT (n)--()" in query:
+            return self.orphans
+        since = params["since"]
+        rows = [e for e in self.edges if since is None or e["created"] > since]
+        rows = sorted((e for e in rows if e["rel_id"] > params["after"]), key=lambda e: e["rel_id"])
+        return rows[: params["page_size"]]
+
+
+def test_hub_has_highest_pagerank_and_components_are_separate():
+    analysis = GraphAnalysis("u")
+    for record in star("a", 6) + star("b", 3):
+        analysis.add_record(record)
+    analysis.refresh()
+
+    hub = analysis.hubs(1)[0]
+    assert hub["name"] == "a_hub" and hub["degree"] == 6
+    assert sum(analysis.node(i)["pagerank"] for i in range(analysis.node_count)) == pytest.approx(1.0)
+    assert analysis.stats()["components"] == 2
+    assert analysis.get("a_1")["community"] != analysis.get("b_1")["community"]
+
+
+def test_only_touched_component_is_recomputed():
+    analysis = GraphAnalysis("u")
+    for record in star("a", 6) + star("b", 3):
+        analysis.add_record(record)
+    assert analysis.refresh() == 2
+    b_rank = analysis.pagerank[analysis._node_index["b_hub"]]
+
+    analysis.add_record(edge("a9", "a_1", "a_new"))
+    assert analysis.refresh() == 1
+    assert analysis.pagerank[analysis._node_index["b_hub"]] == b_rank
+    assert analysis.get("a_new") is not None
+
+
+def test_analyze_fetches_only_after_writes():
+    edges = star("a", 4) + star("b", 3)
+    pool = FakePool(edges, orphans=["lonely"])
+    analytics = GraphAnalytics(pool=pool, page_size=2)
+    user = "analytics-user"
+
+    analysis = analytics.analyze(user)
+    assert analysis.stats()["edges"] == 7
+    assert analysis.orphans == [{"id": "lonely", "name": "lonely"}]
+    queries = pool.queries
+    assert analytics.analyze(user) is analysis and pool.queries == queries
+
+    edges.append(edge("c1", "a_hub", "lonely", created=2))
+    get_watermarks().bump(user)
+    analysis = analytics.analyze(user)
+    assert analysis.recomputed == 1
+    assert analysis.orphans == []
+    assert analysis.get("lonely")["degree"] == 1
+
+
+def test_rerank_lifts_memories_about_central_entities():
+    results = [
+        {"memory": "Likes green tea"},
+        {"memory": "Works with John Doe at Acme"},
+        {"memory": "Visited Paris"},
+    ]
+    scores = {entity_key("john_doe"): 1.0, entity_key("paris"): 0.1}
+
+    ranked = rerank(results, scores, weight=0.5)
+
+    assert [r["memory"] for r in ranked] == [
+        "Works with John Doe at Acme", "Likes green tea", "Visited Paris",
+    ]
+    assert rerank(results, {}, weight=0.5) == results
+
+
+def test_full_graph_is_reloaded_and_marked_truncated(caplog):
+    edges = star("a", 4)
+    pool = FakePool(edges)
+    analytics = GraphAnalytics(pool=pool, max_edges=4)
+    user = "analytics-full"
+
+    with caplog.at_level("WARNING", logger="mem0_graph"):
+        stats = analytics.analyze(user).stats()
+    assert stats["edges"] == 4 and stats["truncated"]
+    assert "graph.analytics.truncated" in caplog.text
+    assert list(analytics._records(user, limit=0)) == []
+
+    # упёршийся в предел граф не догружается, а перечитывается вместе с сиротами
+    pool.orphans.append(Record(id="lonely", name="lonely"))
+    get_watermarks().bump(user)
+    assert analytics.analyze(user).stats()["orphans"] == 1
+
+
+def test_latest_returns_stale_analysis_while_refreshing():
+    started, release = threading.Event(), threading.Event()
+    pool = FakePool(star("a", 3, created=1))
+    analytics = GraphAnalytics(pool=pool, refresh_delay=0)
+    user = "analytics-latest"
+
+    # первого результата ещё нет: запрос не ждёт, пересчёт уходит в фон
+    assert analytics.latest(user) is None
+    deadline = time.monotonic() + 5
+    while analytics.latest(user) is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    analysis = analytics.latest(user)
+    assert analysis.stats()["edges"] == 3
+
+    read = pool.read
+
+    def slow_read(query, **params):
+        started.set()
+        release.wait(5)
+        return read(query, **params)
+
+    pool.read = slow_read
+    pool.edges.append(edge("a9", "a_hub", "a_9", created=2))
+    get_watermarks().bump(user)
+    try:
+        # пока фон читает Neo4j, запросы получают прежний результат нетронутым
+        assert analytics.latest(user) is analysis
+        assert started.wait(5)
+        assert analytics.latest(user) is analysis and analysis.edge_count == 3
+    finally:
+        release.set()
+    deadline = time.monotonic() + 5
+    while analytics.latest(user) is analysis and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert analytics.latest(user).stats()["edges"] == 4
+
+
+def test_slow_user_does_not_block_others():
+    started, release = threading.Event(), threading.Event()
+
+    class SlowPool(FakePool):
+        def read(self, query, **params):
+            if params.get("user_id") == "slow":
+                started.set()
+                release.wait(5)
+            return super().read(query, **params)
+
+    analytics = GraphAnalytics(pool=SlowPool(star("a", 3)))
+    slow = threading.Thread(target=analytics.analyze, args=("slow",))
+    slow.start()
+    try:
+        assert started.wait(5)
+        # пока граф "slow" читается, граф другого пользователя считается без ожидания
+        assert analytics.analyze("fast").stats()["edges"] == 3
+    finally:
+        release.set()
+        slow.join(5)
@@ -0,0 +1,143 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from mem0_graph import agent as agent_module
+
+
+class FakeMemory:
+    """Mem0 без хранилищ; `barrier` проверяет, что ветки поиска идут одновременно."""
+
+    def __init__(self, barrier=None):
+        self.embedding_model = SimpleNamespace(embed=lambda text, action=None: [1.0, float(len(text))])
+        self.vector_store = SimpleNamespace(collection=None)
+        self.barrier = barrier
+        self.added = []
+
+    def _wait(self):
+        if self.barrier is not None:
+            self.barrier.wait()
+
+    def search(self, query, user_id):
+        self._wait()
+        return {"results": [{"id": "m1", "memory": "Любит зелёный чай"}]}
+
+    def get_all(self, user_id, limit=100):
+        self._wait()
+        return {"results": [{"id": "m2", "memory": "Работает в Берлине"}]}
+
+    def add(self, messages, user_id=None, metadata=None):
+        self.added.append([m["content"] for m in messages])
+        return {"results": []}
+
+
+def chunk(content=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class FakeAsyncClient:
+    """`client.chat.completions.create` AsyncOpenAI: ответ целиком или поток фрагментов."""
+
+    def __init__(self, deltas):
+        self.deltas = deltas
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, messages, stream=False, **options):
+        self.requests.append(messages)
+        if not stream:
+            message = SimpleNamespace(content="".join(self.deltas))
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+        async def fragments():
+            for delta in self.deltas:
+                await asyncio.sleep(0)
+                yield chunk(delta)
+            yield chunk(usage=SimpleNamespace(prompt_tokens=10, completion_tokens=2))
+
+        return fragments()
+
+
+def test_chat_answers_with_context_and_schedules_write(make_agent):
+    memory = FakeMemory()
+    client = FakeAsyncClient(["Зелёный ", "чай."])
+    agent = make_agent(memory, async_client=client)
+
+    async def scenario():
+        reply = await agent.chat("Что я пью?")
+        assert await agent.flush(timeout=5)
+        return reply
+
+    reply = asyncio.run(scenario())
+
+    assert reply == "Зелёный чай."
+    assert reply.context_stats["items"] >= 1
+    assert "Любит зелёный чай" in client.requests[0][0]["content"]
+    assert memory.added == [["Что я пью?", "Зелёный чай."]]
+
+
+def test_chat_stream_yields_deltas_then_schedules_write(make_agent):
+    memory = FakeMemory()
+    agent = make_agent(memory, async_client=FakeAsyncClient(["Зелёный ", "чай", "."]))
+
+    async def scenario():
+        stream = agent.chat_stream("Что я пью?")
+        deltas = [delta async for delta in stream]
+        assert await agent.flush(timeout=5)
+        return stream, deltas
+
+    stream, deltas = asyncio.run(scenario())
+
+    assert deltas == ["Зелёный ", "чай", "."]
+    assert stream.context_stats["items"] >= 1
+    assert memory.added == [["Что я пью?", "Зелёный чай."]]
+
+
+def test_retrieval_branches_run_concurrently(make_agent, monkeypatch):
+    # векторный поиск, загрузка BM25 и аналитика графа ждут друг друга на барьере:
+    # при последовательном выполнении барьер не дождётся и сломается
+    barrier = threading.Barrier(3, timeout=5)
+    monkeypatch.setattr(agent_module, "GRAPH_RERANK_WEIGHT", 0.3)
+    agent = make_agent(FakeMemory(barrier), async_client=FakeAsyncClient(["Да."]))
+
+    def latest(user_id):
+        barrier.wait()
+        return SimpleNamespace(entity_scores=dict, entity_names=lambda: None)
+
+    agent._agent.analytics = SimpleNamespace(latest=latest)
+
+    messages, stats = asyncio.run(agent._prepare_messages("Что я пью в Берлине?"))
+
+    assert not barrier.broken
+    # в контексте и векторный результат, и найденный через BM25
+    assert "Любит зелёный чай" in messages[0]["content"]
+    assert "Работает в Берлине" in messages[0]["content"]
+    assert stats["items"] == 2
+
+
+def test_async_agent_has_the_same_public_methods():
+    from mem0_graph.async_agent import AsyncMem0Agent
+
+    def public(cls):
+        return {name for name, value in vars(cls).items() if callable(value) and not name.startswith("_")}
+
+    assert public(agent_module.Mem0Agent) <= public(AsyncMem0Agent)
+    # flush — короткий синоним flush_writes
+    assert public(AsyncMem0Agent) - public(agent_module.Mem0Agent) == {"flush"}
+
+
+def test_async_memory_listing(make_agent):
+    agent = make_agent(FakeMemory(), async_client=FakeAsyncClient([]))
+
+    async def scenario():
+        page = await agent.list_memories(0, 10)
+        count = await agent.count_memories()
+        items = [item async for item in agent.iter_memories(batch_size=1)]
+        return page, count, items
+
+    page, count, items = asyncio.run(scenario())
+
+    assert [m["memory"] for m in page] == ["Работает в Берлине"]
+    assert count == 1
+    assert [m["memory"] for m in items] == ["Работает в Берлине"]
@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+
+from mem0_graph.cache import SemanticCache, share_query_embeddings
+from mem0_graph.watermark import get_watermarks
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_similar_query_hits_and_invalidation_is_per_user():
+    cache = SemanticCache(threshold=0.9)
+    cache.put("alice", "Что я люблю?", [1.0, 0.0, 0.0], ["apples"])
+    cache.put("bob", "Что я люблю?", [1.0, 0.0, 0.0], ["pears"])
+
+    assert cache.get_exact("alice", "  что я ЛЮБЛЮ? ") == ["apples"]
+    assert cache.get("alice", "А что я люблю", [0.99, 0.05, 0.0]) == ["apples"]
+    assert cache.get("alice", "Где я живу?", [0.0, 1.0, 0.0]) is None
+
+    cache.invalidate("alice")
+
+    assert cache.get("alice", "Что я люблю?", [1.0, 0.0, 0.0]) is None
+    assert cache.get_exact("bob", "Что я люблю?") == ["pears"]
+    stats = cache.stats()
+    assert (stats["hits"], stats["semantic_hits"], stats["misses"]) == (3, 1, 2)
+
+
+def test_entries_expire_and_lru_is_bounded():
+    clock = FakeClock()
+    cache = SemanticCache(max_entries=2, ttl=10, clock=clock)
+    cache.put("u", "a", [1.0, 0.0], "A")
+    cache.put("u", "b", [0.0, 1.0], "B")
+    cache.get_exact("u", "a")
+    cache.put("u", "c", [1.0, 1.0], "C")
+
+    assert cache.get_exact("u", "b") is None
+    assert cache.get_exact("u", "a") == "A"
+
+    clock.now = 11
+    assert cache.get_exact("u", "a") is None
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.calls = 0
+
+    def embed(self, text, memory_action=None):
+        self.calls += 1
+        return [float(len(text)), 1.0]
+
+
+class SearchMemory:
+    """Mem0 `search` сам считает вектор запроса; `during_search` имитирует параллельную запись."""
+
+    def __init__(self, during_search=None):
+        self.embedding_model = CountingEmbedder()
+        self.vector_store = SimpleNamespace(collection=None)
+        self.during_search = during_search
+        self.searches = 0
+
+    def search(self, query, user_id):
+        self.searches += 1
+        self.embedding_model.embed(query, "search")
+        if self.during_search:
+            self.during_search(user_id)
+        return {"results": [{"id": "m1", "memory": "Любит чай"}]}
+
+
+def test_search_miss_embeds_query_once(make_agent):
+    memory = SearchMemory()
+    model = memory.embedding_model
+    share_query_embeddings(memory)
+    agent = make_agent(memory)
+
+    assert [r["memory"] for r in agent.search("Что я пью?")] == ["Любит чай"]
+    assert model.calls == 1
+    agent.search("Что я пью?")
+    assert memory.searches == 1
+
+
+def test_search_result_is_not_cached_after_concurrent_write(make_agent):
+    memory = SearchMemory(during_search=lambda user_id: get_watermarks().bump(user_id))
+    agent = make_agent(memory)
+
+    agent.search("Что я пью?")
+    agent.search("Что я пью?")
+
+    assert memory.searches == 2
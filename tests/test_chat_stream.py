@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+import pytest
+
+
+class FakeMemory:
+    def __init__(self):
+        self.embedding_model = SimpleNamespace(embed=lambda text, action=None: [1.0, float(len(text))])
+        self.vector_store = SimpleNamespace(collection=None)
+
+    def search(self, query, user_id):
+        return {"results": [{"id": "m1", "memory": "Любит зелёный чай"}]}
+
+    def get_all(self, user_id, limit=100):
+        return {"results": []}
+
+
+def chunk(content=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class FakeStreamingClient:
+    """`client.chat.completions.create(stream=True)`: фрагменты, затем usage; `fail_after` — обрыв."""
+
+    def __init__(self, deltas, fail_after=None):
+        self.deltas = deltas
+        self.fail_after = fail_after
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, stream=False, **options):
+        assert stream and options["stream_options"] == {"include_usage": True}
+        for i, delta in enumerate(self.deltas):
+            if i == self.fail_after:
+                raise ConnectionError("stream reset")
+            yield chunk(delta)
+        yield chunk(usage=SimpleNamespace(prompt_tokens=12, completion_tokens=3))
+
+
+@pytest.fixture
+def stream_agent(make_agent):
+    """Агент, у которого постановка в очередь записи только запоминается в `writer.jobs`."""
+
+    def make(client):
+        agent = make_agent(FakeMemory(), client=client)
+        # очередь своя у каждой FakeMemory, подмена не затрагивает другие тесты
+        agent.writer.jobs = []
+        agent.writer.enqueue = lambda user_id, messages, metadata=None: agent.writer.jobs.append(
+            [m["content"] for m in messages]
+        )
+        return agent
+
+    return make
+
+
+def test_deltas_arrive_in_order_and_turn_is_queued_after_the_last(stream_agent):
+    agent = stream_agent(FakeStreamingClient(["Зелёный", " ", "чай", "."]))
+
+    stream = agent.chat_stream("Что я пью?")
+    assert next(stream) == "Зелёный"
+    assert stream.context_stats["items"] == 1
+    rest = [next(stream) for _ in range(3)]
+    # последний фрагмент прочитан, но поток ещё не исчерпан — записи нет
+    assert rest == [" ", "чай", "."] and agent.writer.jobs == []
+
+    assert list(stream) == []
+    assert agent.writer.jobs == [["Что я пью?", "Зелёный чай."]]
+
+
+def test_abandoned_stream_is_not_remembered(stream_agent):
+    agent = stream_agent(FakeStreamingClient(["Зелёный", " чай."]))
+
+    stream = agent.chat_stream("Что я пью?")
+    assert next(stream) == "Зелёный"
+    stream.close()
+
+    assert agent.writer.jobs == []
+
+
+def test_failed_stream_is_not_remembered(stream_agent):
+    agent = stream_agent(FakeStreamingClient(["Зелёный", " чай."], fail_after=1))
+
+    fragments = list(agent.chat_stream("Что я пью?"))
+
+    assert fragments[0] == "Зелёный"
+    assert "stream reset" in fragments[-1]
+    assert agent.writer.jobs == []
@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from mem0_graph.chunking import (
+    CHUNKERS,
+    MarkdownChunker,
+    ParagraphChunker,
+    SentenceChunker,
+    approx_token_count,
+    get_chunker,
+)
+
+TEXT = " ".join(f"Предложение номер {i} про графы знаний." for i in range(40))
+
+
+def test_sentence_chunks_respect_budget_and_overlap():
+    chunker = SentenceChunker(max_tokens=30, overlap_tokens=8)
+
+    chunks = chunker.split_text(TEXT)
+
+    assert len(chunks) > 1
+    assert all(approx_token_count(c) <= 30 for c in chunks)
+    assert all(c.endswith(".") for c in chunks)
+    # последнее предложение чанка повторяется в начале следующего
+    last_sentence = chunks[0].rsplit(". ", 1)[-1]
+    assert chunks[1].startswith(last_sentence.rstrip("."))
+
+
+def test_long_paragraph_is_not_cut_mid_word():
+    words = [f"слово{i}" for i in range(500)]
+    chunks = ParagraphChunker(max_chars=200).split_text(" ".join(words))
+
+    assert " ".join(chunks).split() == words
+
+
+def random_text(rng):
+    """Слова разной длины (в том числе «base64» и сплошная пунктуация), абзацы и заголовки."""
+    alphabet = "абвгдеёжзxyz0123456789.,!?-"
+    parts = []
+    for _ in range(rng.randint(1, 60)):
+        length = rng.choice([1, 3, 7, 15, 60, 300])
+        parts.append("".join(rng.choice(alphabet) for _ in range(length)))
+        parts.append(rng.choice([" ", " ", " ", ". ", "\n\n", "\n## Раздел\n", "\n# Глава\n"]))
+    return "".join(parts)
+
+
+@pytest.mark.parametrize("strategy", sorted(CHUNKERS))
+def test_chunks_never_exceed_budget(strategy):
+    rng = random.Random(strategy)
+    for _ in range(100):
+        max_size = rng.randint(8, 120)
+        chunker = CHUNKERS[strategy](max_size, rng.randint(0, max_size - 1))
+
+        for chunk in chunker.split_text(random_text(rng)):
+            # у ParagraphChunker размер — символы (len), у остальных — токены
+            assert chunker.counter(chunk) <= max_size, (max_size, chunk)
+
+
+def test_markdown_chunks_carry_heading_path():
+    text = "# Глава\nВступление.\n\n## Раздел\nТекст раздела. Ещё текст."
+
+    chunks = MarkdownChunker(max_tokens=50, overlap_tokens=0).split_text(text)
+
+    assert chunks == ["Глава\n\nВступление.", "Глава / Раздел\n\nТекст раздела. Ещё текст."]
+
+
+def test_chunks_stream_across_segments():
+    pages = ["Первая страница.", "Вторая страница.", "Третья страница."]
+
+    chunks = list(SentenceChunker(max_tokens=100, overlap_tokens=0).chunks(iter(pages)))
+
+    assert chunks == ["Первая страница.\n\nВторая страница.\n\nТретья страница."]
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        get_chunker("words")
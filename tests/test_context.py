@@ -0,0 +1,38 @@
+from mem0_graph.context import ContextBuilder
+
+
+def memory(mem_id, text, source=None):
+    return {"id": mem_id, "memory": text, "metadata": {"source": source} if source else None}
+
+
+def test_near_duplicates_are_dropped_and_groups_follow_sources():
+    items = [
+        memory("1", "Анна любит шахматы", "notes.pdf"),
+        memory("2", "Анна очень любит шахматы", "notes.pdf"),
+        memory("3", "Борис живёт в Казани"),
+        memory("4", "Договор DG-1 подписан в мае", "contracts.txt"),
+    ]
+    embeddings = {"1": [1.0, 0.0], "2": [1.0, 0.02], "3": [0.0, 1.0], "4": [0.6, 0.8]}
+
+    context, stats = ContextBuilder(max_tokens=200).build(items, embeddings=embeddings)
+
+    assert context.splitlines() == [
+        "- Борис живёт в Казани",
+        "[source: notes.pdf]",
+        "- Анна любит шахматы",
+        "[source: contracts.txt]",
+        "- Договор DG-1 подписан в мае",
+    ]
+    assert stats["duplicates"] == 1
+    assert stats["items"] == 3
+
+
+def test_context_fits_token_budget():
+    items = [memory(str(i), f"Факт номер {i} " + "слово " * 20) for i in range(20)]
+    builder = ContextBuilder(max_tokens=100, max_items=20)
+
+    context, stats = builder.build(items)
+
+    assert 0 < stats["tokens"] <= 100
+    assert stats["items"] < 20
+    assert context.startswith("- Факт номер 0")
@@ -0,0 +1,154 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from mem0_graph import embedder as embedder_module
+from mem0_graph.embedder import EmbeddingCache, LocalEmbedder, install_embedder, text_key
+
+
+class FakeBackend:
+    """Вектор текста — его длина и число пробелов; запоминает размеры пакетов."""
+
+    name = "fake-model"
+    backend = "fake"
+    dims = 4
+
+    def __init__(self, delay=None):
+        self.batches = []
+        self.delay = delay
+
+    def encode(self, texts):
+        if self.delay is not None:
+            self.delay.wait(1)
+        self.batches.append(len(texts))
+        return np.array([[len(t), t.count(" "), 1.0, 0.5] for t in texts], dtype=np.float32)
+
+
+def test_cache_persists_vectors_and_grows(tmp_path):
+    path = str(tmp_path / "emb")
+    cache = EmbeddingCache(path, dims=4, initial_rows=2)
+    items = [(text_key("m", str(i)), np.full(4, i, dtype=np.float32)) for i in range(5)]
+    cache.put_many(items)
+    cache.close()
+
+    reopened = EmbeddingCache(path, dims=4, initial_rows=2)
+    found = reopened.get_many([key for key, _ in items] + ["missing"])
+    assert len(reopened) == 5
+    assert found[items[3][0]].tolist() == [3.0] * 4
+    assert "missing" not in found
+    reopened.close()
+
+
+def test_repeated_texts_are_served_from_cache(tmp_path):
+    backend = FakeBackend()
+    embedder = LocalEmbedder(backend, cache_path=str(tmp_path / "emb"))
+
+    first = embedder.embed("hello world")
+    hi = [2.0, 0.0, 1.0, 0.5]
+    assert embedder.embed_many(["hello world", "hi", "hi"]) == [first, hi, hi]
+    assert embedder.embed("hello world") == first
+    assert backend.batches == [1, 1]
+    assert embedder.stats()["hits"] == 2
+    embedder.close()
+
+
+def test_concurrent_requests_share_a_batch():
+    gate = threading.Event()
+    backend = FakeBackend(delay=gate)
+    embedder = LocalEmbedder(backend, max_batch=64, max_wait_ms=50)
+    results = {}
+
+    def worker(i):
+        results[i] = embedder.embed(f"text {i}")
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    gate.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 8 and results[3] == [6.0, 1.0, 1.0, 0.5]
+    assert sum(backend.batches) == 8 and len(backend.batches) < 8
+    embedder.close()
+
+
+def test_cache_is_not_shared_between_backends(tmp_path):
+    path = str(tmp_path / "emb")
+    torch = LocalEmbedder(FakeBackend(), cache_path=path)
+    torch.embed("hello world")
+    torch.close()
+
+    int8 = FakeBackend()
+    int8.backend = "onnx-int8"
+    quantized = LocalEmbedder(int8, cache_path=path)
+    quantized.embed("hello world")
+
+    # векторы другого бэкенда из общего файла кеша не берутся
+    assert int8.batches == [1]
+    assert quantized.stats()["hits"] == 0
+    quantized.close()
+
+
+def test_vectors_are_rounded_only_with_cache(tmp_path):
+    class Fractional(FakeBackend):
+        def encode(self, texts):
+            return np.full((len(texts), 4), 0.1, dtype=np.float32)
+
+    plain = LocalEmbedder(Fractional())
+    cached = LocalEmbedder(Fractional(), cache_path=str(tmp_path / "emb"))
+
+    # без кеша — вектор модели как есть, с кешем — как он будет прочитан из float16
+    assert plain.embed("x") == [float(np.float32(0.1))] * 4
+    assert cached.embed("x") == [float(np.float16(0.1))] * 4
+    assert cached.embed("x") == cached.embed("x")
+    plain.close()
+    cached.close()
+
+
+class StockModel:
+    """Модель sentence-transformers, уже загруженная штатным эмбеддером Mem0."""
+
+    def get_sentence_embedding_dimension(self):
+        return 4
+
+    def encode(self, texts, **options):
+        return np.array([[len(t), 0.0, 0.0, 1.0] for t in texts], dtype=np.float32)
+
+
+class RecordingMemory:
+    """Как `mem0.Memory`: `add` и `search` берут `self.embedding_model` в момент вызова,
+    граф — свой `graph.embedding_model`."""
+
+    def __init__(self):
+        stock = SimpleNamespace(model=StockModel(), config=SimpleNamespace(embedding_dims=4))
+        stock.embed = lambda text, memory_action=None: pytest.fail("штатный эмбеддер вызван")
+        self.embedding_model = stock
+        self.graph = SimpleNamespace(embedding_model=stock)
+        self.vectors = {}
+
+    def add(self, text, user_id=None):
+        self.vectors[text] = self.embedding_model.embed(text, "add")
+        self.graph.embedding_model.embed(text, "add")
+
+    def search(self, query, user_id=None):
+        vector = self.embedding_model.embed(query, "search")
+        return [text for text, stored in self.vectors.items() if stored == vector]
+
+
+def test_memory_add_and_search_use_installed_embedder(monkeypatch):
+    monkeypatch.setattr(embedder_module, "_embedder", None)
+    memory = RecordingMemory()
+
+    embedder = install_embedder(memory, "fake-model")
+    try:
+        assert embedder.config.embedding_dims == 4
+        memory.add("likes tea", user_id="alice")
+        assert memory.search("likes tea", user_id="alice") == ["likes tea"]
+        # add — вектор в хранилище и граф, search — вектор запроса: три вызова модели
+        assert embedder.stats()["encoded"] == 3
+    finally:
+        embedder.close()
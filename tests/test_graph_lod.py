@@ -0,0 +1,91 @@
+import pytest
+
+nx = pytest.importorskip("networkx")
+pytest.importorskip("neo4j")
+pytest.importorskip("pyvis")
+
+from mem0_graph.graph_lod import GraphSummarizer, view_graph
+
+
+def edge(source, target, relation="knows"):
+    return {
+        "source": source,
+        "target": target,
+        "relation": relation,
+        "n_labels": ["__Entity__", "person"],
+        "m_labels": ["__Entity__", "person"],
+        "n_name": source,
+        "m_name": target,
+    }
+
+
+def two_cliques(size=10):
+    """Две плотные группы узлов, соединённые одной связью."""
+    records = []
+    for group in ("a", "b"):
+        nodes = [f"{group}{i}" for i in range(size)]
+        for i, src in enumerate(nodes):
+            for tgt in nodes[i + 1:]:
+                records.append(edge(src, tgt))
+    records.append(edge("a0", "b0", "bridge"))
+    return records
+
+
+def test_small_graph_is_not_summarized():
+    view = GraphSummarizer(max_nodes=50).summarize(two_cliques())
+
+    assert not view["summarized"]
+    assert view["stats"]["shown_nodes"] == 20
+
+
+def test_large_graph_collapses_into_clusters_and_bundles_edges():
+    records = two_cliques()
+    records += [edge("a1", "b1", "bridge"), edge("a2", "b2", "bridge")]
+
+    view = GraphSummarizer(max_nodes=5).summarize(records)
+
+    assert view["summarized"]
+    assert sorted(node["id"] for node in view["nodes"]) == ["cluster:0", "cluster:1"]
+    # связи внутри кластера скрыты, три связи между кластерами — одно ребро
+    assert len(view["edges"]) == 1
+    assert view["edges"][0]["count"] == 3
+    assert view["edges"][0]["label"] == "bridge ×3"
+
+
+def test_expanding_cluster_keeps_highest_degree_nodes_within_budget():
+    records = two_cliques() + [edge("a0", "a_leaf")]
+    summarizer = GraphSummarizer(max_nodes=6)
+
+    collapsed = summarizer.summarize(records, key="v1")
+    cluster = next(c["id"] for c in collapsed["clusters"] if "a0" in c["label"])
+    view = summarizer.summarize(records, expanded=[cluster], key="v1")
+
+    ids = {node["id"] for node in view["nodes"]}
+    # 6 узлов: 2 супер-узла + 4 узла с наибольшей степенью, лист остался в кластере
+    assert len(ids) == 6
+    assert "a0" in ids and "a_leaf" not in ids
+    assert cluster in ids
+
+    assert set(view_graph(view)) == ids
+
+
+def test_cluster_positions_are_cached_by_members_not_number():
+    from mem0_graph.graph_viz import Neo4jGraphViz
+
+    viz = Neo4jGraphViz()
+    view = GraphSummarizer(max_nodes=5).summarize(two_cliques())
+    keys = {node["id"]: node["layout_key"] for node in view["nodes"]}
+    assert len(set(keys.values())) == 2
+    positions = viz.layout("lod-layout", view_graph(view), keys)
+
+    # после пересчёта Louvain номера кластеров поменялись местами
+    swapped = {"cluster:0": "cluster:1", "cluster:1": "cluster:0"}
+    renumbered = {swapped[node]: key for node, key in keys.items()}
+    graph = nx.relabel_nodes(view_graph(view), swapped)
+    moved = viz.layout("lod-layout", graph, renumbered)
+
+    for old, new in swapped.items():
+        assert moved[new] == pytest.approx(positions[old])
+    # под номерами cluster:N в кеше ничего не лежит
+    assert viz.layout_cache.get("lod-layout", list(swapped)) == {}
+    viz.close()
@@ -0,0 +1,65 @@
+import json
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from mem0_graph.graph_model import CompactGraph, node_color
+
+
+def edge(source, target, relation="knows", labels=("__Entity__", "person")):
+    return {
+        "source": source,
+        "target": target,
+        "relation": relation,
+        "n_labels": list(labels),
+        "m_labels": list(labels),
+        "n_name": source.upper(),
+        "m_name": target.upper(),
+    }
+
+
+def test_nodes_and_kinds_are_interned_and_duplicates_skipped():
+    graph = CompactGraph.from_records(
+        [edge("a", "b"), edge("b", "c"), edge("a", "b"), edge("a", "b", "likes")]
+    )
+
+    assert graph.node_count == 3
+    assert graph.edge_count == 3
+    assert len(graph.kinds) == 1
+    assert graph.relations == ["knows", "likes"]
+    assert list(graph.edges()) == [("a", "knows", "b"), ("b", "knows", "c"), ("a", "likes", "b")]
+    assert list(graph.degrees()) == [2, 3, 1]
+
+
+def test_color_lookup_keeps_label_priority():
+    assert node_color(["__Entity__", "person"]) == "#e11d48"
+    assert node_color(["Person", "User"]) == "#6366f1"
+    assert node_color([]) == "#94a3b8"
+
+
+def test_exporters(tmp_path):
+    graph = CompactGraph.from_records([edge("a", "b"), edge("b", "c", "likes")])
+
+    payload = json.loads(json.dumps(graph.to_json()))
+    assert [n["id"] for n in payload["nodes"]] == ["a", "b", "c"]
+    assert payload["edges"] == [[0, 0, 1], [1, 1, 2]]
+
+    root = ET.parse(graph.to_graphml(str(tmp_path / "graph.graphml"))).getroot()
+    ns = {"g": "http://graphml.graphdrawing.org/xmlns"}
+    assert len(root.findall(".//g:node", ns)) == 3
+    assert len(root.findall(".//g:edge", ns)) == 2
+
+
+def test_pyvis_export():
+    network = pytest.importorskip("pyvis.network")
+    graph = CompactGraph.from_records([edge("a", "b"), edge("b", "a", "likes")])
+
+    net = graph.to_pyvis(network.Network(), positions={"a": (0.5, -0.5)}, scale=100)
+
+    assert net.get_nodes() == ["a", "b"]
+    assert net.node_map["a"]["x"] == 50 and net.node_map["a"]["physics"] is False
+    # обе связи сохраняются, хотя сеть неориентированная
+    assert [(e["from"], e["to"], e["label"]) for e in net.edges] == [
+        ("a", "b", "knows"),
+        ("b", "a", "likes"),
+    ]
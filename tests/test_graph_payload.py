@@ -0,0 +1,64 @@
+import pytest
+
+from mem0_graph.graph_payload import decode_message, diff_message, encode_message, full_message
+
+
+def test_diff_contains_only_changes():
+    old = {"nodes": {"a": {"id": "a", "x": 0}, "b": {"id": "b", "x": 1}}, "edges": {}}
+    new = {
+        "nodes": {"a": {"id": "a", "x": 0}, "c": {"id": "c", "x": 2}},
+        "edges": {"a|knows|c": {"id": "a|knows|c"}},
+    }
+
+    message = decode_message(encode_message(diff_message(old, new, "v1", "v2")))
+
+    assert message["base"] == "v1" and message["version"] == "v2"
+    assert message["nodes"] == {"upsert": [{"id": "c", "x": 2}], "remove": ["b"]}
+    assert message["edges"]["upsert"] == [{"id": "a|knows|c"}]
+    assert full_message(new, "v2")["base"] is None
+
+
+def test_graph_html_is_cached_and_payload_is_incremental():
+    pytest.importorskip("neo4j")
+    pytest.importorskip("pyvis")
+    pytest.importorskip("numpy")
+    from mem0_graph.graph_viz import Neo4jGraphViz
+    from mem0_graph.watermark import get_watermarks
+
+    def edge(source, target):
+        return {
+            "source": source,
+            "target": target,
+            "relation": "knows",
+            "n_labels": ["person"],
+            "m_labels": ["person"],
+            "n_name": source,
+            "m_name": target,
+            "created": len(source + target),
+        }
+
+    class FakeGraph(Neo4jGraphViz):
+        records = [edge("a", "b"), edge("b", "c")]
+
+        def iter_graph_records(self, user_id="user_1", since=None, max_edges=None):
+            return iter([r for r in self.records if since is None or r["created"] > since])
+
+    viz = FakeGraph()
+    user = "payload-test"
+
+    html = viz.graph_html(user)
+    assert "vis.DataSet" in html and viz.last_view["stats"]["nodes"] == 3
+    assert viz.graph_html(user) is html
+
+    first = decode_message(viz.graph_payload(user))
+    assert first["base"] is None and len(first["nodes"]["upsert"]) == 3
+
+    FakeGraph.records = FakeGraph.records + [edge("c", "dd")]
+    get_watermarks().bump(user)
+    delta = decode_message(viz.graph_payload(user, base=first["version"]))
+
+    assert delta["base"] == first["version"]
+    assert [n["id"] for n in delta["nodes"]["upsert"]] == ["dd"]
+    assert [e["id"] for e in delta["edges"]["upsert"]] == ["c|knows|dd"]
+    assert delta["nodes"]["remove"] == [] and delta["edges"]["remove"] == []
+    viz.close()
@@ -1,49 +1,43 @@
-from neo4j import GraphDatabase
+import pytest
 
-uri = "bolt://localhost:7687"
-user = "neo4j"
-password = "password123"
-driver = GraphDatabase.driver(uri, auth=(user, password))
+from mem0_graph.graph_viz import Neo4jGraphViz
+from mem0_graph.neo4j_pool import close_pools
 
+# Интеграционная проверка на живом Neo4j (подключение — из NEO4J в mem0_graph/config.py);
+# без сервера пропускается. Постраничное чтение без Neo4j проверяет tests/test_graph_viz.py.
 
-def test_query():
+
+@pytest.fixture(scope="module")
+def viz():
+    viz = Neo4jGraphViz(page_size=100)
+    if not viz.pool.verify():
+        viz.close()
+        pytest.skip("Neo4j недоступен")
+    yield viz
+    viz.close()
+
+
+def test_query(viz):
     user_id = "user_1"
-    query = """
-    MATCH (n)-[r]->(m)
-    WHERE n.user_id = $user_id OR m.user_id = $user_id OR 
-            n.user_id IS NULL OR m.user_id IS NULL
-    RETURN 
-        elementId(n) as source,
-        elementId(m) as target,
-        type(r) as relation,
-        labels(n) as n_labels,
-        labels(m) as m_labels,
-        n.memory as n_memory,
-        m.memory as m_memory,
-        n.value as n_value,
-        m.value as m_value,
-        n.name as n_name,
-        m.name as m_name,
-        n.text as n_text,
-        m.text as m_text,
-        n.id as n_id,
-        m.id as m_id
-    LIMIT 300
-    """
-    
-    with driver.session() as session:
-        result = session.run(query, user_id=user_id)
-        data = [record.data() for record in result]
-        print(f"Found {len(data)} records")
-        for i, d in enumerate(data[:3]):
-            print(f"Record {i}: {d}")
+    viz.ensure_schema()
+
+    pages = list(viz.iter_graph_pages(user_id))
+    data = [record for page in pages for record in page]
+    print(f"Found {len(data)} records in {len(pages)} pages")
+    for i, d in enumerate(data[:3]):
+        print(f"Record {i}: {d}")
+
+    rel_ids = [d["rel_id"] for d in data]
+    assert rel_ids == sorted(rel_ids)
+    assert len(set(rel_ids)) == len(rel_ids)
 
 
 if __name__ == "__main__":
+    viz = Neo4jGraphViz(page_size=100)
     try:
-        test_query()
+        test_query(viz)
     except Exception as e:
         print(f"Error: {e}")
     finally:
-        driver.close()
-
+        viz.close()
+        close_pools()
@@ -0,0 +1,74 @@
+from mem0_graph.graph_retrieval import GraphExpander, SearchResults, normalize_relations
+
+
+class Record(dict):
+    def data(self):
+        return dict(self)
+
+
+class FakePool:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def read(self, query, **params):
+        self.calls.append(params)
+        return [Record(row) for row in self.rows if row["seed"] in params["names"]]
+
+
+def row(seed, source, relation, target, hop):
+    return {"seed": seed, "source": source, "relation": relation, "target": target,
+            "hop": hop, "created": None}
+
+
+def test_search_relations_are_normalized():
+    raw = {
+        "results": [],
+        "relations": [
+            {"source": "alice", "relationship": "works_at", "destination": "acme"},
+            {"source": "bob", "relation": "knows", "target": "alice"},
+            {"source": "broken"},
+        ],
+    }
+
+    assert normalize_relations(raw) == [
+        {"source": "alice", "relation": "works_at", "target": "acme"},
+        {"source": "bob", "relation": "knows", "target": "alice"},
+    ]
+    assert normalize_relations([{"memory": "x"}]) == []
+    results = SearchResults([{"memory": "x"}], normalize_relations(raw))
+    assert results == [{"memory": "x"}] and len(results.relations) == 2
+
+
+def test_two_hop_facts_are_fetched_in_one_query_and_ranked_by_distance():
+    pool = FakePool([
+        row("acme", "acme", "located_in", "berlin", 1),
+        row("acme", "berlin", "capital_of", "germany", 2),
+        row("john_doe", "john_doe", "likes", "tea", 1),
+    ])
+    expander = GraphExpander(pool=pool)
+    relations = [{"source": "alice", "relation": "works_at", "target": "acme"}]
+    hits = [{"memory": "Alice met John Doe"}]
+
+    lines, stats = expander.expand("u", hits, relations, entity_names={"john doe": "john_doe"})
+
+    assert len(pool.calls) == 1
+    assert set(pool.calls[0]["names"]) == {"alice", "acme", "john_doe"}
+    assert lines == [
+        "- alice → works_at → acme",
+        "- acme → located_in → berlin",
+        "- john_doe → likes → tea",
+        "- berlin → capital_of → germany",
+    ]
+    assert stats["seeds"] == 3 and stats["facts"] == 4
+
+
+def test_facts_respect_token_budget():
+    rows = [row("a", "a", "knows", f"person_{i}", 1) for i in range(50)]
+    expander = GraphExpander(pool=FakePool(rows), max_tokens=30)
+
+    lines, stats = expander.expand("u", [], [{"source": "a", "relation": "r", "target": "b"}])
+
+    assert 0 < len(lines) < 10
+    assert stats["tokens"] <= 30
+    assert GraphExpander(pool=FakePool(rows)).expand("u", [], [])[0] == []
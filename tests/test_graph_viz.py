@@ -0,0 +1,240 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("neo4j")
+pytest.importorskip("pyvis")
+
+from mem0_graph.graph_viz import Neo4jGraphViz, graph_nodes
+from mem0_graph.watermark import get_watermarks
+
+
+def edge(rel_id, source, target, created=None):
+    return {
+        "rel_id": rel_id,
+        "source": source,
+        "target": target,
+        "relation": "knows",
+        "n_labels": ["__Entity__"],
+        "m_labels": ["__Entity__"],
+        "n_name": source,
+        "m_name": target,
+        "created": created,
+    }
+
+
+class FakeGraph(Neo4jGraphViz):
+    """Окрестность без Neo4j: `expand` отвечает из словаря смежности."""
+
+    def __init__(self, adjacency, **options):
+        super().__init__(**options)
+        self.adjacency = adjacency
+        self.calls = []
+
+    def expand(self, user_id, node_ids, fanout=None, relation_types=None):
+        self.calls.append((sorted(node_ids), fanout))
+        return [e for node_id in node_ids for e in self.adjacency.get(node_id, [])[:fanout]]
+
+
+def test_neighbourhood_expands_frontier_once_per_hop():
+    adjacency = {
+        "a": [edge("r1", "a", "b"), edge("r2", "a", "c"), edge("r3", "a", "d")],
+        "b": [edge("r1", "a", "b"), edge("r4", "b", "e")],
+        "c": [edge("r2", "a", "c"), edge("r5", "c", "f")],
+    }
+    viz = FakeGraph(adjacency)
+
+    records = viz.get_neighbourhood("u", ["a"], depth=2, fanout=[2, 5])
+
+    # шаг 1 — только стартовый узел, шаг 2 — весь новый фронтир одним вызовом
+    assert viz.calls == [(["a"], 2), (["b", "c"], 5)]
+    assert sorted(r["rel_id"] for r in records) == ["r1", "r2", "r4", "r5"]
+    assert set(graph_nodes(records)) == {"a", "b", "c", "e", "f"}
+    viz.close()
+
+
+def test_neighbourhood_respects_max_edges():
+    adjacency = {"a": [edge(f"r{i}", "a", f"n{i}") for i in range(10)]}
+    viz = FakeGraph(adjacency)
+
+    records = viz.get_neighbourhood("u", ["a"], depth=3, fanout=10, max_edges=4)
+
+    assert len(records) == 4
+    assert len(viz.calls) == 1
+    viz.close()
+
+
+class StoredGraph(Neo4jGraphViz):
+    """Постраничное чтение без Neo4j: `_record_pages` отвечает из списка связей."""
+
+    def __init__(self, edges, **options):
+        super().__init__(**options)
+        self.edges = edges
+        self.reads = []  # (since, число отданных связей)
+
+    def _record_pages(self, user_id, since=None, page_size=None):
+        rows = sorted(
+            (e for e in self.edges if since is None or e["created"] > since),
+            key=lambda e: e["rel_id"],
+        )
+        self.reads.append((since, len(rows)))
+        for i in range(0, len(rows), page_size):
+            yield rows[i:i + page_size]
+
+
+def snapshot_edges(snapshot):
+    return sorted(source + target for source, _, target in snapshot.graph.edges())
+
+
+def test_snapshot_fetches_only_newer_edges_after_add():
+    user = "snapshot-add"
+    viz = StoredGraph([edge("r1", "a", "b", 1), edge("r2", "b", "c", 2)])
+    viz.get_graph_snapshot(user)
+
+    viz.edges.append(edge("r3", "c", "d", 3))
+    get_watermarks().bump(user)
+    snapshot, changed = viz.get_graph_snapshot(user)
+
+    assert changed and viz.reads == [(None, 2), (2, 1)]
+    assert snapshot_edges(snapshot) == ["ab", "bc", "cd"]
+    viz.close()
+
+
+def test_snapshot_reloads_everything_after_delete():
+    user = "snapshot-delete"
+    viz = StoredGraph([edge("r1", "a", "b", 1), edge("r2", "b", "c", 2)])
+    viz.get_graph_snapshot(user)
+
+    del viz.edges[0]
+    get_watermarks().bump(user, full=True)
+    snapshot, _ = viz.get_graph_snapshot(user)
+
+    assert viz.reads[-1] == (None, 1)
+    assert snapshot_edges(snapshot) == ["bc"]
+    viz.close()
+
+
+def test_incremental_snapshot_respects_max_edges():
+    user = "snapshot-cap"
+    viz = StoredGraph([edge("r1", "a", "b", 1), edge("r2", "b", "c", 2)], max_edges=3)
+    viz.get_graph_snapshot(user)
+
+    viz.edges += [edge(f"r{i}", f"n{i}", f"m{i}", i) for i in range(3, 7)]
+    get_watermarks().bump(user)
+    snapshot, _ = viz.get_graph_snapshot(user)
+    assert snapshot.graph.edge_count == 3
+
+    # граф уже полон: следующая запись не приводит к чтению из Neo4j
+    reads = len(viz.reads)
+    viz.edges.append(edge("r9", "x", "y", 9))
+    get_watermarks().bump(user)
+    snapshot, _ = viz.get_graph_snapshot(user)
+    assert snapshot.graph.edge_count == 3 and len(viz.reads) == reads
+    viz.close()
+
+
+class SchemaPool:
+    """Пул без Neo4j: запоминает запросы, отметки миграций хранит в множестве."""
+
+    def __init__(self, uri, down=False):
+        self.down = down
+        self.statements = []
+        self.migrations = set()
+        self.uri, self.user, self.driver = uri, "neo4j", None
+
+    def read(self, query, **params):
+        return [{"name": params["name"]}] if params["name"] in self.migrations else []
+
+    @contextmanager
+    def session(self):
+        yield self
+
+    def run(self, query, **params):
+        if self.down:
+            raise ConnectionError("neo4j unavailable")
+        self.statements.append(query)
+        if query.startswith("MERGE"):
+            self.migrations.add(params["name"])
+        return SimpleNamespace(consume=lambda: SimpleNamespace(counters=SimpleNamespace(labels_added=3)))
+
+
+def test_base_label_migration_runs_once():
+    pool = SchemaPool("bolt://schema-migration")
+    viz = Neo4jGraphViz(pool=pool)
+
+    assert viz.migrate_base_label() == 3
+    assert any("IN TRANSACTIONS" in q for q in pool.statements)
+    statements = len(pool.statements)
+    assert viz.migrate_base_label() is None
+    assert len(pool.statements) == statements
+    # создание индексов миграцию не запускает
+    viz.ensure_schema(force=True)
+    assert not any("IN TRANSACTIONS" in q for q in pool.statements[statements:])
+    viz.close()
+
+
+def test_schema_is_not_retried_by_every_session_while_neo4j_is_down():
+    pool = SchemaPool("bolt://schema-down", down=True)
+    first, second = Neo4jGraphViz(pool=pool), Neo4jGraphViz(pool=pool)
+
+    assert not first.ensure_schema()
+    pool.down = False
+    assert not second.ensure_schema()
+    assert pool.statements == []
+    assert second.ensure_schema(retry_after=0)
+    assert pool.statements
+
+
+class Record(dict):
+    def data(self):
+        return dict(self)
+
+
+class PagedPool:
+    """Отвечает на запрос страницы графа, как Neo4j: связи после `after`, не больше `page_size`."""
+
+    def __init__(self, edges):
+        self.edges = [Record(e) for e in edges]
+        self.uri, self.user, self.driver = "bolt://paged", "neo4j", None
+        self.reads = []
+
+    def read(self, query, **params):
+        self.reads.append((params["after"], params["page_size"]))
+        since = params["since"]
+        rows = sorted(
+            (e for e in self.edges
+             if e["rel_id"] > params["after"] and (since is None or e["created"] > since)),
+            key=lambda e: e["rel_id"],
+        )
+        return rows[: params["page_size"]]
+
+
+def test_graph_pages_continue_from_last_element_id():
+    edges = [edge(f"r{i}", f"a{i}", f"b{i}", created=i) for i in range(5)]
+    pool = PagedPool(edges)
+    viz = Neo4jGraphViz(pool=pool, page_size=2)
+
+    pages = list(viz.iter_graph_pages("paged"))
+    assert [[r["rel_id"] for r in page] for page in pages] == [["r0", "r1"], ["r2", "r3"], ["r4"]]
+    assert all(type(r) is dict for page in pages for r in page)
+    # каждая страница — отдельный запрос с курсором по последнему elementId
+    assert pool.reads == [("", 2), ("r1", 2), ("r3", 2)]
+
+    newer = [r["rel_id"] for page in viz.iter_graph_pages("paged", since=2) for r in page]
+    assert newer == ["r3", "r4"]
+
+    # ровно полная последняя страница: ещё один запрос получает пустую и останавливается
+    pool.reads.clear()
+    assert len(list(viz.iter_graph_pages("paged", page_size=5))) == 1
+    assert pool.reads == [("", 5), ("r4", 5)]
+    viz.close()
+
+
+def test_graph_records_stop_at_max_edges():
+    pool = PagedPool([edge(f"r{i}", f"a{i}", f"b{i}") for i in range(5)])
+    viz = Neo4jGraphViz(pool=pool, page_size=2, max_edges=3)
+
+    assert [r["rel_id"] for r in viz.iter_graph_records("paged")] == ["r0", "r1", "r2"]
+    assert list(viz.iter_graph_records("paged", max_edges=0)) == []
+    viz.close()
@@ -0,0 +1,47 @@
+from mem0_graph.hybrid import BM25Index, HybridRetriever, reciprocal_rank_fusion
+
+
+def test_bm25_incremental_add_update_remove():
+    index = BM25Index()
+    index.add("m1", "Договор DG-1001 подписан с Ивановым")
+    index.add("m2", "Петров любит шахматы")
+
+    assert index.search("dg 1001")[0][0] == "m1"
+
+    index.add("m1", "Договор DG-2002 подписан с Ивановым")
+    assert index.search("1001") == []
+    assert index.search("2002")[0][0] == "m1"
+
+    index.remove("m2")
+    assert len(index) == 1 and index.search("шахматы") == []
+
+
+def test_rrf_prefers_items_ranked_high_in_both_lists():
+    vector = [{"id": "a", "memory": "A"}, {"id": "b", "memory": "B"}, {"id": "c", "memory": "C"}]
+    keyword = [{"id": "c", "memory": "C"}, {"id": "b", "memory": "B"}]
+
+    fused = reciprocal_rank_fusion([vector, keyword])
+
+    assert [item["id"] for item in fused] == ["c", "b", "a"]
+
+
+def test_retriever_applies_mem0_add_events():
+    retriever = HybridRetriever()
+    retriever.load("alice", [{"id": "m1", "memory": "Живёт в Казани", "metadata": None}])
+
+    retriever.apply_add_result(
+        "alice",
+        {
+            "results": [
+                {"id": "m2", "memory": "Номер пропуска XK-77", "event": "ADD"},
+                {"id": "m1", "memory": "Живёт в Казани", "event": "DELETE"},
+            ]
+        },
+        metadata={"source": "chat"},
+    )
+
+    hits = retriever.keyword_search("alice", "пропуск XK-77")
+    assert [h["id"] for h in hits] == ["m2"]
+    assert hits[0]["metadata"] == {"source": "chat"}
+    assert retriever.keyword_search("alice", "Казань") == []
+    assert retriever.keyword_search("bob", "XK-77") == []
@@ -0,0 +1,78 @@
+from mem0_graph.dedup import ChunkIndex, chunk_hash
+from mem0_graph.ingest import IngestPipeline
+
+
+class FlakyMemory:
+    """Заглушка Memory: первый вызов для чанка 'bad' всегда падает."""
+
+    def __init__(self):
+        self.calls = []
+
+    def add(self, chunk, user_id=None, metadata=None):
+        self.calls.append(chunk)
+        if chunk == "bad":
+            raise RuntimeError("extraction failed")
+        return {"results": [{"memory": chunk, "event": "ADD"}]}
+
+
+def test_pipeline_reports_failures_and_keeps_order():
+    memory = FlakyMemory()
+    pipeline = IngestPipeline(memory, max_workers=3, retries=2, backoff=0)
+    progress = []
+
+    report = pipeline.run(
+        (c for c in ["a", "bad", "c", "d"]),
+        user_id="test_user",
+        on_progress=lambda done, total, item: progress.append(done),
+    )
+
+    assert report["total"] == 4
+    assert report["succeeded"] == 3
+    assert [r["index"] for r in report["results"]] == [0, 1, 2, 3]
+    assert report["failures"][0]["index"] == 1
+    assert report["failures"][0]["attempts"] == 3
+    assert memory.calls.count("bad") == 3
+    assert progress == [1, 2, 3, 4]
+
+
+def test_pipeline_skips_chunks_already_in_index(tmp_path):
+    index = ChunkIndex(str(tmp_path / "index.sqlite3"))
+    memory = FlakyMemory()
+    pipeline = IngestPipeline(memory, max_workers=2, backoff=0, index=index)
+
+    first = pipeline.run(["alpha", "beta"], user_id="test_user", source="doc.txt")
+    second = pipeline.run(["  ALPHA ", "beta", "gamma"], user_id="test_user", source="doc.txt")
+
+    assert first["succeeded"] == 2
+    assert second["skipped"] == 2 and second["succeeded"] == 1
+    assert sorted(memory.calls) == ["alpha", "beta", "gamma"]
+    assert index.hashes("test_user", "doc.txt") == {chunk_hash("alpha"), chunk_hash("beta"), chunk_hash("gamma")}
+    assert index.hashes("other_user", "doc.txt") == set()
+
+
+class DeletingMemory:
+    def __init__(self, broken=()):
+        self.broken = set(broken)
+        self.deleted = []
+
+    def delete(self, memory_id):
+        if memory_id in self.broken:
+            raise RuntimeError("chroma unavailable")
+        self.deleted.append(memory_id)
+
+
+def test_resync_keeps_index_rows_of_memories_that_failed_to_delete(make_agent):
+    memory = DeletingMemory(broken={"m2"})
+    agent = make_agent(memory)
+    agent.chunk_index.record(agent.user_id, "doc.txt", "h1", ["m1", "m2"])
+    agent.chunk_index.record(agent.user_id, "doc.txt", "h2", ["m3"])
+
+    assert agent._remove_stale_chunks("doc.txt", {"results": []}) == 2
+    assert sorted(memory.deleted) == ["m1", "m3"]
+    # неудалённое воспоминание по-прежнему в индексе, следующий re-sync его найдёт
+    assert agent.chunk_index.hashes(agent.user_id, "doc.txt") == {"h1"}
+    assert agent.chunk_index.memory_ids(agent.user_id, "doc.txt", "h1") == ["m2"]
+
+    memory.broken.clear()
+    assert agent._remove_stale_chunks("doc.txt", {"results": []}) == 1
+    assert agent.chunk_index.hashes(agent.user_id, "doc.txt") == set()
@@ -0,0 +1,42 @@
+import pytest
+
+nx = pytest.importorskip("networkx")
+pytest.importorskip("numpy")
+
+from mem0_graph.layout import LayoutCache, stable_layout
+
+
+def test_known_nodes_keep_positions_when_graph_grows(tmp_path):
+    cache = LayoutCache(str(tmp_path / "layout.sqlite3"))
+    graph = nx.path_graph(["a", "b", "c", "d"])
+
+    first = stable_layout(graph)
+    cache.put("alice", first)
+
+    graph.add_edge("d", "e")
+    previous = cache.get("alice", graph.nodes)
+    assert set(previous) == {"a", "b", "c", "d"}
+
+    second = stable_layout(graph, previous)
+    for node in "abcd":
+        assert second[node] == pytest.approx(first[node])
+    assert "e" in second
+    cache.close()
+
+
+def test_unchanged_graph_reuses_cached_positions():
+    graph = nx.cycle_graph(5)
+    previous = {node: (float(node), 0.0) for node in graph}
+
+    assert stable_layout(graph, previous) == previous
+
+
+def test_cache_is_per_user(tmp_path):
+    cache = LayoutCache(str(tmp_path / "layout.sqlite3"))
+    cache.put("alice", {"n1": (0.5, -0.5)})
+
+    assert cache.get("alice", ["n1", "n2"]) == {"n1": (0.5, -0.5)}
+    assert cache.get("bob", ["n1"]) == {}
+    cache.clear("alice")
+    assert cache.get("alice", ["n1"]) == {}
+    cache.close()
@@ -0,0 +1,69 @@
+from mem0_graph.listing import MemoryListing, payload_item
+from mem0_graph.watermark import get_watermarks
+
+
+class FakeCollection:
+    def __init__(self, payloads):
+        self.payloads = payloads
+        self.calls = []
+
+    def get(self, where, limit=None, offset=None, include=()):
+        self.calls.append((limit, offset, tuple(include)))
+        rows = [(i, p) for i, p in self.payloads.items() if p["user_id"] == where["user_id"]]
+        rows = rows[offset or 0:][:limit] if limit is not None else rows[offset or 0:]
+        return {"ids": [i for i, _ in rows], "metadatas": [p for _, p in rows]}
+
+
+class FakeStore:
+    def __init__(self, collection):
+        self.collection = collection
+
+
+class FakeMemory:
+    def __init__(self, payloads):
+        self.vector_store = FakeStore(FakeCollection(payloads))
+
+
+def memories(user_id, n):
+    return {
+        f"{user_id}-{i}": {"data": f"fact {i}", "hash": "h", "user_id": user_id, "source": "doc"}
+        for i in range(n)
+    }
+
+
+def test_payload_becomes_get_all_item():
+    item = payload_item("m1", {"data": "Likes tea", "hash": "h", "user_id": "u", "source": "a.pdf"})
+
+    assert item == {
+        "id": "m1", "memory": "Likes tea", "hash": "h", "user_id": "u",
+        "metadata": {"source": "a.pdf"},
+    }
+
+
+def test_pages_and_count_are_cached_until_next_write():
+    user = "listing-user"
+    memory = FakeMemory({**memories(user, 25), **memories("other", 5)})
+    listing = MemoryListing()
+    calls = memory.vector_store.collection.calls
+
+    page = listing.page(memory, user, page=2, page_size=10)
+    assert [m["memory"] for m in page] == [f"fact {i}" for i in range(20, 25)]
+    assert listing.count(memory, user) == 25
+    assert calls[-1] == (None, None, ())  # число — запросом одних id
+
+    listing.page(memory, user, page=2, page_size=10)
+    listing.count(memory, user)
+    assert len(calls) == 2
+
+    get_watermarks().bump(user)
+    listing.count(memory, user)
+    assert len(calls) == 3
+
+
+def test_iterate_reads_in_batches():
+    memory = FakeMemory(memories("u", 7))
+
+    items = list(MemoryListing().iterate(memory, "u", batch_size=3))
+
+    assert len(items) == 7
+    assert [c[:2] for c in memory.vector_store.collection.calls] == [(3, 0), (3, 3), (3, 6)]
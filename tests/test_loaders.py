@@ -0,0 +1,28 @@
+import io
+
+import pytest
+
+from mem0_graph.loaders import get_extractor, iter_document, iter_txt
+
+
+def test_txt_yields_paragraphs_without_closing_source():
+    raw = io.BytesIO("Первый абзац\nпродолжение\n\n\nВторой абзац\n".encode("utf-8"))
+
+    paragraphs = list(iter_txt(raw))
+
+    assert paragraphs == ["Первый абзац\nпродолжение", "Второй абзац"]
+    assert not raw.closed
+
+
+def test_extractor_is_chosen_by_mime_then_extension():
+    assert get_extractor("notes.bin", "text/plain") is iter_txt
+    assert get_extractor("notes.TXT") is iter_txt
+    with pytest.raises(ValueError):
+        get_extractor("image.png")
+
+
+def test_iter_document_reads_path(tmp_path):
+    path = tmp_path / "doc.txt"
+    path.write_text("a\n\nb\n", encoding="utf-8")
+
+    assert list(iter_document(str(path))) == ["a", "b"]
@@ -0,0 +1,103 @@
+import pytest
+
+pytest.importorskip("neo4j")
+
+from neo4j.exceptions import ServiceUnavailable
+
+from mem0_graph import neo4j_pool
+from mem0_graph.neo4j_pool import Neo4jPool, close_pools, get_pool, share_with_mem0
+
+
+class FakeSession:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_read(self, work, *args, **kwargs):
+        # повторы управляемой транзакции — внутри драйвера, здесь их нет
+        self.pool.calls += 1
+        if self.pool.unavailable:
+            raise ServiceUnavailable("restarting")
+        return work("tx", *args, **kwargs)
+
+    execute_write = execute_read
+
+
+class FakePool(Neo4jPool):
+    unavailable = False
+    calls = 0
+
+    def session(self, **options):
+        return FakeSession(self)
+
+
+def test_registry_shares_one_pool_per_target():
+    try:
+        first = get_pool("bolt://example:7687", "neo4j", "secret")
+        assert get_pool("bolt://example:7687", "neo4j", "secret") is first
+        assert get_pool("bolt://other:7687", "neo4j", "secret") is not first
+        # с другим паролем — свой пул, а не открытый с первым паролем
+        assert get_pool("bolt://example:7687", "neo4j", "changed") is not first
+    finally:
+        close_pools()
+
+
+def test_failures_are_counted_without_extra_retries():
+    pool = FakePool("bolt://example:7687", "neo4j", "secret")
+
+    assert pool.execute_read(lambda tx, x: (tx, x), 42) == ("tx", 42)
+
+    pool.unavailable = True
+    with pytest.raises(ServiceUnavailable):
+        pool.execute_write(lambda tx: None)
+    # ошибка после повторов драйвера сразу уходит вызывающему
+    assert pool.calls == 2
+    metrics = pool.metrics()
+    assert metrics["reads"] == 1 and metrics["writes"] == 1
+    assert metrics["failures"] == 1 and metrics["active"] == 0
+    pool.close()
+
+
+def test_pool_internals_are_not_read_on_untested_driver(monkeypatch):
+    pool = Neo4jPool("bolt://example:7687", "neo4j", "secret")
+    monkeypatch.setattr(neo4j_pool, "DRIVER_VERSIONS", ((99, 0), (100, 0)))
+
+    metrics = pool.metrics()
+    assert "pool_connections" not in metrics and metrics["reads"] == 0
+    pool.close()
+
+
+def test_mem0_graph_store_uses_shared_driver(monkeypatch):
+    class Closable:
+        closed = False
+
+        def close(self):
+            self.closed = True
+
+    class Store:
+        _driver = Closable()
+
+    class Graph:
+        graph = Store()
+
+    class Memory:
+        graph = Graph()
+
+    pool = Neo4jPool("bolt://example:7687", "neo4j", "secret")
+    own = Memory.graph.graph._driver
+
+    # непроверенная версия langchain-neo4j: у Mem0 остаётся свой драйвер
+    monkeypatch.setattr(neo4j_pool, "_langchain_neo4j_version", lambda: (1, 2))
+    assert not share_with_mem0(Memory(), pool)
+    assert Memory.graph.graph._driver is own and not own.closed
+
+    monkeypatch.setattr(neo4j_pool, "_langchain_neo4j_version", lambda: (0, 3))
+    assert share_with_mem0(Memory(), pool)
+    assert Memory.graph.graph._driver is pool.driver and own.closed
+    assert not share_with_mem0(object(), pool)
+    pool.close()
@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+
+from mem0_graph import resources
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# запас на медленные машины CI; сейчас импорт занимает ~0.15 с
+IMPORT_BUDGET_SECONDS = 1.5
+HEAVY_MODULES = ("mem0", "openai", "sentence_transformers", "torch", "chromadb", "neo4j", "numpy")
+
+IMPORT_SCRIPT = """
+import sys, time
+started = time.perf_counter()
+import mem0_graph.agent, mem0_graph.async_agent
+print(time.perf_counter() - started)
+print(",".join(name for name in sys.argv[1:] if name in sys.modules))
+"""
+
+
+def test_agent_import_is_fast_and_light():
+    done = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT, *HEAVY_MODULES],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    seconds, loaded = done.stdout.split("\n")[:2]
+
+    assert loaded == ""
+    assert float(seconds) < IMPORT_BUDGET_SECONDS
+
+
+class FakeEmbedder:
+    def __init__(self):
+        self.texts = []
+
+    def embed(self, text, memory_action=None):
+        self.texts.append(text)
+        return [0.0]
+
+
+class FakeMemory:
+    def __init__(self):
+        self.embedding_model = FakeEmbedder()
+
+
+class FakePool:
+    def verify(self):
+        return False
+
+
+def test_warm_up_reports_failed_stages(monkeypatch):
+    memory = FakeMemory()
+    monkeypatch.setattr(resources, "get_memory", lambda: memory)
+    monkeypatch.setattr(resources, "get_chat_client", lambda: object())
+    monkeypatch.setattr("mem0_graph.neo4j_pool.get_pool", lambda: FakePool())
+
+    timings = resources.warm_up()
+
+    assert memory.embedding_model.texts == ["прогрев"]
+    assert timings["neo4j"] is None
+    assert timings["memory"] >= 0 and timings["chat_client"] >= 0
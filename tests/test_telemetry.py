@@ -0,0 +1,88 @@
+import json
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from mem0_graph.telemetry import Telemetry, instrument_memory, log_error
+
+
+def test_span_records_duration_errors_and_nesting(caplog):
+    telemetry = Telemetry()
+    caplog.set_level(logging.DEBUG, logger="mem0_graph")
+
+    with telemetry.span("chat"):
+        with telemetry.span("search", user_id="u") as attrs:
+            attrs["cache"] = "miss"
+    with pytest.raises(ValueError):
+        with telemetry.span("search"):
+            raise ValueError("boom")
+
+    summary = telemetry.summary()
+    assert summary["search"]["calls"] == 2 and summary["search"]["errors"] == 1
+    assert summary["chat"]["p95"] >= summary["chat"]["p50"] >= 0
+    spans = [json.loads(r.message) for r in caplog.records]
+    assert spans[0] == {
+        "event": "span", "span": "chat", "name": "search", "parent": "chat",
+        "ms": spans[0]["ms"], "error": None, "user_id": "u", "cache": "miss",
+    }
+
+
+def test_prometheus_text_has_cumulative_buckets_and_counters():
+    telemetry = Telemetry(buckets=(0.1, 1.0))
+    telemetry.observe("llm", 0.05)
+    telemetry.observe("llm", 0.5)
+    telemetry.observe("llm", 5.0, error=True)
+    telemetry.count("llm_tokens_total", 7, model='a"b', kind="prompt")
+
+    text = telemetry.prometheus_text()
+
+    assert 'mem0graph_stage_seconds_bucket{stage="llm",le="0.1"} 1' in text
+    assert 'mem0graph_stage_seconds_bucket{stage="llm",le="1.0"} 2' in text
+    assert 'mem0graph_stage_seconds_bucket{stage="llm",le="+Inf"} 3' in text
+    assert 'mem0graph_stage_seconds_count{stage="llm"} 3' in text
+    assert 'mem0graph_stage_errors_total{stage="llm"} 1' in text
+    assert 'mem0graph_llm_tokens_total{kind="prompt",model="a\\"b"} 7' in text
+
+
+def test_llm_usage_counts_tokens_and_cost():
+    telemetry = Telemetry(prices={"m": {"prompt": 1.0, "completion": 2.0}})
+
+    usage = SimpleNamespace(prompt_tokens=1000, completion_tokens=500)
+    assert telemetry.record_llm_usage("m", usage) == (1000, 500)
+    # без usage токены оцениваются по тексту
+    prompt, completion = telemetry.record_llm_usage(
+        "m", None, [{"role": "user", "content": "раз два три"}], "ответ"
+    )
+
+    assert prompt > 0 and completion > 0
+    assert telemetry.total("llm_tokens_total", kind="prompt") == 1000 + prompt
+    assert telemetry.total("llm_cost_usd_total") == pytest.approx(
+        (1000 + prompt) * 1e-6 + (500 + completion) * 2e-6
+    )
+    assert telemetry.total("llm_calls_total", estimated=True) == 1
+
+
+def test_instrument_memory_wraps_mem0_components_once():
+    class Store:
+        def search(self, query):
+            return [query]
+
+    memory = SimpleNamespace(vector_store=Store(), llm=None, graph=None)
+    telemetry = Telemetry()
+
+    assert instrument_memory(memory, telemetry) == 1
+    assert instrument_memory(memory, telemetry) == 0
+    assert memory.vector_store.search("q") == ["q"]
+    assert telemetry.summary()["chroma.search"]["calls"] == 1
+
+
+def test_log_error_is_structured(caplog):
+    with caplog.at_level(logging.ERROR, logger="mem0_graph"):
+        log_error("Mem0Agent.chat", RuntimeError("down"), stage="llm")
+
+    record = json.loads(caplog.records[-1].message)
+    assert record == {
+        "event": "error", "where": "Mem0Agent.chat", "error_type": "RuntimeError",
+        "error": "down", "stage": "llm",
+    }
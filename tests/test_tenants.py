@@ -0,0 +1,127 @@
+import threading
+import time
+
+import pytest
+
+from mem0_graph.agent import ChatStream
+from mem0_graph.tenants import TenantBusy, TenantScheduler, TenantService
+
+
+class FakeAgent:
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.remembered = []
+
+    def chat(self, message):
+        return f"{self.user_id}: {message}"
+
+    def chat_stream(self, message):
+        def fragments(reply):
+            reply.context_stats = {"message": message}
+            yield from message.split()
+            self.remembered.append(message)
+
+        return ChatStream(fragments)
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_scheduler_round_robins_between_tenants():
+    gate = threading.Event()
+    order = []
+    scheduler = TenantScheduler(workers=1, per_tenant=4)
+    try:
+        # единственный поток занят, пока очереди наполняются
+        blocker = scheduler.submit("heavy", gate.wait)
+        wait_until(lambda: scheduler.tenant_stats("heavy")["running"] == 1)
+        jobs = [scheduler.submit("heavy", order.append, f"heavy-{i}") for i in range(3)]
+        jobs.append(scheduler.submit("light", order.append, "light-0"))
+        gate.set()
+        for job in [blocker] + jobs:
+            job.result(timeout=5)
+    finally:
+        scheduler.close()
+
+    # лёгкий пользователь не ждёт, пока выполнится вся очередь тяжёлого
+    assert order == ["heavy-0", "light-0", "heavy-1", "heavy-2"]
+
+
+def test_scheduler_limits_concurrency_and_queue_per_tenant():
+    gate = threading.Event()
+    scheduler = TenantScheduler(workers=4, per_tenant=2, max_queued=1)
+    try:
+        running = []
+        for expected in (1, 2):
+            running.append(scheduler.submit("u", gate.wait))
+            wait_until(lambda: scheduler.tenant_stats("u")["running"] == expected)
+        queued = scheduler.submit("u", gate.wait)
+
+        with pytest.raises(TenantBusy):
+            scheduler.submit("u", gate.wait)
+        assert scheduler.tenant_stats("u")["queued"] == 1
+        gate.set()
+        for job in running + [queued]:
+            job.result(timeout=5)
+    finally:
+        scheduler.close()
+
+    stats = scheduler.tenant_stats("u")
+    assert stats["max_running"] == 2
+    assert (stats["done"], stats["rejected"]) == (3, 1)
+
+
+def test_service_shares_agents_per_user_and_evicts_lru():
+    created = []
+
+    def factory(user_id):
+        created.append(user_id)
+        return FakeAgent(user_id)
+
+    service = TenantService(agent_factory=factory, max_agents=2, workers=2)
+    try:
+        first = service.agent("alice")
+        assert service.agent("alice") is first
+        assert service.chat("bob", "hi", timeout=5) == "bob: hi"
+        service.agent("alice")
+        service.agent("carol")
+        # alice использовалась позже bob и осталась в LRU; bob вытеснен
+        assert service.agent("alice") is first
+    finally:
+        service.close()
+
+    assert created == ["alice", "bob", "carol"]
+    assert service.stats()["evicted"] == 1
+
+
+def test_service_streams_through_the_tenant_queue():
+    service = TenantService(agent_factory=FakeAgent, workers=2)
+    try:
+        first = service.chat_stream("u", "раз два три")
+        second = service.chat_stream("u", "четыре пять")
+
+        assert list(first) == ["раз", "два", "три"]
+        assert list(second) == ["четыре", "пять"]
+        # статистика своя у каждого ответа, хотя агент общий
+        assert first.context_stats == {"message": "раз два три"}
+        assert second.context_stats == {"message": "четыре пять"}
+        assert service.agent("u").remembered == ["раз два три", "четыре пять"]
+        assert service.scheduler.tenant_stats("u")["done"] == 2
+    finally:
+        service.close()
+
+
+def test_abandoned_stream_stops_generation():
+    service = TenantService(agent_factory=FakeAgent, workers=1)
+    try:
+        stream = service.chat_stream("u", "раз два три")
+        assert next(stream) == "раз"
+        stream.close()
+        wait_until(lambda: service.scheduler.pending("u") == 0)
+        assert service.agent("u").remembered == []
+    finally:
+        service.close()
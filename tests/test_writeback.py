@@ -0,0 +1,123 @@
+import sqlite3
+from types import SimpleNamespace
+
+from mem0_graph.writeback import WriteBehindQueue, get_write_queue, journal_path_for, memory_key
+
+
+class RecordingMemory:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = []
+
+    @classmethod
+    def on_store(cls, collection, path):
+        """Заглушка с настройками векторного хранилища, как у `mem0.Memory`."""
+        memory = cls()
+        store = SimpleNamespace(collection_name=collection, path=path, host=None, port=None)
+        memory.config = SimpleNamespace(
+            vector_store=SimpleNamespace(provider="chroma", config=store)
+        )
+        return memory
+
+    def add(self, messages, user_id=None, metadata=None):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("neo4j unavailable")
+        self.calls.append((user_id, [m["content"] for m in messages]))
+
+
+def turn(question, answer):
+    return [{"role": "user", "content": question}, {"role": "assistant", "content": answer}]
+
+
+def test_turns_are_applied_in_order_and_invalidate_cache(tmp_path):
+    memory = RecordingMemory(failures=1)
+    applied = []
+    writer = WriteBehindQueue(
+        memory,
+        str(tmp_path / "journal.sqlite3"),
+        workers=2,
+        backoff=0,
+        on_applied=lambda user_id, result: applied.append(user_id),
+    )
+
+    for i in range(3):
+        writer.enqueue("alice", turn(f"q{i}", f"a{i}"))
+    writer.enqueue("bob", turn("hi", "hello"))
+
+    assert writer.flush(timeout=5)
+    alice = [c for user, calls in memory.calls if user == "alice" for c in calls]
+    assert alice == ["q0", "a0", "q1", "a1", "q2", "a2"]
+    assert set(applied) == {"alice", "bob"}
+    writer.close()
+
+
+def test_pending_jobs_survive_restart(tmp_path):
+    journal = str(tmp_path / "journal.sqlite3")
+    WriteBehindQueue(RecordingMemory(), journal).close()
+
+    # задание записано в журнал, но процесс «упал» до его применения
+    conn = sqlite3.connect(journal)
+    conn.execute(
+        "INSERT INTO jobs (user_id, payload, created_at) VALUES ('alice', ?, 0)",
+        ('{"messages": [{"role": "user", "content": "remember me"}], "metadata": null}',),
+    )
+    conn.commit()
+    conn.close()
+
+    memory = RecordingMemory()
+    restarted = WriteBehindQueue(memory, journal, workers=1)
+    assert restarted.flush(timeout=5)
+    assert memory.calls == [("alice", ["remember me"])]
+    assert restarted.pending() == 0
+    restarted.close()
+
+
+def test_agents_on_different_memories_get_their_own_queues(make_agent):
+    first, second = RecordingMemory(), RecordingMemory()
+    agents = [make_agent(first, user_id="alice"), make_agent(second, user_id="alice")]
+
+    assert agents[0].writer is not agents[1].writer
+    assert make_agent(first, user_id="bob").writer is agents[0].writer
+
+    agents[0]._remember_turn("first?", "one")
+    agents[1]._remember_turn("second?", "two")
+    assert agents[0].flush_writes(timeout=5) and agents[1].flush_writes(timeout=5)
+
+    assert first.calls == [("alice", ["first?", "one"])]
+    assert second.calls == [("alice", ["second?", "two"])]
+
+
+def test_journal_name_follows_the_store_not_creation_order(tmp_path):
+    journal = str(tmp_path / "journal.sqlite3")
+    store = str(tmp_path / "chroma")
+    first, second = RecordingMemory.on_store("first", store), RecordingMemory.on_store("second", store)
+    expected = {m: journal_path_for(journal, memory_key(m)) for m in (first, second)}
+    assert len(set(expected.values())) == 2
+
+    # очереди созданы в обратном порядке, а журналы — те же, что вычислены заранее
+    writers = [get_write_queue(m, journal, workers=1) for m in (second, first)]
+    try:
+        assert [w.journal_path for w in writers] == [expected[second], expected[first]]
+        # другой объект Memory на том же хранилище пишет через ту же очередь
+        same = RecordingMemory.on_store("first", store)
+        assert get_write_queue(same, journal) is writers[1]
+    finally:
+        for writer in writers:
+            writer.close()
+
+
+def test_failed_jobs_are_counted_and_retried(tmp_path):
+    memory = RecordingMemory(failures=1)
+    writer = WriteBehindQueue(memory, str(tmp_path / "journal.sqlite3"), retries=0, backoff=0)
+
+    writer.enqueue("alice", turn("q", "a"))
+    assert writer.flush(timeout=5)
+    assert memory.calls == []
+    assert writer.stats()["failed"] == 1 and writer.failed("bob") == 0
+
+    assert writer.retry_failed("alice") == 1
+    assert writer.flush(timeout=5)
+    assert memory.calls == [("alice", ["q", "a"])]
+    assert writer.stats() == {"journal": writer.journal_path, "pending": 0, "failed": 0}
+    writer.close()